@@ -0,0 +1,78 @@
+# ===============================================================
+# Benchmark: cluster-partitioned vs. flat greedy playlists
+# Description:
+#   Synthetic libraries (synthetic_library.py) of 10^4 .. --max-songs
+#   songs, sequenced from the lowest-energy song by
+#       flat     greedy_engine.greedy_order() over all songs, up to
+#                --flat-max songs (it is the slow, serial baseline)
+#       cluster  cluster_greedy.cluster_greedy_order() with --clusters
+#                clusters, --workers processes, per --partition
+#   Reports wall time and total transition cost of each, and the cost
+#   of the clustered playlist relative to the flat one.
+#
+# Usage:
+#   python benchmarks/bench_cluster_greedy.py [--max-songs 1000000] [--flat-max 100000]
+#                                             [--clusters 64] [--workers 0]
+#                                             [--partition kmeans grid]
+# ===============================================================
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from cluster_greedy import DEFAULT_CLUSTERS, PARTITIONS, cluster_greedy_order  # noqa: E402
+from greedy_engine import greedy_order  # noqa: E402
+from playlist_refine import transition_cost  # noqa: E402
+from synthetic_library import synthetic_columns  # noqa: E402
+
+
+def library_features(n: int, seed: int = 0) -> np.ndarray:
+    """(3, n) tempo / mood / energy of a synthetic library."""
+    _, tempo, energy, mood, _ = synthetic_columns(n, seed)
+    return np.ascontiguousarray(np.vstack([tempo, mood, energy]).astype(np.float64))
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster-partitioned vs. flat greedy playlists.")
+    parser.add_argument("--max-songs", type=int, default=1000000)
+    parser.add_argument("--flat-max", type=int, default=100000, help="largest flat greedy run")
+    parser.add_argument("--clusters", type=int, default=DEFAULT_CLUSTERS)
+    parser.add_argument("--workers", type=int, default=0, help="0 = one per CPU core")
+    parser.add_argument("--partition", nargs="+", default=list(PARTITIONS), choices=PARTITIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = [n for n in (10000, 100000, 1000000) if n <= args.max_songs]
+    print(f"{args.clusters} clusters, {args.workers or os.cpu_count()} workers")
+    print(f"{'songs':>9} {'variant':>9} {'seconds':>9} {'cost':>11} {'vs flat':>8}")
+    for n in sizes:
+        features = library_features(n, args.seed)
+        start = int(np.argmin(features[2]))
+        flat_cost = None
+        if n <= args.flat_max:
+            order, seconds = timed(lambda: greedy_order(features, start))
+            flat_cost = transition_cost(features, order)
+            print(f"{n:>9} {'flat':>9} {seconds:>9.2f} {flat_cost:>11.1f} {'':>8}")
+        for partition in args.partition:
+            order, seconds = timed(lambda: cluster_greedy_order(
+                features, start, args.clusters, args.workers, partition, seed=args.seed))
+            assert order[0] == start and len(order) == n
+            cost = transition_cost(features, order)
+            ratio = f"{cost / flat_cost:.3f}x" if flat_cost else "-"
+            print(f"{n:>9} {partition:>9} {seconds:>9.2f} {cost:>11.1f} {ratio:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# ===============================================================
+# Benchmark: near-duplicate detection (dedup.py)
+# Description:
+#   Synthetic libraries (synthetic_library.py) of 10^3 .. --max-songs
+#   songs plus --dup-share re-encoded copies (features jittered by up
+#   to half the default tolerance), searched with find_duplicates():
+#       lsh    hashed candidates (default)
+#       brute  every pair, up to --brute-max songs
+#   Reports the time, candidate pairs per song, and recall: the share
+#   of brute's duplicate pairs (where brute ran) and of the injected
+#   copies that were found.
+#
+# Usage:
+#   python benchmarks/bench_dedup.py [--max-songs 1000000] [--brute-max 20000]
+#                                    [--dup-share 0.05] [--tables 6]
+# ===============================================================
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from dedup import DEFAULT_TOLERANCES, HASH_TABLES, find_duplicates  # noqa: E402
+from song_table import SongTable  # noqa: E402
+from synthetic_library import synthetic_columns  # noqa: E402
+
+
+def library_with_copies(n: int, share: float, seed: int = 0):
+    """(SongTable, original row of every copy); copies are appended after the n songs."""
+    files, tempo, energy, mood, duration = synthetic_columns(n, seed)
+    rng = np.random.default_rng(seed + 1)
+    k = int(n * share)
+    src = rng.integers(0, n, k)
+
+    def copy(col, field):
+        half = DEFAULT_TOLERANCES[field] / 2
+        return np.concatenate([col, col[src] + rng.uniform(-half, half, k)])
+
+    table = SongTable.from_columns(files + [f"{files[i]} (copy {j})" for j, i in enumerate(src)],
+                                   copy(mood, "mood"), copy(tempo, "tempo"),
+                                   copy(energy, "energy"), copy(duration, "duration"))
+    return table, src
+
+
+def pair_set(result, n):
+    pairs = set()
+    for group in result.groups:
+        g = group.tolist()
+        pairs.update(a * n + b for i, a in enumerate(g) for b in g[i + 1:])
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time near-duplicate detection.")
+    parser.add_argument("--max-songs", type=int, default=1_000_000)
+    parser.add_argument("--brute-max", type=int, default=20_000)
+    parser.add_argument("--dup-share", type=float, default=0.05)
+    parser.add_argument("--tables", type=int, default=HASH_TABLES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'songs':>10} {'method':>6} {'seconds':>9} {'us/song':>8} {'cand/song':>10} "
+          f"{'groups':>8} {'vs brute':>9} {'copies':>7}")
+    sizes = [10 ** k for k in range(3, 7) if 10 ** k <= args.max_songs]
+    for n in sizes:
+        table, src = library_with_copies(n, args.dup_share, args.seed)
+        total = len(table)
+        results = {}
+        for method in ("lsh", "brute"):
+            if method == "brute" and total > args.brute_max:
+                continue
+            t0 = time.perf_counter()
+            results[method] = find_duplicates(table, method=method, tables=args.tables)
+            seconds = time.perf_counter() - t0
+            result = results[method]
+
+            # Injected copy found: it shares a group with its original
+            label = np.arange(total)
+            for group in result.groups:
+                label[group] = group[0]
+            copies = float(np.mean(label[n:] == label[src])) if len(src) else 1.0
+            vs_brute = ""
+            if "brute" in results:
+                brute = pair_set(results["brute"], total)
+                vs_brute = f"{len(pair_set(results['lsh'], total) & brute) / max(len(brute), 1):.2%}"
+            print(f"{total:>10,} {method:>6} {seconds:>9.3f} {seconds / total * 1e6:>8.2f} "
+                  f"{result.candidates / total:>10.1f} {len(result.groups):>8,} {vs_brute:>9} "
+                  f"{copies:>7.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# ===============================================================
+# Benchmark: duration-targeted greedy playlists
+# Description:
+#   For a random library, builds playlists of growing target
+#   durations with greedy_order_limited() ("brute" and "index") and
+#   compares them with sequencing the whole library (greedy_order()),
+#   and times the first tracks of the streaming walk (iter_greedy_order()).
+#
+# Usage:
+#   python benchmarks/bench_duration.py [songs]   (default 50,000)
+# ===============================================================
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from greedy_engine import get_index, greedy_order, greedy_order_limited, iter_greedy_order  # noqa: E402
+
+TARGETS_MIN = (30, 60, 180, 600)
+
+
+def main(n):
+    rng = np.random.default_rng(0)
+    features = np.vstack([rng.normal(120.0, 25.0, n), rng.random(n), rng.random(n)])
+    durations = rng.uniform(120.0, 420.0, n)
+    start = int(np.argmin(features[2]))
+
+    t0 = time.perf_counter()
+    get_index(features)
+    build_s = time.perf_counter() - t0
+    print(f"{n:,} songs, index build {build_s:.3f}s")
+
+    print(f"{'target min':>10} {'tracks':>7} {'minutes':>8} {'brute s':>8} {'index s':>8} {'same':>5}")
+    for minutes in TARGETS_MIN:
+        times, orders = [], []
+        for method in ("brute", "index"):
+            t0 = time.perf_counter()
+            orders.append(greedy_order_limited(features, start, durations, minutes * 60.0,
+                                               tolerance=60.0, method=method))
+            times.append(time.perf_counter() - t0)
+        total = durations[orders[0]].sum() / 60.0
+        print(f"{minutes:>10} {len(orders[0]):>7} {total:>8.1f} {times[0]:>8.3f} {times[1]:>8.3f} "
+              f"{str(orders[0] == orders[1]):>5}")
+
+    t0 = time.perf_counter()
+    walk = iter_greedy_order(features, start)
+    next(walk)
+    first_s = time.perf_counter() - t0
+    next(walk)
+    print(f"streaming: first track {first_s * 1e3:.3f} ms, second {(time.perf_counter() - t0) * 1e3:.3f} ms")
+    walk.close()
+
+    if n <= 20_000:
+        t0 = time.perf_counter()
+        greedy_order(features, start)
+        print(f"full library: {time.perf_counter() - t0:.3f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
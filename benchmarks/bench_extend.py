@@ -0,0 +1,71 @@
+# ===============================================================
+# Benchmark: brute-force vs. KD-tree cheapest insertion
+# Description:
+#   Greedy playlists of synthetic libraries (synthetic_library.py) are
+#   extended by batches of new songs from another seed, the small
+#   "a few dozen new songs" case included, with
+#       brute    playlist_extend.extend_playlist(method="brute")
+#       index    playlist_extend.extend_playlist(method="index")
+#   Reports wall time of each (the index time includes building the
+#   KD-tree), whether both give the same playlist, and the added
+#   transition cost.  The crossover sizes are what
+#   INDEX_MIN_PLAYLIST_SONGS and INDEX_MIN_NEW_SONGS in
+#   playlist_extend.py are based on.
+#
+# Usage:
+#   python benchmarks/bench_extend.py [--songs 10000 100000] [--new 10 30 100 300 1000]
+# ===============================================================
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from greedy_engine import greedy_order  # noqa: E402
+from playlist_extend import extend_playlist  # noqa: E402
+from song_table import SongTable  # noqa: E402
+from synthetic_library import synthetic_columns  # noqa: E402
+
+
+def library(n: int, seed: int, prefix: str) -> SongTable:
+    """Synthetic songs as a SongTable."""
+    _, tempo, energy, mood, duration = synthetic_columns(n, seed)
+    return SongTable.from_columns([f"{prefix}{i}.mp3" for i in range(n)], mood, tempo, energy, duration)
+
+
+def greedy_playlist_table(n: int, seed: int = 0) -> SongTable:
+    """A library of n songs in greedy order from its lowest-energy song."""
+    songs = library(n, seed, "song")
+    features = np.ascontiguousarray(np.vstack([songs.tempo, songs.mood, songs.energy]))
+    return songs.take(greedy_order(features, int(np.argmin(songs.energy))))
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Brute-force vs. KD-tree cheapest insertion.")
+    parser.add_argument("--songs", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--new", type=int, nargs="+", default=[10, 30, 100, 300, 1000])
+    args = parser.parse_args()
+
+    print(f"{'songs':>8} {'new':>6} {'brute s':>9} {'index s':>9} {'same':>5} {'added cost':>11}")
+    for n in args.songs:
+        playlist = greedy_playlist_table(n)
+        for m in args.new:
+            new_songs = library(m, 1, "new")
+            brute, brute_s = timed(lambda: extend_playlist(playlist, new_songs, "brute"))
+            index, index_s = timed(lambda: extend_playlist(playlist, new_songs, "index"))
+            same = list(brute.playlist.files) == list(index.playlist.files)
+            print(f"{n:>8} {m:>6} {brute_s:>9.3f} {index_s:>9.3f} {str(same):>5} {brute.added_cost:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
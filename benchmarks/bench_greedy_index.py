@@ -0,0 +1,65 @@
+# ===============================================================
+# Benchmark: brute-force scan vs. KD-tree index for greedy_order()
+# Description:
+#   Times one full greedy walk with each method on random libraries
+#   of increasing size and checks that both give the same ordering.
+#   The crossover point is what INDEX_MIN_SONGS in greedy_engine.py
+#   is based on.
+#
+# Usage:
+#   python benchmarks/bench_greedy_index.py [size ...]
+# ===============================================================
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import greedy_engine  # noqa: E402
+
+DEFAULT_SIZES = [1000, 2000, 5000, 10000, 20000, 50000]
+BRUTE_MAX_SONGS = 50000   # the scan is O(n^2); skip it beyond this
+
+
+def random_features(n: int, seed: int = 0) -> np.ndarray:
+    """Tempo ~ N(120, 25) BPM, mood and energy uniform in [0, 1]."""
+    rng = np.random.default_rng(seed)
+    return np.ascontiguousarray(np.vstack([
+        rng.normal(120.0, 25.0, n),
+        rng.random(n),
+        rng.random(n),
+    ]))
+
+
+def main(sizes):
+    print(f"{'songs':>8} {'brute s':>10} {'build s':>10} {'index s':>10} {'speedup':>8}  same")
+    for n in sizes:
+        features = random_features(n)
+
+        brute_s = None
+        if n <= BRUTE_MAX_SONGS:
+            t0 = time.perf_counter()
+            brute = greedy_engine.greedy_order(features, 0, method="brute")
+            brute_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        greedy_engine.get_index(features)
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        indexed = greedy_engine.greedy_order(features, 0, method="index")
+        index_s = time.perf_counter() - t0
+
+        if brute_s is None:
+            print(f"{n:>8} {'-':>10} {build_s:>10.3f} {index_s:>10.3f} {'-':>8}  -")
+        else:
+            speedup = brute_s / (build_s + index_s)
+            print(f"{n:>8} {brute_s:>10.3f} {build_s:>10.3f} {index_s:>10.3f} "
+                  f"{speedup:>7.2f}x  {brute == indexed}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,45 @@
+# ===============================================================
+# Benchmark: 2-opt / Or-opt refinement of greedy playlists
+# Description:
+#   For growing random libraries, builds the greedy order and refines
+#   it under several time budgets, reporting the total transition
+#   cost before/after, moves applied and whether the search converged.
+#
+# Usage:
+#   python benchmarks/bench_refine.py [max_songs]   (default 16,000)
+# ===============================================================
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from greedy_engine import greedy_order  # noqa: E402
+from playlist_refine import refine_order  # noqa: E402
+
+BUDGETS = (0.01, 0.1, 1.0)
+
+
+def main(max_songs):
+    rng = np.random.default_rng(0)
+    print(f"{'songs':>8} {'greedy s':>9} {'budget s':>9} {'cost before':>12} {'cost after':>11} "
+          f"{'gain %':>7} {'moves':>6} {'used s':>7} {'converged':>9}")
+    n = 500
+    while n <= max_songs:
+        features = np.vstack([rng.normal(120.0, 25.0, n), rng.random(n), rng.random(n)])
+        t0 = time.perf_counter()
+        order = greedy_order(features, int(np.argmin(features[2])))
+        greedy_s = time.perf_counter() - t0
+        for budget in BUDGETS:
+            r = refine_order(features, order, time_budget=budget)
+            gain = 100.0 * (r.cost_before - r.cost_after) / r.cost_before
+            print(f"{n:>8,} {greedy_s:>9.3f} {budget:>9.2f} {r.cost_before:>12.1f} {r.cost_after:>11.1f} "
+                  f"{gain:>7.2f} {r.moves:>6} {r.seconds:>7.3f} {str(r.converged):>9}")
+        n *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 16_000)
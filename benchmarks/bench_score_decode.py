@@ -0,0 +1,79 @@
+# ===============================================================
+# Benchmark: full-track decode vs. partial (window-only) decode
+# Description:
+#   Runs score() on every MP3 under a folder twice - once decoding
+#   the whole track (partial_decode=False) and once decoding only
+#   the centered SEG-second window - and reports total wall time,
+#   the largest per-file peak of traced memory, and the largest
+#   difference in the returned features.
+#
+# Usage:
+#   python benchmarks/bench_score_decode.py <music_dir>
+# ===============================================================
+
+import glob
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import score  # noqa: E402
+
+
+def run(files, partial):
+    """Return (results, wall seconds, max per-file peak bytes)."""
+    results = []
+    t0 = time.perf_counter()
+    for mp3 in files:
+        results.append(score.score(mp3, partial_decode=partial))
+    wall = time.perf_counter() - t0
+
+    # Memory is measured in a separate pass so tracing doesn't skew timing
+    peak = 0
+    for mp3 in files:
+        tracemalloc.start()
+        score.score(mp3, partial_decode=partial)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return results, wall, peak
+
+
+def main(indir):
+    warnings.simplefilter("ignore")
+
+    # Keep only files that decode; this also warms up librosa/numba
+    files = []
+    for mp3 in sorted(glob.glob(os.path.join(indir, "**/*.mp3"), recursive=True)):
+        try:
+            score.score(mp3)
+            files.append(mp3)
+        except Exception as e:
+            print(f"[WARN] Skipping {mp3}: {e}")
+    if not files:
+        print(f"No decodable .mp3 files under {indir}")
+        return
+
+    full, full_s, full_peak = run(files, partial=False)
+    part, part_s, part_peak = run(files, partial=True)
+
+    max_diff = [0.0, 0.0, 0.0, 0.0]
+    for a, b in zip(full, part):
+        for k in range(4):
+            max_diff[k] = max(max_diff[k], abs(a[k] - b[k]))
+
+    print(f"files: {len(files)}")
+    print(f"{'path':<10} {'wall s':>8} {'s/file':>8} {'peak MiB':>9}")
+    for name, wall, peak in (("full", full_s, full_peak), ("partial", part_s, part_peak)):
+        print(f"{name:<10} {wall:>8.2f} {wall / len(files):>8.3f} {peak / 2**20:>9.1f}")
+    print(f"speedup: {full_s / part_s:.2f}x   memory: {full_peak / max(part_peak, 1):.2f}x less")
+    print("max |diff| tempo={:.3g} energy={:.3g} mood={:.3g} dur={:.3g}".format(*max_diff))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python benchmarks/bench_score_decode.py <music_dir>")
+        sys.exit(1)
+    main(sys.argv[1])
@@ -0,0 +1,117 @@
+# ===============================================================
+# Benchmark: shared-framing feature core of score()
+# Description:
+#   CPU time per file of the feature step of score() on synthetic MP3
+#   clips (synthetic_library.py), segments decoded once up front:
+#       separate  - beat.tempo() + feature.rms() per segment, the
+#                   calls score() made before segment_features()
+#       shared    - segment_features() per segment
+#       stacked   - segment_features() on --batch segments at a time
+#   plus end-to-end score() (decode included) against the separate
+#   calls.  Each variant reports its best CPU seconds per file over
+#   --repeat runs, and the largest difference of its tempo / energy /
+#   mood from the separate calls.
+#
+# Usage:
+#   python benchmarks/bench_score_features.py [--clips 16] [--seconds 60]
+#                                             [--batch 4] [--repeat 5]
+# ===============================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import score  # noqa: E402
+from synthetic_library import write_audio_clips  # noqa: E402
+
+
+def separate_features(y, sr=score.SR):
+    """tempo, energy, mood the way score() computed them with two librosa calls."""
+    import librosa
+
+    tempo = float(librosa.feature.tempo(y=y, sr=sr, hop_length=score.HOP, aggregate=np.median)[0])
+    rms_frames = librosa.feature.rms(y=y, frame_length=score.N_FFT, hop_length=score.HOP).flatten()
+    rms_mean = float(rms_frames.mean())
+    ref = float(np.percentile(rms_frames, 95))
+    energy = 0.0 if ref <= 1e-8 else float(np.clip(rms_mean / ref, 0.0, 1.0))
+    return tempo, energy, float(score.mood_score(tempo, rms_mean))
+
+
+def cpu_per_file(fn, n_files, repeat):
+    """Best process CPU seconds of fn() over 'repeat' runs, per file."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn()
+        best = min(best, time.process_time() - t0)
+    return best / n_files
+
+
+def max_diff(rows, reference):
+    return float(np.max(np.abs(np.asarray(rows)[:, :3] - np.asarray(reference)[:, :3])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU time of score()'s feature step per file.")
+    parser.add_argument("--clips", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=60.0, help="clip length")
+    parser.add_argument("--batch", type=int, default=4, help="segments per stacked call")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_audio_clips(tmp, args.clips, seconds=args.seconds, seed=args.seed)
+        segments = [score.decode(p)[0] for p in paths]
+        n = len(segments)
+
+        def separate():
+            return [separate_features(y) for y in segments]
+
+        def shared():
+            return [tuple(float(v[0]) for v in score.segment_features(y)[:3]) for y in segments]
+
+        def stacked():
+            rows = []
+            for lo in range(0, n, args.batch):
+                group = segments[lo : lo + args.batch]
+                if len({len(y) for y in group}) > 1:
+                    rows += [tuple(float(v[0]) for v in score.segment_features(y)[:3]) for y in group]
+                    continue
+                rows += list(zip(*(v.tolist() for v in score.segment_features(np.stack(group))[:3])))
+            return rows
+
+        # Warm up librosa / numba before timing
+        reference = separate()
+        results = {"separate": (separate, reference), "shared": (shared, shared()),
+                   f"stacked x{args.batch}": (stacked, stacked())}
+
+        print(f"{n} clips of {args.seconds:.0f}s, {score.SEG}s segments")
+        print(f"{'variant':>14} {'ms/file':>9} {'vs separate':>12} {'max diff':>10}")
+        base = None
+        for name, (fn, rows) in results.items():
+            seconds = cpu_per_file(fn, n, args.repeat)
+            base = base or seconds
+            print(f"{name:>14} {seconds * 1e3:>9.1f} {seconds / base:>11.2f}x {max_diff(rows, reference):>10.2g}")
+
+        def score_separate():
+            for p in paths:
+                separate_features(score.decode(p)[0])
+
+        before = cpu_per_file(score_separate, n, args.repeat)
+        after = cpu_per_file(lambda: [score.score(p) for p in paths], n, args.repeat)
+        print(f"\nscore() with decode: {before * 1e3:.1f} -> {after * 1e3:.1f} ms/file "
+              f"({100 * (1 - after / before):.0f}% less CPU)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# ===============================================================
+# Benchmark: CSV parsing vs. memory-mapped binary song store
+# Description:
+#   Writes a random library as a features CSV and as a binary store,
+#   then times load_songs() (Song objects), load_song_table() on the
+#   CSV, and open_song_store() on the binary file.
+#
+# Usage:
+#   python benchmarks/bench_song_store.py [n_songs]   (default 1,000,000)
+# ===============================================================
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from integrated_playlist_generator import load_songs  # noqa: E402
+from song_table import SongTable, load_song_table, open_song_store, save_song_store  # noqa: E402
+from sort_engine import sort_by_fields  # noqa: E402
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main(n):
+    rng = np.random.default_rng(0)
+    table = SongTable.from_columns(
+        [f"music/artist_{i % 5000:04d}/track_{i:07d}.mp3" for i in range(n)],
+        rng.random(n), rng.normal(120.0, 25.0, n), rng.random(n), rng.uniform(90.0, 360.0, n))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "songs_features.csv")
+        store_path = os.path.join(tmp, "songs_features.songs")
+        table.save_csv(csv_path)
+        save_song_store(table, store_path)
+
+        _, songs_s = timed(load_songs, csv_path)
+        _, table_s = timed(load_song_table, csv_path)
+        mapped, store_s = timed(open_song_store, store_path)
+        _, first_sort_s = timed(sort_by_fields, mapped, ("mood", "tempo", "energy"))
+
+        print(f"songs: {n:,}")
+        print(f"CSV size   {os.path.getsize(csv_path) / 2**20:8.1f} MiB")
+        print(f"store size {os.path.getsize(store_path) / 2**20:8.1f} MiB")
+        print(f"{'loader':<28} {'seconds':>10}")
+        print(f"{'load_songs (CSV)':<28} {songs_s:>10.3f}")
+        print(f"{'load_song_table (CSV)':<28} {table_s:>10.3f}")
+        print(f"{'open_song_store (mmap)':<28} {store_s:>10.5f}")
+        print(f"{'  + first recommended_sort':<28} {first_sort_s:>10.3f}")
+        del mapped
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
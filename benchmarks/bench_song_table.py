@@ -0,0 +1,73 @@
+# ===============================================================
+# Benchmark: Song objects vs. columnar SongTable
+# Description:
+#   Builds a random library both as a list of Song objects and as a
+#   SongTable (float64 default and float32 opt-in), and reports memory (traced bytes, per song and per
+#   million songs) plus recommended_sort() time for each.
+#
+# Usage:
+#   python benchmarks/bench_song_table.py [n_songs]   (default 1,000,000)
+# ===============================================================
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from integrated_playlist_generator import Song, recommended_sort  # noqa: E402
+from song_table import SongTable  # noqa: E402
+
+
+def random_columns(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    files = [f"music/artist_{i % 5000:04d}/track_{i:07d}.mp3" for i in range(n)]
+    return (files, rng.random(n).tolist(), rng.normal(120.0, 25.0, n).tolist(),
+            rng.random(n).tolist(), rng.uniform(90.0, 360.0, n).tolist())
+
+
+def traced(build):
+    """Run build() and return (result, bytes still allocated by it)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main(n):
+    files, mood, tempo, energy, duration = random_columns(n)
+
+    # Strings are created outside the traced region for both variants;
+    # Song objects share them, SongTable packs its own copy.
+    songs, songs_bytes = traced(lambda: [Song(*row) for row in zip(files, mood, tempo, energy, duration)])
+    table, table_bytes = traced(lambda: SongTable.from_columns(files, mood, tempo, energy, duration))
+    _, table32_bytes = traced(lambda: SongTable.from_columns(files, mood, tempo, energy, duration,
+                                                             dtype=np.float32))
+    path_bytes = sum(sys.getsizeof(f) for f in files)
+
+    t0 = time.perf_counter()
+    recommended_sort(songs)
+    songs_sort = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    recommended_sort(table)
+    table_sort = time.perf_counter() - t0
+
+    per_million = 1e6 / n / 2**20
+    print(f"songs: {n:,}")
+    print(f"{'layout':<12} {'bytes/song':>11} {'MiB per 1M':>11} {'rec. sort s':>12}")
+    print(f"{'Song list':<12} {(songs_bytes + path_bytes) / n:>11.1f} "
+          f"{(songs_bytes + path_bytes) * per_million:>11.1f} {songs_sort:>12.3f}")
+    print(f"{'SongTable':<12} {table_bytes / n:>11.1f} {table_bytes * per_million:>11.1f} {table_sort:>12.3f}")
+    print(f"{'  float32':<12} {table32_bytes / n:>11.1f} {table32_bytes * per_million:>11.1f}")
+    print(f"(SongTable.nbytes = {table.nbytes / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,70 @@
+# ===============================================================
+# Benchmark: recursive merge sort vs. sort_engine
+# Description:
+#   For library sizes 10^3 .. 10^N, times recommended_sort() done by
+#   the original recursive merge sort, the key-cached non-recursive
+#   merge_sort(), sort_by_fields() on a list of Song objects, and
+#   sort_by_fields() on a SongTable.
+#
+#   The slow paths are skipped above --max-merge songs (default 10^6),
+#   where the recursive version takes minutes.
+#
+# Usage:
+#   python benchmarks/bench_sort.py [max_exponent] [--max-merge N]   (default 7)
+# ===============================================================
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from integrated_playlist_generator import Song  # noqa: E402
+from song_table import SongTable  # noqa: E402
+from sort_engine import merge_sort, merge_sort_recursive, sort_by_fields  # noqa: E402
+
+FIELDS = ("mood", "tempo", "energy")
+
+
+def recommended_key(song):
+    return (song.mood, song.tempo, song.energy)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main(max_exponent, max_merge):
+    rng = np.random.default_rng(0)
+    print(f"{'songs':>10} {'recursive':>10} {'key-cached':>10} {'numpy list':>10} {'numpy table':>11}")
+    for e in range(3, max_exponent + 1):
+        n = 10 ** e
+        # Rounded moods give plenty of ties for the secondary keys
+        mood = np.round(rng.random(n), 2)
+        tempo = np.round(rng.normal(120.0, 25.0, n))
+        energy = rng.random(n)
+        table = SongTable.from_columns([f"track_{i}.mp3" for i in range(n)], mood, tempo, energy,
+                                       np.full(n, 180.0))
+        songs = [Song(f"track_{i}.mp3", m, t, en, 180.0)
+                 for i, (m, t, en) in enumerate(zip(mood.tolist(), tempo.tolist(), energy.tolist()))]
+
+        cells = []
+        for fn, args, slow in ((merge_sort_recursive, (songs, recommended_key), True),
+                               (merge_sort, (songs, recommended_key), True),
+                               (sort_by_fields, (songs, FIELDS), False),
+                               (sort_by_fields, (table, FIELDS), False)):
+            cells.append("-" if slow and n > max_merge else f"{timed(fn, *args):.3f}")
+        print(f"{n:>10,} {cells[0]:>10} {cells[1]:>10} {cells[2]:>10} {cells[3]:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("max_exponent", nargs="?", type=int, default=7)
+    parser.add_argument("--max-merge", type=int, default=10 ** 6)
+    args = parser.parse_args()
+    main(args.max_exponent, args.max_merge)
@@ -0,0 +1,216 @@
+# ===============================================================
+# Benchmark: every pipeline stage on synthetic libraries
+# Description:
+#   Generates seeded synthetic libraries (synthetic_library.py) of
+#   10^2 .. 10^6 songs and times each stage of the pipeline on them:
+#   load_songs / load_song_table, merge_sort (and the recursive
+#   reference), recommended_sort / custom_sort, greedy_playlist
+#   (pandas reference, NumPy scan, auto) and save_csv, plus
+#   score.main() on short synthetic MP3 clips.
+#
+#   Each stage reports its best wall time over a few runs and its peak
+#   traced memory (tracemalloc, in a separate run so tracing does not
+#   skew the timing).  A stage is skipped at a size where its expected
+#   time (last time * growth ** exponent) exceeds --budget seconds.
+#
+#   Results go to a JSON file tagged with the git commit; --compare
+#   prints the time ratio against an earlier result file and marks
+#   stages that got more than REGRESSION_RATIO slower.
+#
+# Usage:
+#   python benchmarks/bench_suite.py [--max-songs 1000000] [--budget 30]
+#                                    [--clips 8] [--out bench_suite.json]
+#                                    [--compare old.json]
+# ===============================================================
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import integrated_playlist_generator as ig  # noqa: E402
+from song_table import load_song_table  # noqa: E402
+from sort_engine import merge_sort_recursive  # noqa: E402
+from synthetic_library import write_audio_clips, write_features_csv  # noqa: E402
+
+# Repeat fast stages for a stable best time
+MIN_RUN_SECONDS = 0.2
+MAX_RUNS = 5
+
+# Compared with --compare, slower than this is flagged
+REGRESSION_RATIO = 1.25
+
+
+def mood_key(s):
+    return s.mood
+
+
+# stage name -> (input, function of the input and an output path, growth exponent)
+STAGES = {
+    "load_songs": ("csv", lambda csv, out: ig.load_songs(csv), 1.0),
+    "load_song_table": ("csv", lambda csv, out: load_song_table(csv), 1.0),
+    "merge_sort_recursive": ("songs", lambda songs, out: merge_sort_recursive(songs, mood_key), 1.1),
+    "merge_sort": ("songs", lambda songs, out: ig.merge_sort(songs, mood_key), 1.1),
+    "recommended_sort": ("songs", lambda songs, out: ig.recommended_sort(songs), 1.1),
+    "recommended_sort_table": ("table", lambda table, out: ig.recommended_sort(table), 1.1),
+    "custom_sort": ("songs", lambda songs, out: ig.custom_sort(songs, "tempo"), 1.1),
+    "greedy_playlist_pandas": ("df", lambda df, out: ig.greedy_playlist(df, engine="pandas"), 2.0),
+    "greedy_playlist_numpy": ("table", lambda table, out: ig.greedy_playlist(table, engine="numpy"), 2.0),
+    "greedy_playlist": ("table", lambda table, out: ig.greedy_playlist(table), 1.5),
+    "save_csv": ("songs", lambda songs, out: ig.save_csv(songs, out), 1.0),
+    "save_csv_table": ("table", lambda table, out: ig.save_csv(table, out), 1.0),
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(fn, with_memory=True):
+    """(best seconds, runs, peak traced bytes or None) of fn()."""
+    best, runs, spent = float("inf"), 0, 0.0
+    while runs < MAX_RUNS and (runs == 0 or spent < MIN_RUN_SECONDS):
+        t0 = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - t0
+        best, runs, spent = min(best, seconds), runs + 1, spent + seconds
+
+    peak = None
+    if with_memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, runs, peak
+
+
+def quiet(fn):
+    # The scripts print progress; keep the report readable
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+def bench_pipeline(sizes, budget, seed, tmp, with_memory):
+    results = []
+    last = {}                           # stage -> (n, seconds)
+    for n in sizes:
+        csv_path = write_features_csv(os.path.join(tmp, f"songs_{n}.csv"), n, seed)
+        inputs = {"csv": csv_path}
+        inputs["songs"] = ig.load_songs(csv_path)
+        inputs["table"] = load_song_table(csv_path)
+        inputs["df"] = pd.read_csv(csv_path)
+        out = os.path.join(tmp, "out.csv")
+
+        for name, (kind, fn, exponent) in STAGES.items():
+            row = {"stage": name, "n": n}
+            if name in last:
+                prev_n, prev_s = last[name]
+                expected = prev_s * (n / prev_n) ** exponent
+                if expected > budget:
+                    row.update(skipped=True, expected_seconds=expected)
+                    results.append(row)
+                    print(f"{name:>24} {n:>9,}   skipped (expected {expected:,.0f}s)")
+                    continue
+            seconds, runs, peak = measure(quiet(lambda: fn(inputs[kind], out)), with_memory)
+            last[name] = (n, seconds)
+            row.update(seconds=seconds, runs=runs, peak_bytes=peak)
+            results.append(row)
+            mem = "" if peak is None else f" {peak / 2**20:>9.1f} MiB"
+            print(f"{name:>24} {n:>9,} {seconds:>10.4f}s{mem}")
+        os.remove(csv_path)
+    return results
+
+
+def bench_score(clips, seed, tmp, with_memory):
+    import score
+
+    clip_dir = os.path.join(tmp, "clips")
+    write_audio_clips(clip_dir, clips, seed=seed)
+    out = os.path.join(tmp, "clips.csv")
+    warnings.simplefilter("ignore")
+    quiet(lambda: score.main(clip_dir, out))()          # warm up librosa / numba
+    seconds, runs, peak = measure(quiet(lambda: score.main(clip_dir, out)), with_memory)
+    mem = "" if peak is None else f" {peak / 2**20:>9.1f} MiB"
+    print(f"{'score.main':>24} {clips:>9,} {seconds:>10.4f}s{mem}")
+    return {"stage": "score.main", "n": clips, "seconds": seconds, "runs": runs, "peak_bytes": peak}
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["stage"], r["n"]): r for r in baseline["results"] if "seconds" in r}
+    print(f"\nAgainst {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    print(f"{'stage':>24} {'n':>9} {'old s':>10} {'new s':>10} {'ratio':>7}")
+    for r in results:
+        before = old.get((r["stage"], r["n"]))
+        if before is None or "seconds" not in r:
+            continue
+        ratio = r["seconds"] / max(before["seconds"], 1e-12)
+        flag = "  SLOWER" if ratio > REGRESSION_RATIO else ""
+        print(f"{r['stage']:>24} {r['n']:>9,} {before['seconds']:>10.4f} {r['seconds']:>10.4f} "
+              f"{ratio:>7.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic data.")
+    parser.add_argument("--max-songs", type=int, default=1_000_000)
+    parser.add_argument("--budget", type=float, default=30.0,
+                        help="skip a stage where it is expected to take longer (seconds)")
+    parser.add_argument("--clips", type=int, default=8, help="MP3 clips for score.main (0: skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--out", default="bench_suite.json")
+    parser.add_argument("--compare", default=None, help="earlier result file")
+    args = parser.parse_args()
+
+    sizes = [10 ** k for k in range(2, 7) if 10 ** k <= args.max_songs]
+    with_memory = not args.no_memory
+    with tempfile.TemporaryDirectory() as tmp:
+        results = bench_pipeline(sizes, args.budget, args.seed, tmp, with_memory)
+        if args.clips:
+            results.append(bench_score(args.clips, args.seed, tmp, with_memory))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "budget": args.budget,
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved: {args.out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# ===============================================================
+# Benchmark helper: seeded synthetic song libraries
+# Description:
+#   Generates feature CSVs of any size in the layout score.main()
+#   writes, with distributions close to what score() measures on
+#   real music:
+#       - tempo: a mix of genre clusters (hip-hop ~90, pop ~120,
+#         house ~128, rock ~140, drum & bass ~170 BPM)
+#       - energy: mean RMS / 95th percentile RMS, mostly 0.4-0.9
+#       - mood: score.mood_score() of tempo and a typical loudness
+#       - duration: log-normal around 3.5 minutes
+#   and short MP3 clips (click track at a given tempo over a tone)
+#   that score() can analyse.  The same seed gives the same library.
+#
+# Usage:
+#   python benchmarks/synthetic_library.py <out_csv> <n_songs> [seed]
+#   python benchmarks/synthetic_library.py --clips <out_dir> <n_clips> [seed]
+# ===============================================================
+
+import csv
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from score import ENERGY_MEAN, ENERGY_STD, mood_score  # noqa: E402
+
+# (center BPM, spread, share of the library)
+TEMPO_CLUSTERS = ((90.0, 12.0, 0.25), (120.0, 8.0, 0.35), (128.0, 4.0, 0.20),
+                  (140.0, 10.0, 0.10), (170.0, 10.0, 0.10))
+
+CSV_COLUMNS = ["file", "tempo", "energy", "mood", "duration", "error",
+               "tempo_bpm", "energy_pct", "mood_pct", "duration_s"]
+
+# Rows per csv.writerows() call
+WRITE_CHUNK = 100_000
+
+
+def synthetic_columns(n: int, seed: int = 0):
+    """
+    Feature columns of n synthetic songs.
+
+    Returns:
+        (files, tempo, energy, mood, duration): a list of paths and four
+        float64 arrays
+    """
+    rng = np.random.default_rng(seed)
+    centers, spreads, shares = (np.array(c) for c in zip(*TEMPO_CLUSTERS))
+    cluster = rng.choice(len(centers), size=n, p=shares / shares.sum())
+    tempo = np.clip(rng.normal(centers[cluster], spreads[cluster]), 50.0, 220.0)
+
+    energy = rng.beta(5.0, 3.0, n)
+    rms = np.clip(rng.normal(ENERGY_MEAN, ENERGY_STD, n), 1e-3, None)
+    mood = mood_score(tempo, rms)
+    duration = np.clip(rng.lognormal(np.log(210.0), 0.35, n), 30.0, 1200.0)
+
+    files = [f"synthetic/artist_{i % 5000:04d}/track_{i:07d}.mp3" for i in range(n)]
+    return files, tempo, energy, mood, duration
+
+
+def write_features_csv(path: str, n: int, seed: int = 0) -> str:
+    """Write n synthetic songs as a score.main()-style features CSV."""
+    files, tempo, energy, mood, duration = synthetic_columns(n, seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for lo in range(0, n, WRITE_CHUNK):
+            hi = min(lo + WRITE_CHUNK, n)
+            t, e, m, d = (c[lo:hi] for c in (tempo, energy, mood, duration))
+            writer.writerows(zip(files[lo:hi], t.tolist(), e.tolist(), m.tolist(), d.tolist(),
+                                 [""] * (hi - lo), np.round(t, 1).tolist(),
+                                 np.round(100 * e).tolist(), np.round(100 * m).tolist(),
+                                 np.round(d, 1).tolist()))
+    return path
+
+
+def write_audio_clips(out_dir: str, count: int, seconds: float = 30.0, seed: int = 0,
+                      sr: int = 22050):
+    """
+    Write 'count' mono MP3 clips under out_dir: a click on every beat at
+    a synthetic tempo, over a quiet tone with a random loudness.
+
+    Returns:
+        List[str]: The clip paths
+    """
+    import soundfile as sf
+
+    _, tempo, _, _, _ = synthetic_columns(count, seed)
+    rng = np.random.default_rng(seed + 1)
+    os.makedirs(out_dir, exist_ok=True)
+    t = np.arange(int(seconds * sr)) / sr
+    click = np.exp(-np.arange(int(0.03 * sr)) / (0.005 * sr))
+    paths = []
+    for i, bpm in enumerate(tempo.tolist()):
+        gain = rng.uniform(0.1, 0.5)
+        y = 0.2 * gain * np.sin(2 * np.pi * rng.uniform(110.0, 440.0) * t)
+        for beat in np.arange(0.0, seconds, 60.0 / bpm):
+            at = int(beat * sr)
+            end = min(at + len(click), len(y))
+            y[at:end] += gain * click[:end - at]
+        path = os.path.join(out_dir, f"clip_{i:04d}.mp3")
+        sf.write(path, np.clip(y, -1.0, 1.0).astype(np.float32), sr, format="MP3")
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "--clips":
+        out = write_audio_clips(args[1], int(args[2]), seed=int(args[3]) if len(args) > 3 else 0)
+        print(f"Wrote {len(out)} clips to {args[1]}")
+    else:
+        write_features_csv(args[0], int(args[1]), int(args[2]) if len(args) > 2 else 0)
+        print(f"Wrote {args[1]} songs to {args[0]}")
@@ -0,0 +1,399 @@
+import argparse
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple
+
+import metrics
+from greedy_engine import greedy_order
+from playlist_refine import transition_costs
+
+# ===============================================================
+# Smart Playlist Generator: cluster-partitioned greedy playlists
+# Description:
+#   One greedy walk over a million songs is a long serial loop.  The
+#   hierarchical mode splits it into independent walks:
+#
+#   1. Partition the tempo / mood / energy space into clusters, by
+#      k-means (k-means++ seeding and Lloyd's algorithm on a sample) or
+#      by a grid of quantile buckets.
+#   2. Order the clusters by a nearest-neighbour walk over their
+#      centroids, starting with the cluster of the first song.
+#   3. Pick each cluster's entry song: the song of the next cluster
+#      closest to the previous cluster (its side of the closest pair
+#      between the two) becomes the next cluster's first song.  Only
+#      the entry is fixed; the previous cluster's walk ends wherever
+#      its greedy walk ends, so the join is usually longer than that
+#      pair's distance.
+#   4. Run the greedy walk (greedy_engine.greedy_order) inside each
+#      cluster from its entry song, in parallel worker processes
+#      (their metrics are merged back, as in score.py), and
+#      concatenate the walks in cluster order.
+#
+#   Distances are the L1 feature_distance() of greedy_engine (pass
+#   DistanceCache.weighted(features) for the weighted metric).  The
+#   result is not the flat greedy order: walks cannot cross cluster
+#   borders, which costs a little smoothness at each of the k - 1
+#   joins; compare_with_flat() measures both.
+# ===============================================================
+
+PARTITIONS = ("kmeans", "grid")
+
+DEFAULT_CLUSTERS = 64
+
+# Lloyd iterations at most (stops earlier once no song changes cluster)
+KMEANS_ITERATIONS = 20
+
+# Songs k-means fits its centroids on (all songs are assigned afterwards)
+KMEANS_SAMPLE = 20000
+
+# Rows per block of the k-means assignment step
+ASSIGN_BLOCK = 1 << 16
+
+# Songs per side compared when looking for the closest boundary pair
+BOUNDARY_CANDIDATES = 256
+
+
+class Partition(NamedTuple):
+    """Clusters of a feature matrix."""
+    labels: np.ndarray          # cluster of every song, -1 for missing features
+    centroids: np.ndarray       # (3, k) mean features per cluster
+
+
+class CompareResult(NamedTuple):
+    """Outcome of compare_with_flat()."""
+    flat_cost: float            # total transition cost of the flat greedy order
+    flat_seconds: float
+    cluster_cost: float
+    cluster_seconds: float
+    clusters: int
+    workers: int
+
+
+# 1) PARTITION
+
+
+def _relabel(labels: np.ndarray, X: np.ndarray, valid: np.ndarray) -> Partition:
+    """Number the non-empty clusters 0..k-1 and compute their centroids."""
+    used, dense = np.unique(labels, return_inverse=True)
+    counts = np.bincount(dense, minlength=len(used))
+    centroids = np.vstack([np.bincount(dense, weights=X[:, f], minlength=len(used)) / counts
+                           for f in range(X.shape[1])])
+    out = np.full(len(valid), -1, dtype=np.intp)
+    out[valid] = dense
+    return Partition(out, centroids)
+
+
+def _assign(X: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (squared L2) of every row of X, by blocks of rows."""
+    labels = np.empty(len(X), dtype=np.intp)
+    c_sq = (centroids ** 2).sum(axis=0)
+    for lo in range(0, len(X), ASSIGN_BLOCK):
+        block = X[lo : lo + ASSIGN_BLOCK]
+        # |x - c|^2 without the |x|^2 term, which does not change the argmin
+        labels[lo : lo + ASSIGN_BLOCK] = (c_sq - 2.0 * block @ centroids).argmin(axis=1)
+    return labels
+
+
+def kmeans(features: np.ndarray, clusters: int, seed: int = 0,
+           iterations: int = KMEANS_ITERATIONS) -> Partition:
+    """
+    k-means clusters of the songs (columns) of a feature matrix.
+
+    Seeds with k-means++ and runs Lloyd's algorithm on up to
+    KMEANS_SAMPLE songs, then assigns every song to its nearest
+    centroid.  Songs with a missing feature get label -1; clusters
+    that end up empty are dropped.
+    """
+    valid = ~np.isnan(features).any(axis=0)
+    X = np.ascontiguousarray(features[:, valid].T)
+    if len(X) == 0:
+        return Partition(np.full(features.shape[1], -1, dtype=np.intp), np.empty((3, 0)))
+    k = max(1, min(int(clusters), len(X)))
+    rng = np.random.default_rng(seed)
+    sample = X[rng.choice(len(X), min(len(X), KMEANS_SAMPLE), replace=False)]
+
+    # k-means++: each next seed is drawn with probability ~ squared distance
+    seeds = [sample[rng.integers(len(sample))]]
+    nearest = ((sample - seeds[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = nearest.sum()
+        pick = rng.choice(len(sample), p=nearest / total) if total > 0 else rng.integers(len(sample))
+        seeds.append(sample[pick])
+        nearest = np.minimum(nearest, ((sample - sample[pick]) ** 2).sum(axis=1))
+    centroids = np.array(seeds).T
+
+    labels = _assign(sample, centroids)
+    for _ in range(iterations):
+        counts = np.bincount(labels, minlength=k)
+        sums = np.vstack([np.bincount(labels, weights=sample[:, f], minlength=k)
+                          for f in range(sample.shape[1])])
+        # An emptied cluster keeps its old centroid
+        filled = counts > 0
+        centroids[:, filled] = sums[:, filled] / counts[filled]
+        new = _assign(sample, centroids)
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    return _relabel(_assign(X, centroids), X, valid)
+
+
+def _grid_bins(spread: np.ndarray, clusters: int) -> np.ndarray:
+    """
+    Bins per feature, about 'clusters' in total, in proportion to each
+    feature's spread so cells measure about the same along every
+    feature; features too narrow for two bins get one.
+    """
+    bins = np.ones(len(spread), dtype=np.int64)
+    active = spread > 0
+    while active.any():
+        side = (clusters / np.prod(spread[active])) ** (1.0 / active.sum())
+        narrow = active & (spread * side < 1.0)
+        if not narrow.any():
+            bins[active] = np.maximum(1, np.round(spread[active] * side)).astype(np.int64)
+            break
+        active &= ~narrow
+    return bins
+
+
+def grid_partition(features: np.ndarray, clusters: int) -> Partition:
+    """
+    Grid buckets: each feature cut at its quantiles into equal-count
+    bins (more bins for features that spread wider, see _grid_bins()),
+    about 'clusters' cells in total; every non-empty cell is a cluster.
+    """
+    valid = ~np.isnan(features).any(axis=0)
+    X = np.ascontiguousarray(features[:, valid].T)
+    if len(X) == 0:
+        return Partition(np.full(features.shape[1], -1, dtype=np.intp), np.empty((3, 0)))
+    bins = _grid_bins(X.std(axis=0), max(int(clusters), 1))
+    cells = np.zeros(len(X), dtype=np.int64)
+    for f in range(X.shape[1]):
+        edges = np.quantile(X[:, f], np.linspace(0.0, 1.0, bins[f] + 1)[1:-1])
+        cells = cells * bins[f] + np.searchsorted(edges, X[:, f], side="right")
+    return _relabel(cells, X, valid)
+
+
+def partition_features(features: np.ndarray, clusters: int = DEFAULT_CLUSTERS,
+                       method: str = "kmeans", seed: int = 0) -> Partition:
+    """
+    Partition the songs of a (3, n) feature matrix into clusters.
+
+    Raises:
+        ValueError: For an unknown method or clusters < 1
+    """
+    if method not in PARTITIONS:
+        raise ValueError(f"partition must be one of: {', '.join(PARTITIONS)}")
+    if int(clusters) < 1:
+        raise ValueError("clusters must be at least 1")
+    with metrics.stage(f"cluster_greedy.partition:{method}"):
+        if method == "kmeans":
+            return kmeans(features, clusters, seed)
+        return grid_partition(features, clusters)
+
+
+# 2) CLUSTER ORDER AND BOUNDARY SONGS
+
+
+def cluster_order(centroids: np.ndarray, first: int) -> List[int]:
+    """Nearest-neighbour walk (L1) over the centroids, starting at cluster 'first'."""
+    k = centroids.shape[1]
+    left = np.ones(k, dtype=bool)
+    order = [int(first)]
+    left[first] = False
+    for _ in range(1, k):
+        dist = np.abs(centroids - centroids[:, order[-1], None]).sum(axis=0)
+        dist[~left] = np.inf
+        nxt = int(dist.argmin())
+        order.append(nxt)
+        left[nxt] = False
+    return order
+
+
+def _closest_to(features: np.ndarray, members: np.ndarray, point: np.ndarray) -> np.ndarray:
+    """Up to BOUNDARY_CANDIDATES members nearest (L1) to 'point'."""
+    dist = np.abs(features[:, members] - point[:, None]).sum(axis=0)
+    if len(members) <= BOUNDARY_CANDIDATES:
+        return members
+    return members[np.argpartition(dist, BOUNDARY_CANDIDATES - 1)[:BOUNDARY_CANDIDATES]]
+
+
+def boundary_entries(features: np.ndarray, members: List[np.ndarray], centroids: np.ndarray,
+                     chain: List[int], start_pos: int) -> List[int]:
+    """
+    First song of every cluster in 'chain'.
+
+    The first cluster starts at start_pos; each later one at its side
+    of the closest pair between it and the cluster before, searched
+    among the songs of each side nearest the other's centroid.  Only
+    the entry is used: the walk of the cluster before is not made to
+    end at the other side of the pair.
+    """
+    entries = [int(start_pos)]
+    for prev, cur in zip(chain, chain[1:]):
+        a = _closest_to(features, members[prev], centroids[:, cur])
+        b = _closest_to(features, members[cur], centroids[:, prev])
+        dist = np.abs(features[:, a][:, :, None] - features[:, b][:, None, :]).sum(axis=0)
+        entries.append(int(b[np.unravel_index(dist.argmin(), dist.shape)[1]]))
+    return entries
+
+
+# 3) PARALLEL WALKS
+
+
+def walk_cluster(features: np.ndarray, entry: int, method: str = "auto") -> List[int]:
+    """
+    Greedy order of one cluster's (3, m) features from local position 'entry'.
+
+    Runs inside pool workers, so it must stay a top-level function.
+    """
+    with metrics.stage("cluster_greedy.walk"):
+        order = greedy_order(features, entry, method)
+    metrics.count("cluster_greedy.walk_songs", len(order))
+    return order
+
+
+def walk_cluster_task(features: np.ndarray, entry: int, method: str = "auto"):
+    """
+    walk_cluster() in a pool worker: returns (order, metrics snapshot),
+    the worker's numbers so far (None unless it collects metrics).
+    """
+    order = walk_cluster(features, entry, method)
+    return order, metrics.snapshot(reset=True) if metrics.is_worker() else None
+
+
+def cluster_greedy_order(features: np.ndarray, start_pos: int, clusters: int = DEFAULT_CLUSTERS,
+                         workers: int = 1, partition: str = "kmeans", method: str = "auto",
+                         seed: int = 0) -> List[int]:
+    """
+    Greedy playlist order built cluster by cluster.
+
+    Args:
+        features (np.ndarray): (3, n) matrix from greedy_engine.feature_matrix()
+            (or DistanceCache.weighted(features))
+        start_pos (int): Position of the first song
+        clusters (int): Number of clusters (k-means) or about that many
+            grid cells ("grid" keeps only non-empty cells)
+        workers (int): Worker processes for the cluster walks; 1 runs
+            them here, 0 uses one per CPU core
+        partition (str): "kmeans" or "grid"
+        method (str): greedy_engine method inside each cluster
+            ("auto", "brute" or "index")
+        seed (int): Seed of the k-means++ initialisation
+
+    Returns:
+        List[int]: Every position once, starting with start_pos; songs
+        with missing features come last, in table order (like
+        greedy_order())
+    """
+    n = features.shape[1]
+    if n == 0:
+        return []
+    if np.isnan(features[:, start_pos]).any():
+        # Every distance from the first song is missing: nothing to cluster around
+        return greedy_order(features, start_pos, method)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    part = partition_features(features, clusters, partition, seed)
+    labels = part.labels
+    k = part.centroids.shape[1]
+    by_cluster = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[by_cluster], np.arange(k + 1))
+    members = [by_cluster[bounds[c] : bounds[c + 1]] for c in range(k)]
+    missing = by_cluster[: np.searchsorted(labels[by_cluster], 0)]
+
+    with metrics.stage("cluster_greedy.stitch"):
+        chain = cluster_order(part.centroids, labels[start_pos])
+        entries = boundary_entries(features, members, part.centroids, chain, start_pos)
+
+    # (cluster, sub-matrix, local entry), largest first to balance the pool
+    tasks = []
+    for c, entry in zip(chain, entries):
+        local = int(np.searchsorted(members[c], entry))
+        tasks.append((c, np.ascontiguousarray(features[:, members[c]]), local))
+    tasks.sort(key=lambda t: -t[1].shape[1])
+
+    walks = {}
+    with metrics.stage("cluster_greedy.walks"):
+        if workers <= 1 or len(tasks) == 1:
+            for c, sub, local in tasks:
+                walks[c] = walk_cluster(sub, local, method)
+        else:
+            init = metrics.start_worker if metrics.enabled() else None
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=init) as pool:
+                futures = {pool.submit(walk_cluster_task, sub, local, method): c
+                           for c, sub, local in tasks}
+                for fut, c in futures.items():
+                    walks[c], snap = fut.result()
+                    metrics.merge(snap)
+    metrics.count("cluster_greedy.clusters", k)
+
+    order = [members[c][walks[c]] for c in chain]
+    return np.concatenate(order + [missing]).tolist()
+
+
+# 4) COMPARISON WITH THE FLAT WALK
+
+
+def compare_with_flat(features: np.ndarray, start_pos: int, clusters: int = DEFAULT_CLUSTERS,
+                      workers: int = 1, partition: str = "kmeans", method: str = "auto",
+                      seed: int = 0) -> CompareResult:
+    """
+    Total transition cost and wall time of cluster_greedy_order() next
+    to the flat greedy_order() on the same songs.
+    """
+    t0 = time.perf_counter()
+    flat = greedy_order(features, start_pos, method)
+    flat_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    order = cluster_greedy_order(features, start_pos, clusters, workers, partition, method, seed)
+    cluster_seconds = time.perf_counter() - t0
+
+    # Both orders end with the songs with missing features; skip their NaN transitions
+    return CompareResult(float(np.nansum(transition_costs(features, flat))), flat_seconds,
+                         float(np.nansum(transition_costs(features, order))), cluster_seconds,
+                         clusters, os.cpu_count() or 1 if workers == 0 else workers)
+
+
+def print_comparison(result: CompareResult) -> None:
+    ratio = result.cluster_cost / result.flat_cost if result.flat_cost else float("nan")
+    speedup = result.flat_seconds / max(result.cluster_seconds, 1e-12)
+    print(f" Flat greedy:      transition cost {result.flat_cost:.2f}, {result.flat_seconds:.3f}s")
+    print(f" Clustered greedy: transition cost {result.cluster_cost:.2f} ({ratio:.3f}x), "
+          f"{result.cluster_seconds:.3f}s ({speedup:.2f}x speed-up; "
+          f"{result.clusters} clusters, {result.workers} workers)")
+
+
+# 5) CLI
+
+
+if __name__ == "__main__":
+    from distance_cache import weighted_features
+    from playlist_extend import PLAYLIST_COLUMNS
+    from songs import recommended_sort
+    from sorted_index import load_indexed_table
+
+    parser = argparse.ArgumentParser(description="Cluster-partitioned greedy playlist.")
+    parser.add_argument("features_path", help="features CSV or binary song store")
+    parser.add_argument("out_csv")
+    parser.add_argument("--clusters", type=int, default=DEFAULT_CLUSTERS)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="worker processes (0 = one per CPU core)")
+    parser.add_argument("--partition", default="kmeans", choices=PARTITIONS)
+    parser.add_argument("--compare", action="store_true",
+                        help="also run the flat greedy walk and report cost and time")
+    args = parser.parse_args()
+
+    songs = recommended_sort(load_indexed_table(args.features_path))
+    start = songs.start_position(start_strategy="low_energy")
+    # Normalized, weighted distance, like the other entry points
+    features = weighted_features(songs.feature_matrix())
+    if args.compare:
+        print_comparison(compare_with_flat(features, start, args.clusters, args.workers,
+                                           args.partition))
+    order = cluster_greedy_order(features, start, args.clusters, args.workers, args.partition)
+    songs.take(order).save_csv(args.out_csv, columns=PLAYLIST_COLUMNS)
+    print(f" {len(order)} songs -> {args.out_csv}")
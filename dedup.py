@@ -0,0 +1,302 @@
+import argparse
+import csv
+import numpy as np
+from typing import Dict, List, NamedTuple
+
+import metrics
+from song_table import SongTable
+
+# ===============================================================
+# Smart Playlist Generator: near-duplicate detection
+# Description:
+#   Re-uploads and alternate encodings of one song ("... Official
+#   Music Video.mp3" next to the album track) get almost the same
+#   features, so greedy_playlist() plays them back to back (their
+#   distance is ~0).  This module finds them without comparing every
+#   pair of songs:
+#
+#   - Locality-sensitive hashing: each of HASH_TABLES hash tables cuts
+#     tempo / mood / energy / duration into cells of CELL_FACTOR times
+#     the tolerance, shifted by a random offset per table.  Songs
+#     closer than the tolerance share a cell in a table with
+#     probability prod(1 - diff / cell) (1 for exact copies), and the
+#     random shifts make a miss in every table unlikely.
+#   - Confirmation: songs sharing a cell are candidates; a candidate
+#     pair is a duplicate when every feature differs by at most its
+#     tolerance.
+#   - Groups: duplicates are joined transitively (connected
+#     components), and the first song of each group in table order is
+#     the one kept.
+#
+#   Hashing is a sort per table and confirmation is linear in the
+#   number of candidate pairs, so a library costs O(n log n) instead
+#   of the O(n^2) of method="brute" (the exact pairwise reference).
+# ===============================================================
+
+DEDUP_FIELDS = ("tempo", "mood", "energy", "duration")
+
+# Largest difference per feature that still counts as the same song.
+# score() quantizes tempo to tempogram bins, so copies of one song
+# usually agree exactly; durations of re-encodings differ by padding.
+DEFAULT_TOLERANCES = {"tempo": 1.0, "mood": 0.01, "energy": 0.02, "duration": 2.0}
+
+# Cell width = CELL_FACTOR * tolerance.  With 6 shifted tables a pair
+# at half the tolerance on every feature is found with ~98% probability
+# (1 - (1 - (5/6)^4)^6), exact copies always; wider cells or fewer
+# tables trade recall for fewer candidate pairs
+CELL_FACTOR = 3.0
+HASH_TABLES = 6
+
+# Rows per block of the brute-force reference
+BRUTE_BLOCK = 1024
+
+# Column order of save_report()
+REPORT_COLUMNS = ("group", "kept", "file") + DEDUP_FIELDS
+
+
+class DedupResult(NamedTuple):
+    """Outcome of find_duplicates()."""
+    groups: List[np.ndarray]    # row positions per group, ascending; [0] is kept
+    candidates: int             # pairs compared (sharing an LSH cell)
+    pairs: int                  # confirmed duplicate pairs
+
+
+# 1) TOLERANCES
+
+
+def parse_tolerance(text: str):
+    """
+    Parse "duration=30" style text into (field, tolerance).
+
+    Raises:
+        ValueError: If the field is unknown or the value is not a number >= 0
+    """
+    field, sep, value = text.partition("=")
+    field = field.strip()
+    if not sep or field not in DEDUP_FIELDS:
+        raise ValueError(f"tolerance must look like 'duration=30' with a field of: "
+                         f"{', '.join(DEDUP_FIELDS)}")
+    tol = float(value)
+    if not tol >= 0:
+        raise ValueError(f"tolerance must be >= 0, got '{value}'")
+    return field, tol
+
+
+def _tolerances(tolerances: Dict[str, float] = None) -> np.ndarray:
+    tol = dict(DEFAULT_TOLERANCES)
+    for field, value in (tolerances or {}).items():
+        if field not in DEDUP_FIELDS:
+            raise ValueError(f"tolerance field must be one of: {', '.join(DEDUP_FIELDS)}")
+        tol[field] = float(value)
+    return np.array([tol[f] for f in DEDUP_FIELDS], dtype=np.float64)
+
+
+def _feature_columns(table: SongTable) -> np.ndarray:
+    """(4, n) float64 matrix of DEDUP_FIELDS."""
+    return np.vstack([table.column(f) for f in DEDUP_FIELDS]).astype(np.float64)
+
+
+def _confirm(x: np.ndarray, tol: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Positions i of the pairs (a[i], b[i]) (columns of x) within tolerance on every feature."""
+    keep = np.arange(len(a))
+    for f in range(len(tol)):
+        # Each feature only checks the pairs that passed the ones before
+        keep = keep[np.abs(x[f, a[keep]] - x[f, b[keep]]) <= tol[f]]
+    return keep
+
+
+# 2) CANDIDATE PAIRS
+
+
+def _lsh_pairs(x: np.ndarray, rows: np.ndarray, tol: np.ndarray, tables: int, seed: int):
+    """Confirmed pairs (a < b) among 'rows' and the number of candidates."""
+    rng = np.random.default_rng(seed)
+    if len(rows) < 2:
+        return [], [], 0
+    # A zero tolerance still gets a (tiny) cell so exact copies collide
+    width = CELL_FACTOR * np.maximum(tol, 1e-9)
+    found_a, found_b, candidates = [], [], 0
+
+    for _ in range(tables):
+        offset = rng.uniform(0.0, width)
+        cells = np.floor((x[:, rows] + offset[:, None]) / width[:, None]).astype(np.int64)
+        cells -= cells.min(axis=1, keepdims=True)
+        # One integer key per cell (mixed radix), or row-wise keys if it would overflow
+        spans = [int(s) + 1 for s in cells.max(axis=1)]
+        if np.prod([float(s) for s in spans]) < 2.0 ** 62:
+            key = np.ravel_multi_index(tuple(cells), spans)
+        else:
+            key = np.unique(cells.T, axis=0, return_inverse=True)[1].ravel()
+        order = np.argsort(key)
+        key = key[order]
+        members = rows[order]
+        # Features in cell order, so candidates are compared near each other in memory
+        xs = x[:, members]
+
+        # Pairs (i, i + d) of the sorted keys in the same cell, for
+        # growing d; a cell of size m yields its m(m-1)/2 pairs
+        starts = np.arange(len(key) - 1)
+        d = 1
+        while len(starts):
+            starts = starts[key[starts] == key[starts + d]]
+            if not len(starts):
+                break
+            candidates += len(starts)
+            ok = starts[_confirm(xs, tol, starts, starts + d)]
+            a, b = members[ok], members[ok + d]
+            found_a.append(np.minimum(a, b))
+            found_b.append(np.maximum(a, b))
+            d += 1
+            starts = starts[starts + d < len(key)]
+
+    return found_a, found_b, candidates
+
+
+def _brute_pairs(x: np.ndarray, rows: np.ndarray, tol: np.ndarray):
+    """Every confirmed pair (a < b) among 'rows', by blocks of BRUTE_BLOCK rows."""
+    found_a, found_b = [], []
+    for lo in range(0, len(rows), BRUTE_BLOCK):
+        block = rows[lo : lo + BRUTE_BLOCK]
+        rest = rows[lo:]
+        ok = np.ones((len(block), len(rest)), dtype=bool)
+        for f in range(len(tol)):
+            ok &= np.abs(x[f, block][:, None] - x[f, rest][None, :]) <= tol[f]
+        i, j = np.nonzero(ok)
+        keep = j > i
+        found_a.append(block[i[keep]])
+        found_b.append(rest[j[keep]])
+    return found_a, found_b, len(rows) * (len(rows) - 1) // 2
+
+
+# 3) GROUPS
+
+
+def _components(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Smallest row position of the connected component of every row."""
+    label = np.arange(n)
+    while True:
+        # Hook the larger root of every pair to the smaller one, then
+        # compress paths until every row points at its root
+        la, lb = label[a], label[b]
+        low = np.minimum(la, lb)
+        if np.array_equal(la, lb):
+            return label
+        np.minimum.at(label, la, low)
+        np.minimum.at(label, lb, low)
+        while True:
+            nxt = label[label]
+            if np.array_equal(nxt, label):
+                break
+            label = nxt
+
+
+def find_duplicates(table: SongTable, tolerances: Dict[str, float] = None,
+                    method: str = "lsh", tables: int = HASH_TABLES, seed: int = 0) -> DedupResult:
+    """
+    Groups of near-duplicate songs.
+
+    Args:
+        table (SongTable): Songs
+        tolerances (Dict[str, float]): Largest difference per feature
+            that still counts as a duplicate; missing fields use
+            DEFAULT_TOLERANCES
+        method (str): "lsh" (hashed candidates, ~linear) or "brute"
+            (every pair, exact, O(n^2))
+        tables (int): Number of LSH hash tables; more find more of the
+            pairs near the tolerance, at proportional cost
+        seed (int): Seed of the LSH cell offsets
+
+    Returns:
+        DedupResult: Groups of two or more row positions, ordered by
+        their first song; rows with a NaN feature are never grouped
+
+    Raises:
+        ValueError: For an unknown method or tolerance field
+    """
+    if method not in ("lsh", "brute"):
+        raise ValueError('method must be "lsh" or "brute"')
+    tol = _tolerances(tolerances)
+    x = _feature_columns(table)
+    rows = np.flatnonzero(~np.isnan(x).any(axis=0))
+
+    with metrics.stage(f"find_duplicates:{method}"):
+        if method == "lsh":
+            found_a, found_b, candidates = _lsh_pairs(x, rows, tol, tables, seed)
+        else:
+            found_a, found_b, candidates = _brute_pairs(x, rows, tol)
+        a = np.concatenate(found_a) if found_a else np.empty(0, dtype=np.intp)
+        b = np.concatenate(found_b) if found_b else np.empty(0, dtype=np.intp)
+        # A pair found in several hash tables counts once
+        n = len(table)
+        pair_codes = np.unique(a.astype(np.int64) * n + b)
+        a, b = pair_codes // n, pair_codes % n
+
+        label = _components(n, a, b)
+        grouped = np.flatnonzero(label != np.arange(n))
+        roots = np.unique(label[grouped])
+        members = np.sort(np.concatenate([roots, grouped]))
+        # Rows of one group next to each other, groups by first row
+        members = members[np.argsort(label[members], kind="stable")]
+        bounds = np.flatnonzero(np.diff(label[members])) + 1
+        groups = np.split(members, bounds) if len(members) else []
+
+    metrics.count("duplicates.candidates", candidates)
+    metrics.count("duplicates.removed", len(members) - len(groups))
+    return DedupResult(groups, candidates, len(pair_codes))
+
+
+# 4) FILTER AND REPORT
+
+
+def dedup_table(table: SongTable, tolerances: Dict[str, float] = None,
+                method: str = "lsh", tables: int = HASH_TABLES, seed: int = 0):
+    """
+    Drop all but the first song of every duplicate group.
+
+    Returns:
+        (SongTable, DedupResult): The remaining songs in their original
+        order, and the groups that were found
+    """
+    result = find_duplicates(table, tolerances, method, tables, seed)
+    keep = np.ones(len(table), dtype=bool)
+    for group in result.groups:
+        keep[group[1:]] = False
+    return table.take(np.flatnonzero(keep)), result
+
+
+def save_report(table: SongTable, groups: List[np.ndarray], filename: str) -> None:
+    """Write one CSV row per grouped song (REPORT_COLUMNS); 'kept' marks the first."""
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        for g, group in enumerate(groups, 1):
+            for pos, i in enumerate(group.tolist()):
+                writer.writerow([g, "yes" if pos == 0 else "no", table.file(i)]
+                                + [table.column(f)[i] for f in DEDUP_FIELDS])
+
+
+# 5) CLI
+
+
+if __name__ == "__main__":
+    from songs import save_csv
+    from sorted_index import load_indexed_table
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate songs in a features file.")
+    parser.add_argument("features_path", help="features CSV or binary song store")
+    parser.add_argument("report_csv", help="duplicate groups, one row per song")
+    parser.add_argument("--out", default=None, help="also save the library without duplicates")
+    parser.add_argument("--tol", action="append", default=[], type=parse_tolerance,
+                        help='tolerance like "duration=30" (repeatable)')
+    parser.add_argument("--method", default="lsh", choices=("lsh", "brute"))
+    parser.add_argument("--tables", type=int, default=HASH_TABLES)
+    args = parser.parse_args()
+
+    songs = load_indexed_table(args.features_path)
+    unique, result = dedup_table(songs, dict(args.tol), args.method, args.tables)
+    save_report(songs, result.groups, args.report_csv)
+    print(f" {len(result.groups)} duplicate groups, {len(songs) - len(unique)} songs removable "
+          f"({result.candidates} candidate pairs) -> {args.report_csv}")
+    if args.out:
+        save_csv(unique, args.out)
+        print(f" {len(unique)} of {len(songs)} songs -> {args.out}")
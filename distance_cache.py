@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import struct
+import numpy as np
+from typing import Dict, Sequence
+
+# ===============================================================
+# Smart Playlist Generator: weighted pairwise distance cache
+# Description:
+#   feature_distance() adds raw BPM differences (tens) to mood and
+#   energy differences (0-1), so tempo decides almost every step.
+#   This module exposes the weighted distance of the notebook version,
+#
+#       d(a, b) = sum over f of  weight[f] * |a[f] - b[f]| / range[f]
+#
+#   with each feature divided by its range over the library
+#   (normalize=True), and stores it for the whole library once as a
+#   condensed float32 matrix (upper triangle, like scipy's pdist) in a
+#   file that is memory-mapped on later runs.
+#
+#   The file records the weights, normalization and a hash of the
+#   feature matrix; if any of them change, the cache is rebuilt.
+#   A matrix has n(n-1)/2 entries, so libraries above MAX_CACHE_SONGS
+#   are not cached: open_distance_cache() returns a WeightedMetric
+#   instead, which carries the same scales without the matrix, and
+#   the engines sequence weighted_features() with the regular walk.
+#   The metric never depends on the library size.
+# ===============================================================
+
+FEATURES = ("tempo", "mood", "energy")      # rows of greedy_engine.feature_matrix()
+DEFAULT_WEIGHTS = {"tempo": 1.0, "mood": 1.0, "energy": 1.0}
+
+# 20k songs -> 200M pairs -> 800 MB of float32
+MAX_CACHE_SONGS = 20000
+
+DIST_MAGIC = b"SONGDST\0"
+DIST_VERSION = 1
+_HEADER = struct.Struct("<8sIQQ")           # magic, version, n, metadata length
+
+
+def distance_cache_path(features_path: str) -> str:
+    return features_path + ".dist"
+
+
+# 1) WEIGHTS AND SCALING
+
+
+def feature_scales(features: np.ndarray, weights: Dict[str, float] = None,
+                   normalize: bool = True) -> np.ndarray:
+    """
+    Per-feature multipliers so that plain L1 on scaled features is the
+    weighted (normalized) distance.
+
+    Raises:
+        ValueError: For unknown feature names or negative weights
+    """
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    if set(weights) != set(FEATURES):
+        raise ValueError(f"weights must be given for: {', '.join(FEATURES)}")
+    if any(w < 0 for w in weights.values()):
+        raise ValueError("weights must not be negative")
+
+    scales = np.array([float(weights[f]) for f in FEATURES])
+    if normalize and features.shape[1]:
+        with np.errstate(invalid="ignore"):
+            spread = np.nanmax(features, axis=1) - np.nanmin(features, axis=1)
+        spread[~(spread > 0)] = 1.0
+        scales /= spread
+    return scales
+
+
+def weighted_features(features: np.ndarray, weights: Dict[str, float] = None,
+                      normalize: bool = True) -> np.ndarray:
+    """(3, n) feature matrix scaled by feature_scales()."""
+    return features * feature_scales(features, weights, normalize)[:, None]
+
+
+def features_digest(features: np.ndarray) -> str:
+    return hashlib.blake2b(np.ascontiguousarray(features).tobytes(), digest_size=16).hexdigest()
+
+
+def _row_start(n: int, i):
+    """Offset of pair (i, i+1) in the condensed matrix."""
+    return i * n - i * (i + 1) // 2
+
+
+# 2) DISTANCE CACHE
+
+
+class WeightedMetric:
+    """
+    The weighted metric of one library without a pairwise matrix.
+
+    Accepted wherever a DistanceCache is: the greedy engines then walk
+    weighted(features) with plain L1 (see greedy_engine.greedy_orders()).
+
+    Attributes:
+        n (int): Number of songs
+        meta (dict): weights, normalize and scales
+    """
+
+    cached = False
+
+    def __init__(self, n: int, meta: Dict):
+        self.n = n
+        self.meta = meta
+
+    @classmethod
+    def of(cls, features: np.ndarray, weights: Dict[str, float] = None,
+           normalize: bool = True) -> "WeightedMetric":
+        return cls(features.shape[1], {
+            "weights": dict(DEFAULT_WEIGHTS, **(weights or {})),
+            "normalize": bool(normalize),
+            "scales": feature_scales(features, weights, normalize).tolist(),
+        })
+
+    @property
+    def scales(self) -> np.ndarray:
+        return np.array(self.meta["scales"])
+
+    def weighted(self, features: np.ndarray) -> np.ndarray:
+        """The metric as a scaled feature matrix (e.g. for refine_order())."""
+        return features * self.scales[:, None]
+
+
+class DistanceCache(WeightedMetric):
+    """
+    Condensed float32 distance matrix of one library (memory-mapped).
+
+    Attributes:
+        n (int): Number of songs
+        meta (dict): weights, normalize, scales and digest of the features
+        condensed (np.ndarray): n(n-1)/2 distances, pairs (i, j) with i < j
+    """
+
+    cached = True
+
+    def __init__(self, n: int, meta: Dict, condensed: np.ndarray):
+        super().__init__(n, meta)
+        self.condensed = condensed
+        # Offset of pair (k, k+1) for every row k, minus k + 1: entry
+        # (k, i) is at _column_base[k] + i
+        k = np.arange(n, dtype=np.int64)
+        self._column_base = _row_start(n, k) - k - 1
+
+    def matches(self, features: np.ndarray, weights: Dict[str, float], normalize: bool) -> bool:
+        return (self.n == features.shape[1]
+                and self.meta["digest"] == features_digest(features)
+                and self.meta["weights"] == dict(DEFAULT_WEIGHTS, **(weights or {}))
+                and self.meta["normalize"] == bool(normalize))
+
+    def distance(self, i: int, j: int) -> float:
+        if i == j:
+            return 0.0
+        i, j = min(i, j), max(i, j)
+        return float(self.condensed[_row_start(self.n, i) + j - i - 1])
+
+    def rows(self, positions: Sequence[int], out: np.ndarray = None) -> np.ndarray:
+        """
+        Distances from each song in 'positions' to every song.
+
+        Returns:
+            np.ndarray: (len(positions), n) float32, zero on the diagonal
+        """
+        n = self.n
+        positions = np.atleast_1d(np.asarray(positions, dtype=np.int64))
+        if out is None:
+            out = np.empty((len(positions), n), dtype=np.float32)
+        for r, i in enumerate(positions.tolist()):
+            # Pairs (k, i) for k < i are spread over earlier rows
+            out[r, :i] = self.condensed[self._column_base[:i] + i]
+            out[r, i] = 0.0
+            start = _row_start(n, i)
+            out[r, i + 1:] = self.condensed[start:start + n - i - 1]
+        return out
+
+    # ---- build / open ----
+
+    @classmethod
+    def build(cls, features: np.ndarray, path: str, weights: Dict[str, float] = None,
+              normalize: bool = True) -> "DistanceCache":
+        """Compute the matrix for 'features' into 'path' (atomically) and map it."""
+        n = features.shape[1]
+        scaled = weighted_features(features, weights, normalize)
+        meta = dict(WeightedMetric.of(features, weights, normalize).meta,
+                    digest=features_digest(features))
+        meta_bytes = json.dumps(meta, sort_keys=True).encode("utf-8")
+        offset = _data_offset(len(meta_bytes))
+        m = n * (n - 1) // 2
+
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(DIST_MAGIC, DIST_VERSION, n, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(b"\0" * (offset - f.tell()))
+            f.truncate(offset + 4 * m)
+        if m:
+            out = np.memmap(tmp, dtype="<f4", mode="r+", offset=offset, shape=(m,))
+            row = np.empty(n, dtype=np.float64)
+            for i in range(n - 1):
+                # Same summation order as feature_distance(): tempo, mood, energy
+                d = row[:n - i - 1]
+                np.abs(scaled[0, i + 1:] - scaled[0, i], out=d)
+                d += np.abs(scaled[1, i + 1:] - scaled[1, i])
+                d += np.abs(scaled[2, i + 1:] - scaled[2, i])
+                start = _row_start(n, i)
+                out[start:start + len(d)] = d
+            out.flush()
+            del out
+        os.replace(tmp, path)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str) -> "DistanceCache":
+        """
+        Memory-map a cache file read-only.
+
+        Raises:
+            ValueError: If the file is not a current distance cache
+        """
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                raise ValueError(f"'{path}' is not a distance cache")
+            magic, version, n, meta_len = _HEADER.unpack(head)
+            if magic != DIST_MAGIC or version != DIST_VERSION:
+                raise ValueError(f"'{path}' is not a version {DIST_VERSION} distance cache")
+            meta = json.loads(f.read(meta_len).decode("utf-8"))
+        m = n * (n - 1) // 2
+        if m == 0:
+            return cls(n, meta, np.zeros(0, dtype=np.float32))
+        condensed = np.memmap(path, dtype="<f4", mode="r", offset=_data_offset(meta_len), shape=(m,))
+        return cls(n, meta, condensed)
+
+
+def _data_offset(meta_len: int) -> int:
+    return (_HEADER.size + meta_len + 7) & ~7
+
+
+# 3) OPEN OR BUILD
+
+
+def open_distance_cache(features: np.ndarray, path: str, weights: Dict[str, float] = None,
+                        normalize: bool = True, max_songs: int = MAX_CACHE_SONGS) -> WeightedMetric:
+    """
+    Map the cache at 'path', rebuilding it if the features, weights or
+    normalization differ from what it was built for.
+
+    Args:
+        features (np.ndarray): (3, n) matrix from greedy_engine.feature_matrix(),
+            in the row order the playlists are generated on
+        path (str): Cache file (see distance_cache_path())
+        weights (Dict[str, float]): Per-feature weights (default 1 each)
+        normalize (bool): Divide each feature by its range first
+        max_songs (int): Do not cache larger libraries
+
+    Returns:
+        DistanceCache, or for more than max_songs songs a WeightedMetric
+        (same metric, computed from scaled features instead of stored)
+    """
+    n = features.shape[1]
+    if n > max_songs:
+        print(f" Distance cache skipped: {n} songs > {max_songs} "
+              f"({n * (n - 1) // 2 * 4 / 2**20:.0f} MiB); using scaled features")
+        return WeightedMetric.of(features, weights, normalize)
+
+    if os.path.exists(path):
+        try:
+            cache = DistanceCache.open(path)
+            if cache.matches(features, weights, normalize):
+                return cache
+        except (OSError, ValueError) as e:
+            print(f"Warning: Rebuilding distance cache '{path}': {e}")
+    return DistanceCache.build(features, path, weights, normalize)
@@ -0,0 +1,187 @@
+import argparse
+import csv
+import heapq
+import os
+import sys
+import tempfile
+from typing import Iterator, List, Sequence
+
+from song_table import FIELDS, SongRow
+from sort_engine import sort_by_fields
+
+# ===============================================================
+# Smart Playlist Generator: external (out-of-core) sort
+# Description:
+#   Sorts a features CSV that does not fit in memory, with the same
+#   result as save_csv(recommended_sort(...)) / save_csv(custom_sort(...)):
+#
+#   1. The CSV is read in chunks whose estimated size stays under the
+#      memory budget; each chunk is sorted (sort_engine.sort_by_fields,
+#      stable) and written to a temporary run file.
+#   2. The runs are k-way merged with a heap into the output CSV.
+#      Ties are taken from the earlier run first, so the merge is
+#      stable and the output equals the in-memory ordering.
+#      More than MAX_FAN_IN runs are merged in several passes.
+#
+#   Rows with invalid numbers are skipped with a warning.  Keys that
+#   contain NaN are not ordered, so for such rows the position may
+#   differ from the in-memory merge sort.
+# ===============================================================
+
+SORT_FIELDS = ("mood", "tempo", "energy")
+RECOMMENDED_FIELDS = ("mood", "tempo", "energy")
+
+# Estimated bytes held per buffered row, on top of the path string:
+# row tuple, four floats, list slot and the sort's key arrays
+ROW_OVERHEAD = 280
+
+# Maximum number of run files merged at once (open file handles)
+MAX_FAN_IN = 64
+
+HEADER = ["file"] + list(FIELDS)
+
+
+# 1) READ CHUNKS
+
+
+def read_rows(csv_path: str) -> Iterator[SongRow]:
+    """Parse a features CSV row by row (same columns as load_songs())."""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                values = {field: float(row[field]) for field in FIELDS}
+            except (TypeError, ValueError) as e:
+                print(f"Warning: Skipping row with invalid data: {row}. Error: {e}")
+                continue
+            yield SongRow(row["file"], **values)
+
+
+def read_chunks(rows: Iterator[SongRow], memory_bytes: int) -> Iterator[List[SongRow]]:
+    """Group rows into lists whose estimated size stays under 'memory_bytes'."""
+    chunk, used = [], 0
+    for row in rows:
+        cost = ROW_OVERHEAD + sys.getsizeof(row.file)
+        if chunk and used + cost > memory_bytes:
+            yield chunk
+            chunk, used = [], 0
+        chunk.append(row)
+        used += cost
+    if chunk:
+        yield chunk
+
+
+# 2) RUN FILES
+
+
+def write_rows(rows, f) -> int:
+    """Write rows in save_csv() format (header + one line per song)."""
+    writer = csv.writer(f)
+    writer.writerow(HEADER)
+    count = 0
+    for s in rows:
+        writer.writerow([s.file, s.mood, s.tempo, s.energy, s.duration])
+        count += 1
+    return count
+
+
+def read_run(path: str) -> Iterator[SongRow]:
+    # Floats were written with repr(), so they parse back exactly
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for file, mood, tempo, energy, duration in reader:
+            yield SongRow(file, float(mood), float(tempo), float(energy), float(duration))
+
+
+def merge_runs(paths: Sequence[str], out, fields: Sequence[str], order: str) -> int:
+    """Stable k-way merge of sorted run files into the open file 'out'."""
+    factor = 1 if order == "asc" else -1
+
+    def key(s):
+        return tuple(factor * getattr(s, f) for f in fields)
+
+    # heapq.merge breaks ties by iterable position: earlier runs first
+    return write_rows(heapq.merge(*(read_run(p) for p in paths), key=key), out)
+
+
+# 3) EXTERNAL SORT
+
+
+def external_sort(csv_path: str, out_path: str, fields: Sequence[str] = RECOMMENDED_FIELDS,
+                  order: str = "asc", memory_mb: float = 256, tmp_dir: str = None) -> int:
+    """
+    Sort a features CSV by 'fields' using at most about 'memory_mb' MiB.
+
+    Args:
+        csv_path (str): Input features CSV (file, mood, tempo, energy, duration)
+        out_path (str): Output CSV, written in save_csv() format
+        fields (Sequence[str]): Sort keys, first most significant;
+            ("mood", "tempo", "energy") is recommended_sort(), one
+            field is custom_sort()
+        order (str): "asc" or "desc"
+        memory_mb (float): Budget for the rows buffered per chunk
+        tmp_dir (str): Where to put the run files (default: system temp)
+
+    Returns:
+        int: Number of songs written
+
+    Raises:
+        ValueError: If a field or the order is not supported
+    """
+    if not fields or any(f not in SORT_FIELDS for f in fields):
+        raise ValueError('fields must be taken from: "mood", "tempo", "energy"')
+    if order not in ("asc", "desc"):
+        raise ValueError('order must be "asc" or "desc"')
+    memory_bytes = max(int(memory_mb * 2**20), 1)
+
+    with tempfile.TemporaryDirectory(prefix="songsort-", dir=tmp_dir) as tmp:
+        runs = []
+        for chunk in read_chunks(read_rows(csv_path), memory_bytes):
+            path = os.path.join(tmp, f"run_{len(runs):06d}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                write_rows(sort_by_fields(chunk, fields, order), f)
+            runs.append(path)
+            del chunk
+        n_runs = len(runs)
+
+        # Merge consecutive groups until one pass can take all runs;
+        # keeping runs in input order keeps the merge stable
+        level = 0
+        while len(runs) > MAX_FAN_IN:
+            merged = []
+            for i in range(0, len(runs), MAX_FAN_IN):
+                group = runs[i:i + MAX_FAN_IN]
+                path = os.path.join(tmp, f"merge{level}_{len(merged):06d}.csv")
+                with open(path, "w", newline="", encoding="utf-8") as f:
+                    merge_runs(group, f, fields, order)
+                for p in group:
+                    os.remove(p)
+                merged.append(path)
+            runs = merged
+            level += 1
+
+        with open(out_path, "w", newline="", encoding="utf-8") as out:
+            count = merge_runs(runs, out, fields, order)
+
+    print(f" Sorted {count} songs in {n_runs} run(s) -> {out_path}")
+    return count
+
+
+# 4) CLI
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sort a features CSV larger than memory (recommended or custom sort).")
+    parser.add_argument("csv_path")
+    parser.add_argument("out_path")
+    parser.add_argument("--field", default="recommended", choices=("recommended",) + SORT_FIELDS,
+                        help='sort key: "recommended" (mood, tempo, energy) or one field')
+    parser.add_argument("--order", default="asc", choices=("asc", "desc"))
+    parser.add_argument("--memory-mb", type=float, default=256,
+                        help="memory budget for buffered rows (MiB)")
+    parser.add_argument("--tmp-dir", default=None, help="directory for temporary run files")
+    args = parser.parse_args()
+
+    fields = RECOMMENDED_FIELDS if args.field == "recommended" else (args.field,)
+    external_sort(args.csv_path, args.out_path, fields, args.order, args.memory_mb, args.tmp_dir)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, Optional
+
+# ===============================================================
+# Smart Playlist Analyzer: persistent feature cache
+# Description:
+#   Remembers the features score() extracted for each file, so a
+#   re-scan only analyses new or changed files.
+#
+#   - An entry is valid while the file's path, size and mtime match.
+#   - With use_hash, a file whose size/mtime changed (or that was
+#     moved/copied) is still reused when its content hash matches an
+#     entry, so the cache is content-addressed.
+#   - The analysis parameters (SR/HOP/SEG, scoring version) are
+#     stored with the cache; if they change, every entry is dropped.
+# ===============================================================
+
+FEATURE_COLUMNS = ("tempo", "energy", "mood", "duration")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash     TEXT,
+    tempo    REAL,
+    energy   REAL,
+    mood     REAL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash);
+"""
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """BLAKE2b digest of a file's contents."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class FeatureCache:
+    """
+    SQLite-backed cache of per-file feature rows.
+
+    All entries are read into memory when the cache is opened, so a
+    lookup costs one os.stat() and a dict access.  New results are
+    written with store() and committed by close().
+    """
+
+    def __init__(self, path: str, params: Dict, use_hash: bool = False):
+        self.path = path
+        self.use_hash = use_hash
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+
+        # Drop everything if the analysis parameters changed
+        params_json = json.dumps(params, sort_keys=True)
+        stored = self._db.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if stored is None or stored[0] != params_json:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('params', ?)", (params_json,))
+            self._db.commit()
+
+        self._entries = {}
+        self._by_hash = {}
+        for path_, size, mtime_ns, digest, *features in self._db.execute("SELECT * FROM entries"):
+            self._entries[path_] = (size, mtime_ns, digest, tuple(features))
+            if digest is not None:
+                self._by_hash[digest] = tuple(features)
+
+        # stat/hash of files that missed, remembered for store()
+        self._pending = {}
+
+    def lookup(self, path: str) -> Optional[Dict]:
+        """
+        Return the cached row for 'path', or None if it must be analysed.
+
+        Raises:
+            OSError: If the file cannot be stat'ed
+        """
+        st = os.stat(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return self._row(path, entry[3])
+
+        digest = None
+        if self.use_hash:
+            digest = file_hash(path)
+            features = self._by_hash.get(digest)
+            if features is not None:
+                self._put(path, st.st_size, st.st_mtime_ns, digest, features)
+                return self._row(path, features)
+
+        self._pending[path] = (st.st_size, st.st_mtime_ns, digest)
+        return None
+
+    def store(self, path: str, row: Dict) -> None:
+        """Remember the features of a freshly analysed file."""
+        stat = self._pending.pop(path, None)
+        if stat is None:
+            st = os.stat(path)
+            stat = (st.st_size, st.st_mtime_ns, file_hash(path) if self.use_hash else None)
+        self._put(path, *stat, tuple(float(row[c]) for c in FEATURE_COLUMNS))
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Drop entries for files not in 'keep' (deleted files). Returns how many."""
+        gone = set(self._entries) - set(keep)
+        for path in gone:
+            del self._entries[path]
+        self._db.executemany("DELETE FROM entries WHERE path = ?", ((p,) for p in gone))
+        return len(gone)
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+    def _put(self, path, size, mtime_ns, digest, features):
+        self._entries[path] = (size, mtime_ns, digest, features)
+        if digest is not None:
+            self._by_hash[digest] = features
+        self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (path, size, mtime_ns, digest, *features))
+
+    @staticmethod
+    def _row(path, features):
+        row = {"file": path}
+        row.update(zip(FEATURE_COLUMNS, features))
+        return row
@@ -0,0 +1,635 @@
+import hashlib
+import heapq
+import math
+import numpy as np
+from typing import Dict, Iterator, List, Tuple
+
+# ===============================================================
+# Smart Playlist Generator: NumPy engine for the greedy step
+# Description:
+#   The pandas greedy_playlist() rebuilds the candidate frame and
+#   calls feature_distance() row by row on every step.  This module
+#   keeps the tempo/mood/energy features in one contiguous array and
+#   does each step as a single vectorized L1 distance plus a masked
+#   argmin.  It returns exactly the same ordering as the pandas path.
+#
+#   For large libraries a KD-tree (FeatureIndex) answers "nearest
+#   unused song" without scanning every remaining candidate;
+#   greedy_order() switches between the two by library size, and
+#   greedy_orders() runs several walks over one shared matrix/index.
+# ===============================================================
+
+# Feature order matches the summation order in feature_distance():
+#   |tempo| + |mood| + |energy|
+FEATURES = ("tempo", "mood", "energy")
+
+# Songs per KD-tree leaf; leaves are scanned with one NumPy pass
+LEAF_SIZE = 64
+
+# Below this many songs the brute-force scan is faster than the index
+# (see benchmarks/bench_greedy_index.py)
+INDEX_MIN_SONGS = 10000
+
+# Streaming / limited walks (iter_greedy_order) scan this many songs
+# before building the index, so short playlists never pay for the tree
+LIMITED_INDEX_MIN_TRACKS = 64
+
+# Indexes built so far, keyed by a fingerprint of the feature matrix
+_INDEX_CACHE: Dict[Tuple[int, str], "FeatureIndex"] = {}
+_INDEX_CACHE_SIZE = 4
+
+
+# 1) FEATURE MATRIX
+
+
+def feature_matrix(df) -> np.ndarray:
+    """
+    Copy the distance features of a song table into one contiguous array.
+
+    Args:
+        df (pd.DataFrame): DataFrame with tempo, mood and energy columns
+
+    Returns:
+        np.ndarray: float64 array of shape (3, n); row k holds FEATURES[k]
+    """
+    return np.ascontiguousarray(df[list(FEATURES)].to_numpy(dtype=np.float64).T)
+
+
+# 2) VECTORIZED DISTANCE
+
+
+def distances_from(features: np.ndarray, pos, out: np.ndarray = None,
+                   scratch: np.ndarray = None) -> np.ndarray:
+    """
+    feature_distance() from song 'pos' to every song, in one pass.
+
+    The terms are added in the same order as feature_distance(), so the
+    results are bit-for-bit identical to the pandas reference.
+
+    Args:
+        features (np.ndarray): Matrix built by feature_matrix()
+        pos (int or array of int): Position(s) of the reference song(s)
+        out, scratch (np.ndarray): Optional buffers of the result shape to reuse
+
+    Returns:
+        np.ndarray: Distances of shape (n,), or (len(pos), n) for several songs
+    """
+    pos = np.asarray(pos)
+    shape = pos.shape + features.shape[1:]
+    if out is None:
+        out = np.empty(shape)
+    if scratch is None:
+        scratch = np.empty(shape)
+
+    np.subtract(features[0], features[0, pos][..., None], out=out)
+    np.abs(out, out=out)
+    for k in range(1, len(FEATURES)):
+        np.subtract(features[k], features[k, pos][..., None], out=scratch)
+        np.abs(scratch, out=scratch)
+        out += scratch
+    return out
+
+
+# 3) KD-TREE INDEX
+
+
+class FeatureIndex:
+    """
+    KD-tree over the feature matrix for L1 nearest-unused-song queries.
+
+    The tree itself is immutable and can be shared by any number of
+    walks; each walk (see start_walk()) keeps its own per-node counts of
+    songs that are still unused, so visited songs are deleted in
+    O(log n) and empty subtrees are skipped during a query.
+    """
+
+    def __init__(self, features: np.ndarray, leaf_size: int = LEAF_SIZE):
+        if np.isnan(features).any():
+            raise ValueError("FeatureIndex does not support missing features")
+
+        self.features = features
+        self.n = n = features.shape[1]
+        self.leaf_size = leaf_size
+
+        perm = np.arange(n)
+        self._lo: List[Tuple[float, ...]] = []
+        self._hi: List[Tuple[float, ...]] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._start: List[int] = []
+        self._end: List[int] = []
+        self._parent: List[int] = []
+        self._leaf_of = np.empty(n, dtype=np.intp)
+
+        if n > 0:
+            self._build(perm, 0, n, -1)
+
+        # Songs in leaf order, so every leaf is a contiguous slice
+        self._perm = perm
+        self._points = np.ascontiguousarray(features[:, perm])
+        self._rank = np.empty(n, dtype=np.intp)
+        self._rank[perm] = np.arange(n)
+        self._size = [e - s for s, e in zip(self._start, self._end)]
+
+    def _build(self, perm: np.ndarray, s: int, e: int, parent: int) -> int:
+        node = len(self._start)
+        sub = self.features[:, perm[s:e]]
+        self._lo.append(tuple(float(v) for v in sub.min(axis=1)))
+        self._hi.append(tuple(float(v) for v in sub.max(axis=1)))
+        self._start.append(s)
+        self._end.append(e)
+        self._parent.append(parent)
+        self._left.append(-1)
+        self._right.append(-1)
+
+        if e - s <= self.leaf_size:
+            self._leaf_of[perm[s:e]] = node
+            return node
+
+        # Split at the median of the widest dimension
+        dim = int(np.argmax(sub.max(axis=1) - sub.min(axis=1)))
+        mid = (s + e) // 2
+        part = np.argpartition(sub[dim], mid - s)
+        perm[s:e] = perm[s:e][part]
+        self._left[node] = self._build(perm, s, mid, node)
+        self._right[node] = self._build(perm, mid, e, node)
+        return node
+
+    def start_walk(self) -> "IndexWalk":
+        """Return fresh deletion state with every song still unused."""
+        return IndexWalk(self)
+
+    def query(self, point, k: int = 1) -> List[int]:
+        """
+        The k songs nearest to an arbitrary feature point (L1).
+
+        Args:
+            point: (tempo, mood, energy) values, in FEATURES order
+            k (int): Number of songs to return
+
+        Returns:
+            List[int]: Positions, nearest first (ties: lowest position)
+        """
+        q = tuple(float(v) for v in point)
+        best = []                       # max-heap of (-distance, -position)
+        stack = [(0.0, 0)] if self.n else []
+        while stack:
+            bound, node = stack.pop()
+            if len(best) == k and bound > -best[0][0]:
+                continue
+
+            if self._left[node] < 0:
+                s, e = self._start[node], self._end[node]
+                d = np.abs(self._points[0, s:e] - q[0])
+                d += np.abs(self._points[1, s:e] - q[1])
+                d += np.abs(self._points[2, s:e] - q[2])
+                for dist, pos in zip(d.tolist(), self._perm[s:e].tolist()):
+                    item = (-dist, -pos)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+                continue
+
+            children = []
+            for child in (self._left[node], self._right[node]):
+                clo, chi = self._lo[child], self._hi[child]
+                b = 0.0
+                for j in range(3):
+                    if q[j] < clo[j]:
+                        b += clo[j] - q[j]
+                    elif q[j] > chi[j]:
+                        b += q[j] - chi[j]
+                children.append((b, child))
+            if children[0][0] < children[1][0]:
+                children.reverse()
+            stack.extend(children)
+
+        return [-pos for _, pos in sorted(best, reverse=True)]
+
+
+class IndexWalk:
+    """Per-walk state of a FeatureIndex: which songs are already used."""
+
+    def __init__(self, index: FeatureIndex):
+        self.index = index
+        self.remaining = index.n
+        self._count = list(index._size)
+        self._used = np.zeros(index.n, dtype=bool)   # in leaf order
+
+    def remove(self, pos: int) -> None:
+        """Mark song 'pos' as used."""
+        index = self.index
+        rank = index._rank[pos]
+        if self._used[rank]:
+            return
+        self._used[rank] = True
+        self.remaining -= 1
+        node = int(index._leaf_of[pos])
+        while node >= 0:
+            self._count[node] -= 1
+            node = index._parent[node]
+
+    def nearest(self, pos: int) -> int:
+        """
+        Nearest unused song to song 'pos' under feature_distance().
+
+        Distances are computed exactly like distances_from(), and ties
+        go to the lowest position, so this agrees with the brute force
+        scan step for step.
+
+        Returns:
+            int: Position of the nearest unused song, or -1 if none is left
+        """
+        index = self.index
+        f = index.features
+        q = (float(f[0, pos]), float(f[1, pos]), float(f[2, pos]))
+        lo, hi = index._lo, index._hi
+        left, right = index._left, index._right
+        start, end = index._start, index._end
+        points, perm = index._points, index._perm
+        count, used = self._count, self._used
+
+        best_d = math.inf
+        best_p = -1
+        stack = [(0.0, 0)] if index.n else []
+
+        while stack:
+            bound, node = stack.pop()
+            if bound > best_d or count[node] == 0:
+                continue
+
+            if left[node] < 0:
+                s, e = start[node], end[node]
+                d = np.abs(points[0, s:e] - q[0])
+                d += np.abs(points[1, s:e] - q[1])
+                d += np.abs(points[2, s:e] - q[2])
+                if count[node] < e - s:
+                    d[used[s:e]] = np.inf
+                m = float(d.min())
+                if m <= best_d:
+                    cand = int(perm[s:e][d == m].min())
+                    if m < best_d or cand < best_p:
+                        best_d, best_p = m, cand
+                continue
+
+            # Push the farther child first so the nearer one is searched first
+            children = []
+            for child in (left[node], right[node]):
+                clo, chi = lo[child], hi[child]
+                b = 0.0
+                for k in range(3):
+                    if q[k] < clo[k]:
+                        b += clo[k] - q[k]
+                    elif q[k] > chi[k]:
+                        b += q[k] - chi[k]
+                children.append((b, child))
+            if children[0][0] < children[1][0]:
+                children.reverse()
+            stack.extend(children)
+
+        return best_p
+
+
+def get_index(features: np.ndarray) -> FeatureIndex:
+    """
+    Return the FeatureIndex for 'features', building it only once.
+
+    Indexes are cached by a hash of the feature values, so repeated
+    greedy_playlist() calls on the same table reuse the same tree.
+    """
+    key = (features.shape[1], hashlib.blake2b(features.tobytes(), digest_size=16).hexdigest())
+    index = _INDEX_CACHE.get(key)
+    if index is None:
+        index = FeatureIndex(features)
+        if len(_INDEX_CACHE) >= _INDEX_CACHE_SIZE:
+            _INDEX_CACHE.pop(next(iter(_INDEX_CACHE)))
+        _INDEX_CACHE[key] = index
+    return index
+
+
+# 4) GREEDY ORDER
+
+
+def greedy_order(features: np.ndarray, start_pos: int, method: str = "auto",
+                 distances=None) -> List[int]:
+    """
+    Nearest-neighbour ordering of all songs, starting from 'start_pos'.
+
+    Ties are broken towards the lowest position, like pandas idxmin(),
+    and songs with missing features are only picked once nothing else
+    is left (idxmin() skips NaN distances).
+
+    Time Complexity: O(n^2) with "brute", but each step is one NumPy pass;
+                     about O(n log n) with "index" on well-spread features
+    Space Complexity: O(n)
+
+    Args:
+        features (np.ndarray): Matrix built by feature_matrix()
+        start_pos (int): Position (0-based) of the first song
+        method (str): "brute" (vectorized scan), "index" (KD-tree) or
+                      "auto" (index from INDEX_MIN_SONGS songs upwards)
+        distances (DistanceCache): Optional precomputed distances, see greedy_orders()
+
+    Returns:
+        List[int]: Positions of the songs in playlist order
+    """
+    return greedy_orders(features, [start_pos], method, distances)[0]
+
+
+def greedy_orders(features: np.ndarray, start_positions: List[int],
+                  method: str = "auto", distances=None) -> List[List[int]]:
+    """
+    Run several greedy walks over the same library together.
+
+    All walks share one feature matrix (and one KD-tree for "index").
+    With "brute" they advance in lockstep, so each step is a single
+    (walks x n) NumPy pass instead of one pass per walk, and walks
+    with the same start are only computed once.
+
+    Args:
+        features (np.ndarray): Matrix built by feature_matrix()
+        start_positions (List[int]): First song of each walk
+        method (str): "brute", "index" or "auto", as in greedy_order()
+        distances (DistanceCache): Read distances from this precomputed
+            matrix (distance_cache.py) instead, scanning one row per step
+            ("auto" or "brute"; a KD-tree cannot walk a matrix, so
+            "index" raises ValueError).  A WeightedMetric (no matrix)
+            walks its scaled features with 'method'
+
+    Returns:
+        List[List[int]]: One ordering per start, in the order given
+    """
+    if method not in ("auto", "brute", "index"):
+        raise ValueError('method must be one of: "auto", "brute", "index"')
+
+    n = features.shape[1]
+    if n == 0:
+        return [[] for _ in start_positions]
+
+    features, distances = _resolve_distances(features, distances, method)
+
+    if method == "auto":
+        use_index = n >= INDEX_MIN_SONGS and not np.isnan(features).any()
+        method = "index" if use_index else "brute"
+
+    starts = list(dict.fromkeys(int(p) for p in start_positions))
+    if distances is not None:
+        orders = _cached_walks(distances, starts)
+    elif method == "index":
+        orders = _index_walks(features, starts)
+    else:
+        orders = _brute_walks(features, starts)
+
+    by_start = dict(zip(starts, orders))
+    return [list(by_start[int(p)]) for p in start_positions]
+
+
+def _resolve_distances(features: np.ndarray, distances, method: str):
+    """
+    (features, distances) to walk: a WeightedMetric becomes its scaled
+    features, a DistanceCache is kept for the row scans.
+
+    Raises:
+        ValueError: If the cache has another size, or for "index" with a cache
+    """
+    if distances is None:
+        return features, None
+    n = features.shape[1]
+    if distances.n != n:
+        raise ValueError(f"distance cache has {distances.n} songs, features have {n}")
+    if not distances.cached:
+        return distances.weighted(features), None
+    if method == "index":
+        raise ValueError('method "index" cannot walk a distance cache; use "auto" or "brute"')
+    return features, distances
+
+
+def _index_walks(features: np.ndarray, starts: List[int]) -> List[List[int]]:
+    index = get_index(features)
+    orders = []
+    for start in starts:
+        walk = index.start_walk()
+        current = start
+        order = [current]
+        walk.remove(current)
+        while walk.remaining:
+            current = walk.nearest(current)
+            order.append(current)
+            walk.remove(current)
+        orders.append(order)
+    return orders
+
+
+def _brute_walks(features: np.ndarray, starts: List[int]) -> List[List[int]]:
+    n = features.shape[1]
+    k = len(starts)
+    rows = np.arange(k)
+
+    # Used songs carry an infinite penalty; adding it is cheaper than
+    # a boolean-mask assignment on every step
+    has_nan = bool(np.isnan(features).any())
+    penalty = np.zeros((k, n))
+    dist = np.empty((k, n))
+    scratch = np.empty((k, n))
+    orders = np.empty((k, n), dtype=np.intp)
+
+    current = np.array(starts, dtype=np.intp)
+    orders[:, 0] = current
+    penalty[rows, current] = np.inf
+
+    for step in range(1, n):
+        distances_from(features, current, out=dist, scratch=scratch)
+        if has_nan:
+            dist[np.isnan(dist)] = np.inf
+        dist += penalty
+        current = dist.argmin(axis=1)
+        for r in np.flatnonzero(penalty[rows, current]):
+            # Only NaN rows remain: take them in table order
+            current[r] = np.flatnonzero(penalty[r] == 0)[0]
+        orders[:, step] = current
+        penalty[rows, current] = np.inf
+
+    return orders.tolist()
+
+
+def _cached_walks(distances, starts: List[int]) -> List[List[int]]:
+    # Same lockstep walk as _brute_walks(), with rows read from the cache
+    n = distances.n
+    k = len(starts)
+    rows = np.arange(k)
+
+    penalty = np.zeros((k, n), dtype=np.float32)
+    dist = np.empty((k, n), dtype=np.float32)
+    orders = np.empty((k, n), dtype=np.intp)
+
+    current = np.array(starts, dtype=np.intp)
+    orders[:, 0] = current
+    penalty[rows, current] = np.inf
+
+    for step in range(1, n):
+        distances.rows(current, out=dist)
+        dist[np.isnan(dist)] = np.inf
+        dist += penalty
+        current = dist.argmin(axis=1)
+        for r in np.flatnonzero(penalty[rows, current]):
+            current[r] = np.flatnonzero(penalty[r] == 0)[0]
+        orders[:, step] = current
+        penalty[rows, current] = np.inf
+
+    return orders.tolist()
+
+
+# 5) STREAMING AND DURATION / LENGTH LIMITED ORDER
+
+
+def iter_greedy_order(features: np.ndarray, start_pos: int, durations: np.ndarray = None,
+                      target_duration: float = None, max_tracks: int = None,
+                      tolerance: float = 0.0, method: str = "auto",
+                      distances=None) -> Iterator[int]:
+    """
+    Greedy walk as a generator: yields each song position as soon as it
+    is chosen, so a player can start on the first song right away and
+    stop consuming at any point.
+
+    The start song is yielded before any distance is computed, and each
+    further song costs one O(n) scan.  With "auto", large libraries
+    switch to the KD-tree after LIMITED_INDEX_MIN_TRACKS songs, so the
+    tree build never delays the first tracks.  Between songs the
+    generator only keeps the used-song mask, the current song and the
+    running duration.  The order is that of greedy_order().
+
+    Only songs that still fit (total + duration <= target_duration +
+    tolerance) are candidates, the start song included: a start song
+    that does not fit on its own (or has no duration) raises
+    ValueError before anything is yielded.  The walk ends when the
+    total reaches target_duration - tolerance, max_tracks songs are
+    chosen, or no song is left.  Songs that stop fitting never fit
+    again, so they are dropped as the remaining time shrinks: O(k * n)
+    work for k tracks.
+
+    Args:
+        features (np.ndarray): Matrix built by feature_matrix()
+        start_pos (int): Position of the first song (always included; it
+            must fit within target_duration + tolerance)
+        durations (np.ndarray): Duration of every song (seconds); needed
+            for target_duration
+        target_duration (float): Wanted total duration, or None
+        max_tracks (int): Maximum number of songs, or None
+        tolerance (float): Allowed deviation from target_duration (seconds)
+        method (str): "brute", "index" or "auto", as in greedy_order()
+        distances (DistanceCache): Optional precomputed distances (brute
+            walk; not with "index"), or a WeightedMetric, as in greedy_orders()
+
+    Yields:
+        int: Positions of the songs in playlist order
+    """
+    if method not in ("auto", "brute", "index"):
+        raise ValueError('method must be one of: "auto", "brute", "index"')
+    if max_tracks is not None and max_tracks < 1:
+        raise ValueError("max_tracks must be at least 1")
+    if target_duration is not None and durations is None:
+        raise ValueError("target_duration needs durations")
+
+    n = features.shape[1]
+    if n == 0:
+        return
+    features, distances = _resolve_distances(features, distances, method)
+
+    current = int(start_pos)
+    limit = math.inf if target_duration is None else target_duration + tolerance
+    enough = None if target_duration is None else target_duration - tolerance
+    if target_duration is not None and not float(durations[current]) <= limit:
+        raise ValueError(f"the start song lasts {float(durations[current]):.0f}s, more than "
+                         f"target_duration + tolerance ({limit:.0f}s); choose another start")
+    yield current
+
+    max_tracks = n if max_tracks is None else min(max_tracks, n)
+    count = 1
+
+    if target_duration is not None:
+        durations = np.asarray(durations, dtype=np.float64)
+        total = float(durations[current])
+        # Songs sorted by duration, longest first: the ones that stop fitting
+        # as the total grows are always a prefix of what is left
+        by_length = np.argsort(-np.nan_to_num(durations, nan=math.inf), kind="stable")
+        dropped = 0
+    else:
+        total, dropped = 0.0, n
+
+    if method == "auto":
+        # Scan first; the tree (if worth it) is built after a few songs
+        use_index = n >= INDEX_MIN_SONGS and distances is None and not np.isnan(features).any()
+        switch_at = LIMITED_INDEX_MIN_TRACKS if use_index else None
+        method = "brute"
+    else:
+        switch_at = 0 if method == "index" else None
+
+    walk = None
+    penalty = np.zeros(n)
+    penalty[current] = np.inf
+
+    while count < max_tracks and (target_duration is None or total < enough):
+        if walk is None and switch_at is not None and count >= switch_at:
+            walk = get_index(features).start_walk()
+            for p in np.flatnonzero(penalty).tolist():
+                walk.remove(p)
+            penalty = None
+
+        # Drop songs that no longer fit (NaN durations never fit)
+        while dropped < n and not (total + durations[by_length[dropped]] <= limit):
+            p = int(by_length[dropped])
+            if walk is not None:
+                walk.remove(p)
+            else:
+                penalty[p] = np.inf
+            dropped += 1
+
+        if walk is not None:
+            nxt = walk.nearest(current) if walk.remaining else -1
+        else:
+            if distances is not None:
+                dist = distances.rows([current])[0].astype(np.float64)
+            else:
+                dist = distances_from(features, current)
+            dist[np.isnan(dist)] = np.inf
+            dist += penalty
+            nxt = int(dist.argmin())
+            if penalty[nxt]:
+                # Only songs with missing features are left
+                rest = np.flatnonzero(penalty == 0)
+                nxt = int(rest[0]) if len(rest) else -1
+        if nxt < 0:
+            return
+
+        current = nxt
+        count += 1
+        if target_duration is not None:
+            total += float(durations[current])
+        if walk is not None:
+            walk.remove(current)
+        else:
+            penalty[current] = np.inf
+        yield current
+
+
+def greedy_order_limited(features: np.ndarray, start_pos: int, durations: np.ndarray,
+                         target_duration: float = None, max_tracks: int = None,
+                         tolerance: float = 0.0, method: str = "auto", distances=None) -> List[int]:
+    """
+    Greedy walk that stops once the playlist is long enough; the whole
+    of iter_greedy_order() as a list.
+
+    Without limits this is greedy_order(); with them each step is the
+    same argmin restricted to fitting songs, so the work is O(k * n)
+    for k tracks ("brute") or about O(k log n) ("index").
+
+    Returns:
+        List[int]: Positions of the chosen songs in playlist order
+
+    Raises:
+        ValueError: If the start song alone is longer than
+            target_duration + tolerance
+    """
+    return list(iter_greedy_order(features, start_pos, durations, target_duration, max_tracks,
+                                  tolerance, method, distances))
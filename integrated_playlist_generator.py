@@ -1,140 +1,46 @@
-import csv
-import pandas as pd
-from typing import List, Callable, Any
+import argparse
 
+import metrics
+from dedup import dedup_table, save_report
+from distance_cache import WeightedMetric, distance_cache_path, open_distance_cache
+from playlists import (ENGINES, GREEDY_COLUMNS, feature_distance, greedy_playlist,  # noqa: F401
+                       iter_greedy_playlist, save_greedy_playlist)
+from songs import Song, custom_sort, load_songs, merge_sort, recommended_sort, save_csv
+from sorted_index import load_indexed_table
 
-# 1) SONG DATA CLASS
 
-class Song:
-    def __init__(self, file: str, mood: float, tempo: float, energy: float, duration: float):
-        self.file = file
-        self.mood = float(mood)
-        self.tempo = float(tempo)
-        self.energy = float(energy)
-        self.duration = float(duration)
+# 1) - 6) SONG DATA CLASS, LOAD SONGS, MERGE SORT, RECOMMENDED SORT,
+#         CUSTOM SORT, SAVE SORT RESULTS TO CSV
+#    Shared with the other scripts (songs.py)
 
-    def __repr__(self) -> str:
-        return f"{self.file} (mood={self.mood:.2f}, tempo={self.tempo:.2f}, energy={self.energy:.2f})"
 
 
-
-# 2) LOAD SONGS FUNCTION
-
-
-def load_songs(csv_path: str) -> List[Song]:
-    songs: List[Song] = []
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            songs.append(
-                Song(row["file"], row["mood"], row["tempo"], row["energy"], row["duration"])
-            )
-    return songs
-
-
-
-# 3) MERGE SORT (used for both sorting methods)#
-
-
-def merge_sort(items: List[Any], key_function: Callable[[Any], Any]) -> List[Any]:
-    if len(items) <= 1:
-        return items
-
-    mid = len(items) // 2
-    left = merge_sort(items[:mid], key_function)
-    right = merge_sort(items[mid:], key_function)
-
-    merged: List[Any] = []
-    i = j = 0
-
-    while i < len(left) and j < len(right):
-        if key_function(left[i]) <= key_function(right[j]):
-            merged.append(left[i])
-            i += 1
-        else:
-            merged.append(right[j])
-            j += 1
-
-    merged.extend(left[i:])
-    merged.extend(right[j:])
-    return merged
-
-
-
-# 4) RECOMMENDED SORT
-
-
-def recommended_sort(songs: List[Song], order: str = "asc") -> List[Song]:
-    factor = 1 if order == "asc" else -1
-
-    def key_function(song: Song):
-        return (factor * song.mood, factor * song.tempo, factor * song.energy)
-
-    return merge_sort(songs, key_function)
-
-
-
-# 5) CUSTOM SORT
-
-
-def custom_sort(songs, field="mood", order="asc"):
-    if field not in ("mood", "tempo", "energy"):
-        raise ValueError('field must be one of: "mood", "tempo", "energy"')
-
-    factor = 1 if order == "asc" else -1
-
-    def key_function(song):
-        return factor * getattr(song, field)
-
-    return merge_sort(songs, key_function)
-
-
-
-# 6) SAVE SORT RESULTS TO CSV#
-
-
-def save_csv(songs: List[Song], filename: str):
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["file", "mood", "tempo", "energy", "duration"])
-        for s in songs:
-            writer.writerow([s.file, s.mood, s.tempo, s.energy, s.duration])
-
-
-
-# 7) GREEDY PLAYLIST GENERATOR#
-
-def feature_distance(songA, songB):
-    return abs(songA["tempo"] - songB["tempo"]) + abs(songA["mood"] - songB["mood"]) + abs(songA["energy"] - songB["energy"])
-
-
-def greedy_playlist(df):
-    used = set()
-    current_idx = df["energy"].idxmin()   # start with lowest energy
-    playlist_indices = [current_idx]
-    used.add(current_idx)
-
-    while len(used) < len(df):
-        current_song = df.loc[current_idx]
-        candidates = df[~df.index.isin(used)]
-        next_idx = candidates.apply(lambda x: feature_distance(x, current_song), axis=1).idxmin()
-        playlist_indices.append(next_idx)
-        used.add(next_idx)
-        current_idx = next_idx
-
-    return df.loc[playlist_indices]
+# 7) GREEDY PLAYLIST GENERATOR, SAVE GREEDY PLAYLIST
+#    greedy_playlist(), iter_greedy_playlist() (streaming) and
+#    save_greedy_playlist() are shared with the other scripts (playlists.py)
 
 
 
 # 8) MAIN SCRIPT
 
-if __name__ == "__main__":
+
+def main(dedup=False, clusters=None, workers=1, distance_cache=False):
+    """Sort songs_features.csv and save the greedy playlist over the recommended order."""
 
     # CHANGE THIS PATH ONLY
     csv_path = "songs_features.csv"
 
-    # Load Song objects
-    songs = load_songs(csv_path)
+    # Load songs as one columnar table, with its stored sort permutations
+    with metrics.stage("load_songs"):
+        songs = load_indexed_table(csv_path)
+    metrics.count("songs_loaded", len(songs))
+
+    # Near-duplicates (re-uploads of one song) would be played back to back
+    if dedup:
+        unique, found = dedup_table(songs)
+        save_report(songs, found.groups, "duplicates.csv")
+        print(f" Removed {len(songs) - len(unique)} near-duplicates ({len(found.groups)} groups)")
+        songs = unique
 
     
     # SORTING OUTPUTS
@@ -146,22 +52,45 @@ if __name__ == "__main__":
     save_csv(sorted_rec, "recommended_sorted.csv")
     save_csv(sorted_cus, "custom_sorted.csv")
 
-    # Convert one of the sorted lists to DataFrame for greedy algorithm
-    sorted_df = pd.DataFrame([{
-        "file": s.file,
-        "tempo": s.tempo,
-        "energy": s.energy,
-        "mood": s.mood,
-        "duration": s.duration
-    } for s in sorted_rec])   # use recommended results
-
     
-    # RUN GREEDY PLAYLIST ON SORTED DATA
+    # RUN GREEDY PLAYLIST ON SORTED DATA (use recommended results)
     
 
-    greedy_df = greedy_playlist(sorted_df)
-    greedy_df.to_csv("greedy_playlist.csv", index=False, encoding="utf-8")
+    # Weighted, normalized distances; the O(n^2) matrix on disk is opt-in
+    features = sorted_rec.feature_matrix()
+    weights = {"tempo": 1.0, "mood": 1.0, "energy": 1.0}
+    if distance_cache:
+        with metrics.stage("distance_cache"):
+            distances = open_distance_cache(features, distance_cache_path(csv_path), weights)
+    else:
+        distances = WeightedMetric.of(features, weights)
+    greedy = greedy_playlist(sorted_rec, distances=distances, clusters=clusters, workers=workers)
+    save_greedy_playlist(greedy, "greedy_playlist.csv")
 
     print("\nAll Tasks Completed!")
-   
-  
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Sort songs and generate a greedy playlist.")
+    parser.add_argument("--metrics", metavar="OUT_JSON",
+                        help="write per-stage timing / memory metrics to this file")
+    parser.add_argument("--dedup", action="store_true",
+                        help="drop near-duplicate songs first (groups saved to duplicates.csv)")
+    parser.add_argument("--clusters", type=int, default=None,
+                        help="sequence per cluster of songs (cluster_greedy.py), faster on large libraries")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for --clusters (0 = one per CPU core)")
+    parser.add_argument("--distance-cache", action="store_true",
+                        help="keep the pairwise distances in songs_features.csv.dist "
+                             "(n^2/2 floats, memory-mapped on later runs)")
+    args = parser.parse_args()
+
+    if args.metrics:
+        metrics.enable()
+    try:
+        main(dedup=args.dedup, clusters=args.clusters, workers=args.workers,
+             distance_cache=args.distance_cache)
+    finally:
+        if args.metrics:
+            metrics.write_report(args.metrics)
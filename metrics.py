@@ -0,0 +1,248 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict
+
+# ===============================================================
+# Smart Playlist Generator: pipeline instrumentation
+# Description:
+#   Timers, counters and RSS sampling for the pipeline entry points
+#   (loading, sorting, greedy playlists, saving, and the decode /
+#   spectrum / tempo phases of score()).
+#
+#       with metrics.stage("recommended_sort"):
+#           ...
+#       metrics.count("songs_loaded", len(songs))
+#
+#   Everything is off until enable() is called (the scripts do that
+#   for --metrics out.json); while off, stage() returns one shared
+#   no-op context manager and count() returns at once, so the hooks
+#   cost a function call each.
+#
+#   While enabled, a daemon thread samples the resident set size
+#   every RSS_SAMPLE_INTERVAL seconds and raises the peak of every
+#   stage that is open, so each stage reports the highest RSS seen
+#   while it ran.  Worker processes collect their own numbers
+#   (start_worker) and send them back with snapshot(), which the
+#   parent adds with merge().
+# ===============================================================
+
+RSS_SAMPLE_INTERVAL = 0.005
+
+REPORT_VERSION = 1
+
+_enabled = False
+_lock = threading.Lock()
+_stages: Dict[str, Dict[str, float]] = {}
+_counters: Dict[str, float] = {}
+_open = []                              # _Stage objects currently running
+_started = None
+_sampler = None
+_sampler_pid = None
+_worker = False
+
+
+# 1) RSS
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where unknown."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+def peak_rss(children: bool = False):
+    """Highest RSS of this process (or of its finished children) in bytes."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _sample_loop():
+    while _enabled:
+        rss = current_rss()
+        if rss is not None:
+            for s in list(_open):
+                if rss > s.peak:
+                    s.peak = rss
+        time.sleep(RSS_SAMPLE_INTERVAL)
+
+
+# 2) STAGES AND COUNTERS
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.rss_start = current_rss() or 0
+        self.peak = self.rss_start
+        _open.append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.t0
+        _open.remove(self)
+        rss_end = current_rss() or 0
+        _record(self.name, {
+            "calls": 1,
+            "seconds": seconds,
+            "max_seconds": seconds,
+            "peak_rss_bytes": max(self.peak, rss_end),
+            "rss_delta_bytes": rss_end - self.rss_start,
+        })
+        return False
+
+
+def _record(name: str, entry: Dict[str, float]) -> None:
+    with _lock:
+        total = _stages.get(name)
+        if total is None:
+            _stages[name] = dict(entry)
+            return
+        total["calls"] += entry["calls"]
+        total["seconds"] += entry["seconds"]
+        total["rss_delta_bytes"] += entry["rss_delta_bytes"]
+        total["max_seconds"] = max(total["max_seconds"], entry["max_seconds"])
+        total["peak_rss_bytes"] = max(total["peak_rss_bytes"], entry["peak_rss_bytes"])
+
+
+def stage(name: str):
+    """Context manager that times the block as stage 'name' (no-op while disabled)."""
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+def timed(name: str):
+    """Decorator form of stage()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def count(name: str, n: float = 1) -> None:
+    """Add n to counter 'name' (no-op while disabled)."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+# 3) ENABLE / REPORT
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(reset: bool = False) -> None:
+    """Start collecting (and RSS sampling); 'reset' drops earlier numbers."""
+    global _enabled, _started, _sampler, _sampler_pid
+    if reset:
+        with _lock:
+            _stages.clear()
+            _counters.clear()
+        _started = None
+    _enabled = True
+    if _started is None:
+        _started = time.perf_counter()
+    # A forked child inherits the flag but not the thread
+    if _sampler_pid != os.getpid() or not _sampler.is_alive():
+        _sampler = threading.Thread(target=_sample_loop, name="metrics-rss", daemon=True)
+        _sampler_pid = os.getpid()
+        _sampler.start()
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def start_worker() -> None:
+    """ProcessPoolExecutor initializer: collect this worker's numbers from zero."""
+    global _worker
+    _worker = True
+    enable(reset=True)
+
+
+def is_worker() -> bool:
+    """True in a process started with start_worker()."""
+    return _worker
+
+
+def snapshot(reset: bool = False) -> Dict:
+    """Stages and counters so far (picklable; see merge())."""
+    with _lock:
+        snap = {"stages": {k: dict(v) for k, v in _stages.items()}, "counters": dict(_counters)}
+        if reset:
+            _stages.clear()
+            _counters.clear()
+    return snap
+
+
+def merge(snap: Dict) -> None:
+    """Add a snapshot() taken elsewhere (e.g. in a worker process)."""
+    if not snap:
+        return
+    for name, entry in snap["stages"].items():
+        _record(name, entry)
+    with _lock:
+        for name, n in snap["counters"].items():
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def report() -> Dict:
+    """
+    Structured report of everything collected.
+
+    Returns:
+        dict: version, wall_seconds, peak_rss_bytes (this process and its
+        finished children), stages {name: calls, seconds, mean_seconds,
+        max_seconds, peak_rss_bytes, rss_delta_bytes} and counters
+    """
+    snap = snapshot()
+    for entry in snap["stages"].values():
+        entry["mean_seconds"] = entry["seconds"] / max(entry["calls"], 1)
+    return {
+        "version": REPORT_VERSION,
+        "argv": sys.argv,
+        "wall_seconds": None if _started is None else time.perf_counter() - _started,
+        "peak_rss_bytes": peak_rss(),
+        "children_peak_rss_bytes": peak_rss(children=True),
+        "stages": dict(sorted(snap["stages"].items())),
+        "counters": dict(sorted(snap["counters"].items())),
+    }
+
+
+def write_report(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, indent=2)
+    print(f"Metrics saved to: {path}")
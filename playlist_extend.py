@@ -0,0 +1,253 @@
+import argparse
+import numpy as np
+from typing import NamedTuple
+
+from distance_cache import WeightedMetric
+from greedy_engine import FeatureIndex
+from song_table import DISTANCE_FIELDS, SongTable, load_song_table
+
+# ===============================================================
+# Smart Playlist Generator: incremental playlist extension
+# Description:
+#   Adds newly scored songs to an existing playlist (a CSV written by
+#   save_greedy_playlist) without re-running greedy_playlist() over the
+#   whole library.
+#
+#   Each new song goes where it adds the least transition cost
+#   (cheapest insertion): between two neighbouring songs a, b it costs
+#       feature_distance(a, x) + feature_distance(x, b) - feature_distance(a, b)
+#   or feature_distance(last, x) when appended.  The first song stays
+#   first.  With a WeightedMetric (distance_cache.py) the costs use the
+#   weighted, normalized distance instead, as the playlist scripts do:
+#   the features are scaled once and everything below runs unchanged.
+#
+#   "brute" tries every transition in one vectorised pass per new
+#   song.  "index" finds the same position with fewer tries: it takes
+#   the transitions next to the k nearest playlist songs (KD-tree,
+#   greedy_engine.FeatureIndex), at distance <= r from the new song,
+#   and next to songs placed earlier in the same call, and the best of
+#   those costs c.  By the triangle inequality any other transition
+#   a -> b costs at least 2 * (r - feature_distance(a, b)), so only
+#   transitions at least r - c / 2 long can still beat c; they are
+#   read off the playlist's transitions sorted by length.  The playlist
+#   is kept as a linked list, so an insertion never shifts the rest
+#   and nothing is re-sequenced.
+# ===============================================================
+
+# Column order of greedy playlist CSVs (as save_greedy_playlist writes them)
+PLAYLIST_COLUMNS = ("file", "tempo", "energy", "mood", "duration")
+
+# Nearest playlist songs whose neighbouring transitions are tried first;
+# fewer leave more long transitions to try (see the header)
+CANDIDATES = 64
+
+# Building the KD-tree costs about as much as 200-600 brute-force scans
+# of the playlist, and below ~100,000 songs one scan is cheaper than an
+# index lookup, so "auto" uses the index only for large playlists and
+# batches (see benchmarks/bench_extend.py).  A few dozen new songs go
+# through the brute-force scan, which takes ~0.2 s per 100,000 songs.
+INDEX_MIN_PLAYLIST_SONGS = 100000
+INDEX_MIN_NEW_SONGS = 500
+
+
+class ExtendResult(NamedTuple):
+    """Outcome of extend_playlist()."""
+    playlist: SongTable
+    inserted: int               # new songs placed
+    skipped: int                # new songs already in the playlist
+    added_cost: float           # increase of the total transition cost
+
+
+def extend_playlist(playlist: SongTable, new_songs: SongTable, method: str = "auto",
+                    candidates: int = CANDIDATES, distances=None) -> ExtendResult:
+    """
+    Insert 'new_songs' into 'playlist' by cheapest insertion.
+
+    Equal costs go to the transition after the song that came first
+    (playlist songs, then new songs in the order given); appending
+    wins a tie.
+
+    Args:
+        playlist (SongTable): Songs in playlist order
+        new_songs (SongTable): Songs to add, inserted in the order given;
+            songs whose file is already in the playlist are skipped
+        method (str): "brute" (try every transition), "index" (KD-tree
+            candidates plus long transitions; same result) or "auto"
+            (index for INDEX_MIN_PLAYLIST_SONGS+ playlists and
+            INDEX_MIN_NEW_SONGS+ new songs)
+        candidates (int): Nearest playlist songs tried first with "index"
+        distances (WeightedMetric): Cost transitions with this weighted
+            metric (only its scales are used, so a DistanceCache of the
+            library works too); None = raw feature_distance()
+
+    Returns:
+        ExtendResult: The extended playlist and what was done
+
+    Raises:
+        ValueError: For an unknown method
+    """
+    if method not in ("auto", "brute", "index"):
+        raise ValueError('method must be one of: "auto", "brute", "index"')
+
+    known = set(playlist.files)
+    keep = [i for i, f in enumerate(new_songs.files) if f not in known and not known.add(f)]
+    skipped = len(new_songs) - len(keep)
+    new_songs = new_songs.take(keep)
+
+    n, m = len(playlist), len(new_songs)
+    if m == 0:
+        return ExtendResult(playlist, 0, skipped, 0.0)
+
+    songs = playlist.append(new_songs)
+    # Columns in feature_distance() order: tempo, mood, energy
+    F = np.vstack([songs.column(f) for f in DISTANCE_FIELDS]).astype(np.float64)
+    if distances is not None:
+        F = distances.weighted(F)
+
+    # Playlist as a linked list over song positions (-1 = none)
+    nxt = np.full(n + m, -1, dtype=np.intp)
+    prv = np.full(n + m, -1, dtype=np.intp)
+    if n:
+        nxt[:n - 1] = np.arange(1, n)
+        prv[1:n] = np.arange(n - 1)
+    head = 0 if n else -1
+    tail = n - 1
+
+    if method == "auto":
+        use_index = n >= INDEX_MIN_PLAYLIST_SONGS and m >= INDEX_MIN_NEW_SONGS and not np.isnan(F[:, :n]).any()
+        method = "index" if use_index else "brute"
+    index = FeatureIndex(F[:, :n]) if method == "index" and n else None
+    if index is not None:
+        # Playlist transitions longest first, and the songs whose outgoing
+        # transition has changed since (tried every time)
+        length = np.abs(np.diff(F[:, :n], axis=1)).sum(axis=0)
+        by_length = np.argsort(-length, kind="stable")
+        neg_length = -length[by_length]
+        touched = []
+
+    def dist(x, nodes):
+        return (np.abs(F[0, nodes] - F[0, x]) + np.abs(F[1, nodes] - F[1, x])
+                + np.abs(F[2, nodes] - F[2, x]))
+
+    def insertion_cost(x, a):
+        """Cost of placing x after each song in 'a' (unique, in transitions; NaN -> inf)."""
+        a = np.unique(a)
+        a = a[(a >= 0) & (nxt[a] >= 0)]
+        b = nxt[a]
+        cost = dist(x, a) + dist(x, b) - (np.abs(F[0, a] - F[0, b]) + np.abs(F[1, a] - F[1, b])
+                                          + np.abs(F[2, a] - F[2, b]))
+        return np.where(np.isnan(cost), np.inf, cost), a
+
+    def append_cost(x):
+        cost = float(dist(x, [tail])[0])
+        return np.inf if np.isnan(cost) else cost
+
+    if index is None:
+        # Features of every song's successor and the cost of its outgoing
+        # transition, kept up to date so each scan is contiguous
+        succ = F[:, np.maximum(nxt, 0)]
+        edge = np.abs(F[0] - succ[0]) + np.abs(F[1] - succ[1]) + np.abs(F[2] - succ[2])
+        edge[nxt < 0] = np.nan          # no outgoing transition (tail, unplaced)
+
+    added = 0.0
+    for x in range(n, n + m):
+        if head < 0:
+            head = tail = x
+            continue
+
+        # Candidate transitions (a, nxt[a]) plus "after the tail"
+        if index is None:
+            a = None                    # every song placed so far, by position
+            to_b = np.abs(succ[0, :x] - F[0, x]) + np.abs(succ[1, :x] - F[1, x]) + np.abs(succ[2, :x] - F[2, x])
+            cost = dist(x, slice(0, x)) + to_b - edge[:x]
+            cost = np.where(np.isnan(cost), np.inf, cost)
+        else:
+            count = min(candidates, n)
+            near = np.array(index.query(F[:, x], count), dtype=np.intp)
+            a = np.concatenate([near, prv[near], np.arange(n, x), touched]).astype(np.intp)
+            cost, a = insertion_cost(x, a)
+            if count < n:
+                # Transitions not tried yet start and end farther than r
+                r = float(dist(x, near[-1:])[0])
+                best = min(float(cost.min()) if len(cost) else np.inf, append_cost(x))
+                if np.isfinite(best):
+                    longer = by_length[:np.searchsorted(neg_length, best / 2 - r, side="right")]
+                    cost, a = insertion_cost(x, np.concatenate([a, longer]))
+        append = append_cost(x)
+
+        k = int(np.argmin(cost)) if len(cost) else -1
+        if k >= 0 and cost[k] < append:
+            after = k if a is None else int(a[k])
+            before = int(nxt[after])
+            nxt[after], prv[x], nxt[x], prv[before] = x, after, before, x
+            added += float(cost[k])
+        else:
+            after, before = tail, -1
+            nxt[tail], prv[x] = x, tail
+            tail = x
+            added += append if np.isfinite(append) else 0.0
+
+        if index is not None:
+            touched.append(after)
+        else:
+            succ[:, after] = F[:, x]
+            edge[after] = dist(x, [after])[0]
+            if before >= 0:
+                succ[:, x] = F[:, before]
+                edge[x] = dist(x, [before])[0]
+
+    return ExtendResult(songs.take(_playlist_order(nxt, head, n)), m, skipped, added)
+
+
+def _playlist_order(nxt: np.ndarray, head: int, n: int) -> np.ndarray:
+    """
+    Read the linked list back as positions.  The first n songs keep
+    their relative order, so only the chains of new songs hanging
+    after each of them are walked: O(n) NumPy work plus O(m) steps.
+    """
+    if n == 0:
+        order = []
+        while head >= 0:
+            order.append(head)
+            head = int(nxt[head])
+        return np.array(order, dtype=np.intp)
+
+    anchors, chain = [], []
+    for a in np.flatnonzero(nxt[:n] >= n).tolist():
+        node = int(nxt[a])
+        while node >= n:
+            anchors.append(a + 1)
+            chain.append(node)
+            node = int(nxt[node])
+    return np.insert(np.arange(n), np.array(anchors, dtype=np.intp), np.array(chain, dtype=np.intp))
+
+
+# CLI
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Insert new songs into an existing greedy playlist CSV.")
+    parser.add_argument("playlist_csv", help="playlist written by save_greedy_playlist")
+    parser.add_argument("new_songs", help="features CSV (or song store) of the new songs")
+    parser.add_argument("out_csv")
+    parser.add_argument("--method", default="auto", choices=("auto", "brute", "index"))
+    parser.add_argument("--weights", default="1,1,1", metavar="TEMPO,MOOD,ENERGY",
+                        help="weights of the normalized distance (distance_cache.py, default 1,1,1)")
+    parser.add_argument("--raw-distance", action="store_true",
+                        help="plain L1 on raw tempo / mood / energy instead (BPM dominates)")
+    args = parser.parse_args()
+
+    playlist = load_song_table(args.playlist_csv)
+    new_songs = load_song_table(args.new_songs)
+
+    # Normalized over playlist and new songs together, like the scripts' metric
+    distances = None
+    if not args.raw_distance:
+        tempo, mood, energy = (float(w) for w in args.weights.split(","))
+        distances = WeightedMetric.of(playlist.append(new_songs).feature_matrix(),
+                                      {"tempo": tempo, "mood": mood, "energy": energy})
+    result = extend_playlist(playlist, new_songs, args.method, distances=distances)
+    result.playlist.save_csv(args.out_csv, columns=PLAYLIST_COLUMNS)
+    print(f" Inserted {result.inserted} songs ({result.skipped} already present), "
+          f"transition cost +{result.added_cost:.2f} -> {args.out_csv}")
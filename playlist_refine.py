@@ -0,0 +1,200 @@
+import time
+import numpy as np
+from typing import List, NamedTuple, Sequence
+
+# ===============================================================
+# Smart Playlist Generator: playlist refinement (2-opt / Or-opt)
+# Description:
+#   Improves a greedy ordering by local search on the total transition
+#   cost (the sum of feature_distance() between consecutive songs).
+#   The nearest-neighbour walk leaves the outliers for the end, where
+#   it has to jump far; these moves repair that:
+#
+#   - 2-opt reverses a stretch of the playlist, replacing two
+#     transitions by two cheaper ones (or the last transition, when
+#     the stretch runs to the end).
+#   - Or-opt moves a run of 1-3 consecutive songs, possibly reversed,
+#     to the cheapest other place in the playlist.
+#
+#   For one transition, all partner positions are evaluated in one
+#   vectorised NumPy pass.  Transitions are visited longest first, the
+#   first song always stays first, and the search stops at a time
+#   budget or move limit with the best ordering found so far (every
+#   applied move lowers the cost).
+# ===============================================================
+
+# Moves must gain at least this much, so rounding cannot make them cycle
+MIN_GAIN = 1e-9
+
+# Longest run of songs Or-opt moves at once
+OR_OPT_MAX_RUN = 3
+
+
+class RefineResult(NamedTuple):
+    """Outcome of refine_order()."""
+    order: List[int]            # positions in playlist order
+    cost_before: float
+    cost_after: float
+    moves: int                  # improving moves applied
+    seconds: float
+    converged: bool             # True if no improving move was left
+
+
+# 1) COSTS
+
+
+def transition_costs(features: np.ndarray, order: Sequence[int]) -> np.ndarray:
+    """
+    Distance of every transition of a playlist.
+
+    Args:
+        features (np.ndarray): (3, n) matrix from greedy_engine.feature_matrix()
+        order (Sequence[int]): Positions in playlist order
+
+    Returns:
+        np.ndarray: len(order) - 1 distances (same sum order as feature_distance)
+    """
+    P = features[:, np.asarray(order, dtype=np.intp)]
+    return _edge_costs(P)
+
+
+def transition_cost(features: np.ndarray, order: Sequence[int]) -> float:
+    """Total transition cost of a playlist."""
+    return float(transition_costs(features, order).sum())
+
+
+def _edge_costs(P: np.ndarray) -> np.ndarray:
+    d = np.abs(P[:, 1:] - P[:, :-1])
+    return d[0] + d[1] + d[2]
+
+
+def _dist(P: np.ndarray, k: int, idx) -> np.ndarray:
+    """Distances from playlist slot k to the slots 'idx'."""
+    return np.abs(P[0, idx] - P[0, k]) + np.abs(P[1, idx] - P[1, k]) + np.abs(P[2, idx] - P[2, k])
+
+
+def _best(delta: np.ndarray):
+    """(index, value) of the most negative delta; NaN never wins."""
+    if len(delta) == 0:
+        return -1, np.inf
+    delta = np.where(np.isnan(delta), np.inf, delta)
+    j = int(np.argmin(delta))
+    return j, delta[j]
+
+
+# 2) MOVES
+
+
+def _two_opt(P: np.ndarray, e: np.ndarray, i: int):
+    """Best reversal of slots i+1..j for the transition (i, i+1): (gain, j)."""
+    n = P.shape[1]
+    if i > n - 3:
+        return 0.0, -1
+    js = np.arange(i + 2, n)
+    delta = _dist(P, i, js) - e[i]
+    inner = js[:-1]
+    delta[:-1] += _dist(P, i + 1, inner + 1) - e[inner]
+    j, d = _best(delta)
+    return -d, int(js[j])
+
+
+def _or_opt(P: np.ndarray, e: np.ndarray, s: int):
+    """
+    Best relocation of the run starting at slot s.
+
+    Returns:
+        (gain, run_length, p, reverse): the run is placed after slot p
+    """
+    n = P.shape[1]
+    best = (0.0, 0, -1, False)
+    for length in range(1, OR_OPT_MAX_RUN + 1):
+        first, last, prev, nxt = s, s + length - 1, s - 1, s + length
+        if last > n - 1:
+            break
+        if nxt < n:
+            removed = e[prev] + e[last] - _dist(P, prev, nxt)
+        else:
+            removed = e[prev]
+
+        # Transitions (p, p+1) that do not touch the run, then "after the last song"
+        ps = np.concatenate([np.arange(0, prev), np.arange(nxt, n - 1)])
+        to_first, to_last = _dist(P, first, ps), _dist(P, last, ps)
+        ps_next = ps + 1
+        forward = to_first + _dist(P, last, ps_next) - e[ps]
+        backward = to_last + _dist(P, first, ps_next) - e[ps]
+        if nxt < n:
+            ps = np.append(ps, n - 1)
+            forward = np.append(forward, _dist(P, n - 1, [first])[0])
+            backward = np.append(backward, _dist(P, n - 1, [last])[0])
+
+        for added, reverse in ((forward, False), (backward, length > 1)):
+            k, d = _best(added)
+            if k >= 0 and removed - d > best[0]:
+                best = (removed - d, length, int(ps[k]), reverse)
+    return best
+
+
+# 3) REFINE
+
+
+def refine_order(features: np.ndarray, order: Sequence[int], time_budget: float = 0.1,
+                 max_iterations: int = None) -> RefineResult:
+    """
+    2-opt / Or-opt local search on a playlist ordering.
+
+    Args:
+        features (np.ndarray): (3, n) matrix from greedy_engine.feature_matrix()
+        order (Sequence[int]): Starting ordering (e.g. from greedy_order())
+        time_budget (float): Stop after about this many seconds (None: no limit)
+        max_iterations (int): Stop after this many improving moves (None: no limit)
+
+    Returns:
+        RefineResult: Best ordering found and its cost before/after
+    """
+    t0 = time.perf_counter()
+    deadline = None if time_budget is None else t0 + time_budget
+    order = np.asarray(order, dtype=np.intp).copy()
+    P = features[:, order]
+    e = _edge_costs(P)
+    cost_before = float(e.sum())
+    n = len(order)
+    moves = 0
+    converged = False
+
+    def out_of_budget():
+        if max_iterations is not None and moves >= max_iterations:
+            return True
+        return deadline is not None and time.perf_counter() >= deadline
+
+    while not out_of_budget():
+        improved = False
+        # Longest transitions first: the budget goes to the worst jumps
+        for i in np.argsort(-e, kind="stable").tolist():
+            if out_of_budget():
+                break
+            if i >= n - 1:
+                continue
+            gain2, j = _two_opt(P, e, i)
+            gain_or, length, p, reverse = _or_opt(P, e, i + 1)
+
+            if max(gain2, gain_or) <= MIN_GAIN:
+                continue
+            if gain2 >= gain_or:
+                order[i + 1:j + 1] = order[i + 1:j + 1][::-1].copy()
+            else:
+                run = order[i + 1:i + 1 + length]
+                if reverse:
+                    run = run[::-1]
+                rest = np.concatenate([order[:i + 1], order[i + 1 + length:]])
+                at = (p if p < i + 1 else p - length) + 1
+                order = np.concatenate([rest[:at], run, rest[at:]])
+            P = features[:, order]
+            e = _edge_costs(P)
+            moves += 1
+            improved = True
+        if not improved:
+            converged = True
+            break
+
+    return RefineResult(order.tolist(), cost_before, float(e.sum()), moves,
+                        time.perf_counter() - t0, converged)
@@ -0,0 +1,455 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import socket
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+from distance_cache import weighted_features
+from greedy_engine import greedy_order_limited, greedy_orders
+from song_query import ORDER_KEYS, parse_condition, query
+from song_table import FIELDS, SongTable
+from sorted_index import INDEX_KEYS, load_indexed_table
+
+# ===============================================================
+# Smart Playlist Generator: playlist service
+# Description:
+#   A local daemon that loads the feature table once (with its sorted
+#   index, sorted_index.py) and answers sort, query and playlist
+#   requests from memory, instead of re-reading songs_features.csv and
+#   writing fixed CSV files on every run.
+#
+#   Protocol: one JSON object per line over a Unix socket (or TCP on
+#   127.0.0.1), e.g.
+#
+#       {"id": 1, "op": "query", "where": ["tempo>=100"], "by": "mood", "top": 10}
+#
+#   answered by one line {"id": 1, "ok": true, "songs": [...]} or
+#   {"id": 1, "ok": false, "error": "..."}.  Requests on one
+#   connection may be pipelined; answers carry the request's id and
+#   can come back in a different order.
+#
+#   Work runs on a thread pool, so slow requests do not block the
+#   others.  Full-length playlist requests that arrive within
+#   BATCH_WINDOW of each other are sequenced together with
+#   greedy_orders() (one lockstep pass for all starts).  The features
+#   file is polled and reloaded in the background when it changes;
+#   requests already running keep the snapshot they started with.
+#
+#   PlaylistClient (and the "call" subcommand) is the matching client.
+# ===============================================================
+
+OPS = ("sort", "query", "playlist", "stats", "reload")
+
+ENGINES = {"auto": "auto", "numpy": "brute", "index": "index"}
+
+# Full-length playlist requests this close together share one walk
+BATCH_WINDOW = 0.005
+
+# Seconds between checks of the features file
+RELOAD_INTERVAL = 1.0
+
+# Latencies kept per operation for the percentiles
+LATENCY_SAMPLES = 1024
+
+DEFAULT_SOCKET = "playlist_service.sock"
+
+
+# 1) LIBRARY SNAPSHOT
+
+
+class Library:
+    """
+    One loaded version of the features file.
+
+    Attributes:
+        path (str): Features CSV or binary song store
+        table (SongTable): Songs in file order, sorted index attached
+        recommended (SongTable): Songs in recommended order; playlists are
+            sequenced on this table, like the scripts do
+        metric (np.ndarray): Features of 'recommended' scaled to the
+            normalized distance (distance_cache.py, default weights),
+            the playlist metric of the scripts
+        stamp (tuple): (mtime_ns, size) of the file when it was loaded
+        loaded_at (float): time.time() of the load
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stamp = file_stamp(path)
+        self.table = load_indexed_table(path)
+        self.recommended = self.table.take(self.table.sorted_index.order(INDEX_KEYS["recommended"]))
+        self.metric = weighted_features(self.recommended.feature_matrix())
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+
+def file_stamp(path: str):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _number(x: float):
+    # JSON has no NaN
+    return None if math.isnan(x) else x
+
+
+def songs_json(table: SongTable, positions=None) -> List[Dict[str, Any]]:
+    """Rows of 'table' (or its 'positions') as JSON-ready dicts."""
+    positions = range(len(table)) if positions is None else positions
+    rows = [table[int(p)] for p in positions]
+    return [{"file": r.file, **{f: _number(getattr(r, f)) for f in FIELDS}} for r in rows]
+
+
+# 2) METRICS
+
+
+class LatencyStats:
+    """Request count, errors and recent latencies of one operation."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, seconds: float, ok: bool) -> None:
+        self.count += 1
+        self.errors += not ok
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        recent = np.array(self.recent) if self.recent else np.zeros(1)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": 1e3 * self.total / max(self.count, 1),
+            "p50_ms": 1e3 * float(np.percentile(recent, 50)),
+            "p95_ms": 1e3 * float(np.percentile(recent, 95)),
+            "max_ms": 1e3 * self.max,
+        }
+
+
+# 3) SERVICE
+
+
+class PlaylistService:
+    """
+    Request handling on top of a Library that is reloaded when the file changes.
+
+    Args:
+        path (str): Features CSV or binary song store
+        workers (int): Threads for the sort / query / playlist work
+    """
+
+    def __init__(self, path: str, workers: int = 4):
+        self.path = path
+        self.library = Library(path)
+        self.reloads = 0
+        self.stats = {op: LatencyStats() for op in OPS}
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = []              # (library, start, method, future) awaiting a batch
+        self._flush_handle = None
+
+    # ---- operations ----
+
+    async def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one request; never raises (errors become {"ok": false})."""
+        op = request.get("op")
+        t0 = time.perf_counter()
+        try:
+            if op not in OPS:
+                raise ValueError(f"op must be one of: {', '.join(OPS)}")
+            result = await getattr(self, f"_op_{op}")(request)
+            response = {"ok": True, **result}
+        except Exception as e:          # report to the client, keep serving
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        if op in self.stats:
+            self.stats[op].add(time.perf_counter() - t0, response["ok"])
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def _run(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _op_sort(self, request):
+        if request.get("by") is None:
+            raise ValueError(f"sort needs 'by', one of: {', '.join(ORDER_KEYS)}")
+        return await self._op_query(request)
+
+    async def _op_query(self, request):
+        library = self.library
+        where = [parse_condition(c) if isinstance(c, str) else tuple(c)
+                 for c in request.get("where", ())]
+
+        def work():
+            result = query(library.table, where, request.get("by"),
+                           request.get("order", "asc"), request.get("top"))
+            return {"count": len(result), "songs": songs_json(result)}
+        return await self._run(work)
+
+    async def _op_playlist(self, request):
+        library = self.library
+        engine = request.get("engine", "auto")
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of: {', '.join(ENGINES)}")
+        start = library.recommended.start_position(request.get("start_idx"),
+                                                   request.get("start_strategy", "low_energy"))
+        target = request.get("target_duration")
+        max_tracks = request.get("max_tracks")
+
+        if target is None and max_tracks is None:
+            order = await self._batched_walk(library, start, ENGINES[engine])
+        else:
+            order = await self._run(greedy_order_limited, library.metric, start,
+                                    library.recommended.duration, target, max_tracks,
+                                    float(request.get("tolerance", 0.0)), ENGINES[engine])
+        return {"count": len(order), "songs": songs_json(library.recommended, order)}
+
+    async def _op_stats(self, request):
+        library = self.library
+        return {
+            "songs": len(library),
+            "path": library.path,
+            "loaded_at": library.loaded_at,
+            "reloads": self.reloads,
+            "ops": {op: s.summary() for op, s in self.stats.items()},
+        }
+
+    async def _op_reload(self, request):
+        changed = await self.reload(force=True)
+        return {"reloaded": changed, "songs": len(self.library)}
+
+    # ---- batching ----
+
+    def _batched_walk(self, library: Library, start: int, method: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((library, start, method, future))
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(BATCH_WINDOW, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        pending, self._pending = self._pending, []
+        groups = {}
+        for library, start, method, future in pending:
+            groups.setdefault((id(library), method), []).append((library, start, future))
+
+        for (_, method), items in groups.items():
+            library = items[0][0]
+            starts = [start for _, start, _ in items]
+            job = self._run(greedy_orders, library.metric, starts, method)
+            job.add_done_callback(lambda job, items=items: _resolve(job, items))
+
+    # ---- reload ----
+
+    async def reload(self, force: bool = False) -> bool:
+        """Load the features file again if it changed (or if 'force')."""
+        try:
+            if not force and file_stamp(self.path) == self.library.stamp:
+                return False
+            library = await self._run(Library, self.path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Keeping the loaded library, reload of '{self.path}' failed: {e}")
+            return False
+        self.library = library
+        self.reloads += 1
+        print(f" Reloaded {len(library)} songs from {self.path}")
+        return True
+
+    async def watch(self, interval: float = RELOAD_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception as e:      # one bad poll must not stop hot reload
+                print(f"Warning: Reload check of '{self.path}' failed: {e!r}")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _resolve(job, items) -> None:
+    error = job.exception()
+    orders = None if error else job.result()
+    for k, (_, _, future) in enumerate(items):
+        if future.done():
+            continue
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(orders[k])
+
+
+# 4) SERVER
+
+
+async def _serve_connection(service: PlaylistService, reader, writer) -> None:
+    tasks = set()
+
+    async def answer(line: bytes):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            response = {"ok": False, "error": f"bad request: {e}"}
+        else:
+            response = await service.handle(request)
+        writer.write(json.dumps(response).encode("utf-8") + b"\n")
+        await writer.drain()
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(path: str, socket_path: str = None, port: int = None, workers: int = 4,
+                reload_interval: float = RELOAD_INTERVAL) -> None:
+    """
+    Run the service until cancelled.
+
+    Args:
+        path (str): Features CSV or binary song store
+        socket_path (str): Unix socket to listen on (default DEFAULT_SOCKET)
+        port (int): Listen on 127.0.0.1:port instead
+        workers (int): Worker threads
+        reload_interval (float): Seconds between checks of the features file
+    """
+    service = PlaylistService(path, workers)
+
+    def on_connect(reader, writer):
+        return _serve_connection(service, reader, writer)
+
+    if port is not None:
+        server = await asyncio.start_server(on_connect, "127.0.0.1", port, limit=2**24)
+        where = f"127.0.0.1:{port}"
+    else:
+        socket_path = socket_path or DEFAULT_SOCKET
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(on_connect, socket_path, limit=2**24)
+        where = socket_path
+    print(f" Serving {len(service.library)} songs from {path} on {where}")
+
+    watcher = asyncio.ensure_future(service.watch(reload_interval))
+    try:
+        # Stop like Ctrl+C, so the socket file is removed
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+        service.close()
+        if port is None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+# 5) CLIENT
+
+
+class PlaylistClient:
+    """
+    Blocking client for a running service.
+
+    Usage:
+        with PlaylistClient("playlist_service.sock") as client:
+            songs = client.call("playlist", max_tracks=20)["songs"]
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, port: int = None, timeout: float = 60.0):
+        if port is not None:
+            self._sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(socket_path)
+        self._file = self._sock.makefile("rb")
+        self._next_id = 0
+
+    def call(self, op: str, **params) -> Dict[str, Any]:
+        """
+        Send one request and wait for its answer.
+
+        Raises:
+            RuntimeError: If the service answered with an error
+        """
+        self._next_id += 1
+        request = {"id": self._next_id, "op": op, **params}
+        self._sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        response = json.loads(self._file.readline())
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error", "request failed"))
+        return response
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 6) CLI
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local sort / query / playlist service.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="load a features file and answer requests")
+    p_serve.add_argument("features_path", help="features CSV or binary song store")
+    p_serve.add_argument("--socket", default=DEFAULT_SOCKET)
+    p_serve.add_argument("--port", type=int, default=None, help="use TCP on 127.0.0.1 instead")
+    p_serve.add_argument("--workers", type=int, default=4)
+    p_serve.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL)
+
+    p_call = sub.add_parser("call", help="send one request to a running service")
+    p_call.add_argument("op", choices=OPS)
+    p_call.add_argument("params", nargs="?", default="{}",
+                        help='JSON object, e.g. \'{"by": "mood", "top": 10}\'')
+    p_call.add_argument("--socket", default=DEFAULT_SOCKET)
+    p_call.add_argument("--port", type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.features_path, args.socket, args.port, args.workers,
+                              args.reload_interval))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+    else:
+        with PlaylistClient(args.socket, args.port) as client:
+            print(json.dumps(client.call(args.op, **json.loads(args.params)), indent=2))
@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterator, List
+
+import metrics
+from cluster_greedy import cluster_greedy_order
+from greedy_engine import (feature_matrix, greedy_order, greedy_order_limited, greedy_orders,
+                           iter_greedy_order)
+from playlist_refine import refine_order
+from song_table import SongTable
+
+if TYPE_CHECKING:
+    # Only for annotations; DataFrame input works without importing pandas here
+    import pandas as pd
+
+# ===============================================================
+# Smart Playlist Generator: greedy playlists
+# Description:
+#   greedy_playlist(), iter_greedy_playlist(), greedy_playlists() and
+#   save_greedy_playlist() shared by Final_codes,
+#   integrated_playlist_generator.py and the smart_playlist package.
+#   Each takes a pandas DataFrame (the row-wise "pandas" engine is the
+#   reference) or a SongTable, and hands the walk to greedy_engine.py,
+#   playlist_refine.py or cluster_greedy.py.
+# ===============================================================
+
+
+# 1) DISTANCE AND START
+
+
+def feature_distance(songA, songB) -> float:
+    """
+    Calculate the Euclidean-like distance between two songs based on features.
+    
+    Distance = |tempo_A - tempo_B| + |mood_A - mood_B| + |energy_A - energy_B|
+    
+    Args:
+        songA (dict or pd.Series): First song with features
+        songB (dict or pd.Series): Second song with features
+    
+    Returns:
+        float: Distance between the two songs
+    """
+    return (abs(songA["tempo"] - songB["tempo"]) + 
+            abs(songA["mood"] - songB["mood"]) + 
+            abs(songA["energy"] - songB["energy"]))
+
+
+# greedy_playlist() engines -> greedy_engine.greedy_order() method
+ENGINES = {"auto": "auto", "numpy": "brute", "index": "index", "pandas": None}
+
+
+def choose_start(df: pd.DataFrame, start_idx: int = None, start_strategy: str = "low_energy"):
+    """
+    Pick the index label of the first song of a greedy playlist.
+    
+    Args:
+        df (pd.DataFrame): DataFrame with song features
+        start_idx (int): Specific index to start from (0-based). If None, uses start_strategy.
+        start_strategy (str): "low_energy", "high_energy", "low_mood", "high_mood" or "random"
+    
+    Returns:
+        Index label of the starting song
+    
+    Raises:
+        ValueError: If start_idx is out of range or invalid start_strategy
+    """
+    if start_idx is not None:
+        if start_idx < 0 or start_idx >= len(df):
+            raise ValueError(f"start_idx must be between 0 and {len(df)-1}")
+        return df.index[start_idx]
+
+    if start_strategy == "low_energy":
+        return df["energy"].idxmin()
+    elif start_strategy == "high_energy":
+        return df["energy"].idxmax()
+    elif start_strategy == "low_mood":
+        return df["mood"].idxmin()
+    elif start_strategy == "high_mood":
+        return df["mood"].idxmax()
+    elif start_strategy == "random":
+        return df.sample(1).index[0]
+    else:
+        raise ValueError('start_strategy must be one of: "low_energy", "high_energy", "low_mood", "high_mood", "random"')
+
+
+# 2) GREEDY PLAYLIST GENERATOR
+
+
+@metrics.timed("refine_playlist")
+def refine_playlist_order(features, order: List[int], refine_budget: float = None) -> List[int]:
+    """
+    Run the 2-opt / Or-opt post-pass (playlist_refine.py) on a greedy order
+    and report the transition cost before and after.
+    
+    Args:
+        features (np.ndarray): Feature matrix the order refers to
+        order (List[int]): Greedy ordering (positions)
+        refine_budget (float): Seconds to spend; None skips refinement
+    
+    Returns:
+        List[int]: Refined ordering (the input when refine_budget is None)
+    """
+    if refine_budget is None:
+        return order
+    result = refine_order(features, order, time_budget=refine_budget)
+    print(f" Refined playlist: transition cost {result.cost_before:.2f} -> {result.cost_after:.2f} "
+          f"({result.moves} moves, {result.seconds:.3f}s)")
+    return result.order
+
+
+def _metric(features, distances):
+    # refine_order() measures plain L1; scale the features to the cached metric
+    return features if distances is None else distances.weighted(features)
+
+
+def greedy_playlist(df: pd.DataFrame, start_idx: int = None, start_strategy: str = "low_energy",
+                    engine: str = "auto", refine_budget: float = None,
+                    distances=None, target_duration: float = None, max_tracks: int = None,
+                    tolerance: float = 0.0, clusters: int = None, workers: int = 1,
+                    partition: str = "kmeans") -> pd.DataFrame:
+    """
+    Generate a smooth playlist using greedy algorithm.
+    
+    df may also be a SongTable; the playlist is then returned as a SongTable.
+    
+    The greedy algorithm:
+    1. Selects a starting song
+    2. At each step, selects the next unused song with minimum feature distance
+    3. Continues until all songs are sequenced
+    
+    Time Complexity: O(n^2), or O(k*n) when limited to k tracks
+    Space Complexity: O(n)
+    
+    Args:
+        df (pd.DataFrame): DataFrame with song features (must have: tempo, mood, energy)
+        start_idx (int): Specific index to start from (0-based). If None, uses start_strategy.
+        start_strategy (str): Strategy for choosing starting song if start_idx is None.
+                             Options: "low_energy", "high_energy", "low_mood", "high_mood", "random"
+        engine (str): "numpy" (vectorized scan, see greedy_engine.py), "index"
+                      (KD-tree lookups), "auto" (index for large libraries) or
+                      "pandas" (row-wise reference implementation). All give the same order.
+        refine_budget (float): If given, improve the greedy order with 2-opt / Or-opt
+                               for at most this many seconds (not with "pandas")
+        distances (DistanceCache): Weighted, normalized distances of the rows of df
+                                   (distance_cache.py); replaces feature_distance.
+                                   A cached matrix is scanned, so not with "index"
+        target_duration (float): Stop once the playlist lasts this many seconds
+                                 (within tolerance); only songs that still fit are chosen
+        max_tracks (int): Stop after this many songs
+        tolerance (float): Allowed deviation from target_duration, in seconds
+        clusters (int): If given, partition the songs into this many clusters
+                        and run the greedy walk inside each one (cluster_greedy.py);
+                        faster on large libraries, not the same order
+        workers (int): Worker processes for the cluster walks (0 = one per CPU core)
+        partition (str): "kmeans" or "grid" clusters
+    
+    Returns:
+        pd.DataFrame: DataFrame with songs ordered by greedy algorithm
+    
+    Raises:
+        ValueError: If start_idx is out of range, or invalid start_strategy or engine,
+                    or clusters with target_duration / max_tracks, or if the start
+                    song alone is longer than target_duration + tolerance
+    """
+    if engine not in ENGINES:
+        raise ValueError('engine must be one of: "auto", "numpy", "index", "pandas"')
+    limited = target_duration is not None or max_tracks is not None
+    if engine == "pandas" and (refine_budget is not None or distances is not None or limited
+                               or clusters is not None):
+        raise ValueError('engine "pandas" is the unweighted, unrefined, full-length, flat reference')
+    if clusters is not None and limited:
+        raise ValueError("clusters sequence the whole library; drop target_duration / max_tracks")
+
+    # Timed per start strategy
+    stage = f"greedy_playlist:{start_strategy if start_idx is None else 'start_idx'}"
+
+    def walk(features, start, durations):
+        with metrics.stage(stage):
+            if limited:
+                return greedy_order_limited(features, start, durations, target_duration, max_tracks,
+                                            tolerance, ENGINES[engine], distances)
+            if clusters is not None:
+                return cluster_greedy_order(_metric(features, distances), start, clusters,
+                                            workers, partition, ENGINES[engine])
+            return greedy_order(features, start, ENGINES[engine], distances)
+
+    if isinstance(df, SongTable):
+        if engine == "pandas":
+            raise ValueError('engine "pandas" needs a DataFrame')
+        start = df.start_position(start_idx, start_strategy)
+        features = df.feature_matrix()
+        order = walk(features, start, df.duration)
+        return df.take(refine_playlist_order(_metric(features, distances), order, refine_budget))
+
+    used = set()
+    current_idx = choose_start(df, start_idx, start_strategy)
+
+    if engine != "pandas":
+        features = feature_matrix(df)
+        durations = df["duration"].to_numpy(dtype=float) if limited else None
+        order = walk(features, df.index.get_loc(current_idx), durations)
+        return df.iloc[refine_playlist_order(_metric(features, distances), order, refine_budget)]
+    
+    playlist_indices = [current_idx]
+    used.add(current_idx)
+
+    # Greedily select next songs
+    with metrics.stage(stage):
+        while len(used) < len(df):
+            current_song = df.loc[current_idx]
+            candidates = df[~df.index.isin(used)]
+            next_idx = candidates.apply(lambda x: feature_distance(x, current_song), axis=1).idxmin()
+            playlist_indices.append(next_idx)
+            used.add(next_idx)
+            current_idx = next_idx
+
+    return df.loc[playlist_indices]
+
+
+def iter_greedy_playlist(df: pd.DataFrame, start_idx: int = None, start_strategy: str = "low_energy",
+                         engine: str = "auto", distances=None, target_duration: float = None,
+                         max_tracks: int = None, tolerance: float = 0.0) -> Iterator[Any]:
+    """
+    Streaming greedy_playlist(): yields each song as soon as it is chosen.
+    
+    The starting song is yielded after one O(n) pass and every next song
+    after one more, so playback can start before the rest of the library
+    is sequenced.  Stop iterating (or close() the generator) to stop
+    early; nothing beyond the songs taken is computed.  The songs come
+    in the same order as greedy_playlist() without refine_budget.
+    
+    Args:
+        df (pd.DataFrame): DataFrame with song features, or a SongTable
+        start_idx, start_strategy, engine, distances, target_duration,
+        max_tracks, tolerance: As in greedy_playlist() ("pandas" is not
+                               available)
+    
+    Yields:
+        pd.Series (one row of df), or SongRow for a SongTable
+    
+    Raises:
+        ValueError: If start_idx is out of range, or invalid start_strategy or engine
+    """
+    if engine not in ENGINES or engine == "pandas":
+        raise ValueError('engine must be one of: "auto", "numpy", "index"')
+
+    if isinstance(df, SongTable):
+        start = df.start_position(start_idx, start_strategy)
+        features, durations = df.feature_matrix(), df.duration
+        song = df.__getitem__
+    else:
+        start = df.index.get_loc(choose_start(df, start_idx, start_strategy))
+        features = feature_matrix(df)
+        durations = df["duration"].to_numpy(dtype=float) if target_duration is not None else None
+        song = df.iloc.__getitem__
+
+    for pos in iter_greedy_order(features, start, durations, target_duration, max_tracks,
+                                 tolerance, ENGINES[engine], distances):
+        yield song(pos)
+
+
+def greedy_playlists(df: pd.DataFrame, starts: List[Any], engine: str = "auto",
+                     refine_budget: float = None, distances=None) -> List[pd.DataFrame]:
+    """
+    Generate several greedy playlists over the same songs in one batch.
+    
+    The feature matrix (and KD-tree index) is built once and the walks run
+    together, so six start strategies cost about as much as one playlist.
+    
+    Args:
+        df (pd.DataFrame or SongTable): Song features (must have: tempo, mood, energy)
+        starts (list): Each entry is a start_strategy name (str) or a start_idx (int)
+        engine (str): "auto", "numpy" or "index", as in greedy_playlist()
+        refine_budget (float): Seconds of 2-opt / Or-opt refinement per playlist (None: off)
+        distances (DistanceCache): Precomputed distances, as in greedy_playlist()
+    
+    Returns:
+        List[pd.DataFrame]: One playlist per entry of starts, in the same order
+    
+    Raises:
+        ValueError: If a start is invalid or engine is "pandas"/unknown
+    """
+    if engine not in ENGINES or engine == "pandas":
+        raise ValueError('engine must be one of: "auto", "numpy", "index"')
+
+    if isinstance(df, SongTable):
+        positions = [df.start_position(start_strategy=start) if isinstance(start, str)
+                     else df.start_position(start_idx=start) for start in starts]
+        features = df.feature_matrix()
+        with metrics.stage("greedy_playlists"):
+            orders = greedy_orders(features, positions, ENGINES[engine], distances)
+        metrics.count("greedy_playlists.walks", len(orders))
+        metric = _metric(features, distances)
+        return [df.take(refine_playlist_order(metric, order, refine_budget)) for order in orders]
+
+    positions = []
+    for start in starts:
+        if isinstance(start, str):
+            label = choose_start(df, start_strategy=start)
+        else:
+            label = choose_start(df, start_idx=start)
+        positions.append(df.index.get_loc(label))
+
+    features = feature_matrix(df)
+    with metrics.stage("greedy_playlists"):
+        orders = greedy_orders(features, positions, ENGINES[engine], distances)
+    metrics.count("greedy_playlists.walks", len(orders))
+    metric = _metric(features, distances)
+    return [df.iloc[refine_playlist_order(metric, order, refine_budget)] for order in orders]
+
+
+
+# 3) SAVE GREEDY PLAYLIST
+
+
+# Column order of greedy playlist CSVs
+GREEDY_COLUMNS = ("file", "tempo", "energy", "mood", "duration")
+
+@metrics.timed("save_greedy_playlist")
+def save_greedy_playlist(df: pd.DataFrame, filename: str) -> None:
+    """
+    Save greedy playlist to CSV file.
+    
+    Args:
+        df (pd.DataFrame or SongTable): Playlist
+        filename (str): Output CSV filename
+    """
+    try:
+        if isinstance(df, SongTable):
+            df.save_csv(filename, columns=GREEDY_COLUMNS)
+        else:
+            df.to_csv(filename, index=False, encoding="utf-8")
+        print(f"Saved: {filename}")
+    except IOError as e:
+        print(f"Error saving file '{filename}': {e}")
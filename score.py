@@ -10,7 +10,12 @@
 #   The results are saved into a CSV file for later algorithmic use.
 # ===============================================================
 
-import sys, glob, librosa, numpy as np, pandas as pd, os
+import csv, glob, itertools, math, numpy as np, os, time, argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import metrics
+from feature_cache import FeatureCache
+from song_table import FIELDS, SongTable, save_song_store
 
 # ========================
 #   CONFIGURABLE PARAMS
@@ -18,6 +23,22 @@ import sys, glob, librosa, numpy as np, pandas as pd, os
 SR = 22050           # Sampling rate (Hz) – resample all songs for consistency
 HOP = 512            # Hop length for analysis – smaller = more precise but slower
 SEG = 25             # Analyze only the middle 25 seconds of each song
+PROGRESS_EVERY = 10  # Seconds between progress reports in main()
+SCORE_VERSION = 3    # Bump when score() changes, to invalidate feature caches
+PREROLL = 0.5        # Seconds decoded before/after the window by load_mid_window()
+N_FFT = 2048         # Frame length of the spectrogram and of the RMS frames
+FRAME_BLOCK = 64     # Frames per FFT block in segment_features() (keeps the work in cache)
+IN_FLIGHT = 4        # Files queued per pool worker in main() (bounds memory and Ctrl-C latency)
+
+# Mood formula: z-scores of tempo and loudness, squashed by a sigmoid
+TEMPO_MEAN, TEMPO_STD = 120.0, 30.0    # Empirical stats for pop music
+ENERGY_MEAN, ENERGY_STD = 0.05, 0.03   # Typical RMS range (for z-score scaling)
+TEMPO_WEIGHT, ENERGY_WEIGHT = 0.6, 0.4  # Tempo contributes more than energy
+
+# Output CSV layout (readable by load_songs(), which only needs
+# file/mood/tempo/energy/duration)
+OUT_COLUMNS = ["file", "tempo", "energy", "mood", "duration", "error",
+               "tempo_bpm", "energy_pct", "mood_pct", "duration_s"]
 
 # ---------------------------------------------------------------
 # Helper: load_mid()
@@ -32,6 +53,7 @@ def load_mid(y, sr, seg=SEG):
     Returns:
       (trimmed_audio, total_duration)
     """
+    import librosa
     d = librosa.get_duration(y=y, sr=sr)
     if d <= seg:
         # If the song is short, use the full audio
@@ -42,114 +64,597 @@ def load_mid(y, sr, seg=SEG):
     return y[mid - half : mid + half], d
 
 
+# ---------------------------------------------------------------
+# Helper: load_mid_window()
+# ---------------------------------------------------------------
+def load_mid_window(path, sr=SR, seg=SEG):
+    """
+    Decode only the centered 'seg' seconds of an audio file.
+
+    Why:
+      - load_mid() needs the whole track decoded and resampled, then
+        throws ~90% of it away
+      - here the length comes from the file header, and only the
+        window is decoded (seek/read) and resampled
+      - an MP3 decoder that starts mid-stream lacks the bit reservoir
+        and overlap of the frames before, so its first few hundred ms
+        differ from a full decode; PREROLL seconds are decoded on both
+        sides (also covering the resampler's edges) and trimmed off
+      - the read starts at a native frame that falls exactly on an
+        output sample (integer arithmetic, no float offset), so the
+        resampled slice lines up with the full decode sample for sample
+    Returns:
+      (trimmed_audio, total_duration) like load_mid() (within ~1e-6),
+      or None if the header has no usable length (caller falls back to
+      load_mid)
+    """
+    import librosa
+    import soundfile as sf
+    try:
+        info = sf.info(path)
+    except Exception:
+        return None
+    if info.frames <= 0 or info.samplerate <= 0:
+        return None
+
+    # Length the fully decoded track would have after resampling to 'sr'
+    native = int(info.samplerate)
+    n = -(-info.frames * sr // native)
+    d = n / sr
+    if d <= seg:
+        # Short song: the whole file is needed anyway
+        y, _ = librosa.load(path, sr=sr, mono=True)
+        return y, librosa.get_duration(y=y, sr=sr)
+
+    # Same window as load_mid(), in samples at 'sr', plus the pre-roll.
+    # Output sample j sits on native frame j * native / sr, an integer
+    # when j is a multiple of 'step'; the read starts on such a sample.
+    mid = n // 2
+    half = int(seg * sr // 2)
+    roll = int(PREROLL * sr)
+    step = sr // math.gcd(sr, native)
+    first = max(mid - half - roll, 0) // step * step
+    pre = mid - half - first
+    frames = -(-(pre + 2 * half + roll) * native // sr)
+    with sf.SoundFile(path) as f:
+        f.seek(first * native // sr)
+        y = f.read(frames=frames, dtype="float32", always_2d=False).T
+    y = librosa.to_mono(y)
+    if native != sr:
+        y = librosa.resample(y, orig_sr=native, target_sr=sr, res_type="soxr_hq")
+    return y[pre : pre + 2 * half], d
+
+
+# ---------------------------------------------------------------
+# Helper: spectral_setup()
+# ---------------------------------------------------------------
+_SETUP = {}
+
+
+def spectral_setup(sr=SR):
+    """
+    Analysis window and mel filter bank for 'sr', built once per process.
+
+    librosa rebuilds both on every beat.tempo() call; they only depend
+    on the sampling rate and N_FFT.
+    Returns:
+      (window column of shape (N_FFT, 1), mel basis (128, 1 + N_FFT // 2))
+    """
+    setup = _SETUP.get(sr)
+    if setup is None:
+        import librosa
+        window = librosa.filters.get_window("hann", N_FFT, fftbins=True)
+        mel_basis = librosa.filters.mel(sr=sr, n_fft=N_FFT)
+        setup = _SETUP[sr] = (window.astype(np.float32).reshape(-1, 1), mel_basis)
+    return setup
+
+
+def sigmoid(x):
+    # Maps values smoothly into [0,1]
+    return 1 / (1 + np.exp(-x))
+
+
+def mood_score(tempo, rms_mean):
+    """
+    Combine tempo and loudness into an interpretable mood indicator (0–1).
+
+    Higher tempo + higher loudness = more energetic or "happier".
+    Lower tempo + softer sound = calmer or "sadder".
+    Works on floats and on NumPy arrays alike.
+    """
+    zt = (tempo - TEMPO_MEAN) / TEMPO_STD
+    ze = (rms_mean - ENERGY_MEAN) / ENERGY_STD
+    return np.clip(TEMPO_WEIGHT * sigmoid(zt) + ENERGY_WEIGHT * sigmoid(ze), 0.0, 1.0)
+
+
+# ---------------------------------------------------------------
+# Core: segment_features()
+# ---------------------------------------------------------------
+def segment_features(segments, sr=SR):
+    """
+    Tempo, energy and mood of audio segments from one shared framing.
+
+    Why:
+      - beat.tempo() frames and transforms the segment for its onset
+        envelope, and feature.rms() frames it again
+      - here the segment is padded and framed once; each block of
+        frames gives both its RMS (time domain, like feature.rms) and
+        its power spectrum, from which the mel spectrogram, onset
+        envelope and tempo follow (like beat.tempo)
+    The values equal the separate librosa calls (same frames, same
+    formulas): tempo exactly, RMS-based energy and mood to float32
+    rounding (relative difference below 1e-6).
+
+    Args:
+      segments: one segment (n,) or equal-length segments stacked as
+        (k, n); stacked segments share the onset / tempo calls (fewer
+        calls, but no less CPU once the stacked tempogram outgrows the
+        cache; see benchmarks/bench_score_features.py)
+      sr: sampling rate of the segments
+    Returns:
+      (tempo, energy, mood, rms_mean): float64 arrays of shape (k,)
+    """
+    import librosa
+    window, mel_basis = spectral_setup(sr)
+    y = np.atleast_2d(np.asarray(segments, dtype=np.float32))
+    k = y.shape[0]
+
+    # Centered frames, zero padded like librosa's center=True default
+    padded = np.pad(y, [(0, 0), (N_FFT // 2, N_FFT // 2)])
+    frames = librosa.util.frame(padded, frame_length=N_FFT, hop_length=HOP)
+    t = frames.shape[-1]
+    fft = librosa.get_fftlib()
+
+    # One pass over each segment's frames, a block at a time: mean
+    # square (for RMS) and windowed power spectrum of the same block,
+    # then the segment's log-power mel spectrogram
+    ms = np.empty((k, t), dtype=np.float32)
+    db = np.empty((k, mel_basis.shape[0], t), dtype=np.float32)
+    power = np.empty((1 + N_FFT // 2, t), dtype=np.float32)
+    with metrics.stage("score.spectrum"):
+        for i in range(k):
+            for lo in range(0, t, FRAME_BLOCK):
+                block = frames[i, :, lo : lo + FRAME_BLOCK]
+                ms[i, lo : lo + FRAME_BLOCK] = np.mean(np.abs(block) ** 2, axis=0)
+                spec = fft.rfft(window * block, axis=0)
+                power[:, lo : lo + FRAME_BLOCK] = spec.real ** 2 + spec.imag ** 2
+            mel = np.einsum("ft,mf->mt", power, mel_basis, optimize=True)
+            # power_to_db(ref=1.0, top_db=80)
+            db[i] = 10.0 * np.log10(np.maximum(1e-10, mel))
+            np.maximum(db[i], db[i].max() - 80.0, out=db[i])
+
+    # ---- TEMPO (BPM) ----
+    # Onset envelope, then the tempogram's median tempo, as
+    # beat.tempo() does; stacked segments share these calls
+    with metrics.stage("score.tempo"):
+        onset = librosa.onset.onset_strength(S=db, sr=sr, hop_length=HOP)
+        tempo = librosa.feature.tempo(onset_envelope=onset, sr=sr, hop_length=HOP,
+                                      aggregate=np.median).reshape(k).astype(np.float64)
+
+    # ---- ENERGY ----
+    # Frame-wise RMS (Root Mean Square) amplitude = loudness.
+    # Dynamic normalization to [0,1]:
+    # use the 95th percentile RMS of this track as reference loudness.
+    # This avoids saturation for modern loudly mastered tracks.
+    rms = np.sqrt(ms)
+    rms_mean = rms.mean(axis=1, dtype=np.float32).astype(np.float64)
+    ref = np.percentile(rms, 95, axis=1).astype(np.float64)
+    loud = ref > 1e-8
+    energy = np.zeros(k)
+    energy[loud] = np.clip(rms_mean[loud] / ref[loud], 0.0, 1.0)
+
+    return tempo, energy, mood_score(tempo, rms_mean), rms_mean
+
+
+# ---------------------------------------------------------------
+# Helper: decode()
+# ---------------------------------------------------------------
+def decode(mp3, partial_decode=True):
+    """
+    Decode the analysed segment of one file.
+
+    Returns:
+      (segment, duration) at sampling rate SR
+    """
+    with metrics.stage("score.decode"):
+        window = load_mid_window(mp3) if partial_decode else None
+        if window is not None:
+            return window
+        import librosa
+        # Load audio (mono) and resample to SR
+        y, sr = librosa.load(mp3, sr=SR, mono=True)
+        # Take only the middle SEG seconds for consistent analysis
+        return load_mid(y, sr)
+
+
 # ---------------------------------------------------------------
 # Core: score()
 # ---------------------------------------------------------------
-def score(mp3):
+def score(mp3, partial_decode=True):
     """
     Analyze one MP3 file and return its musical feature scores.
 
+    With partial_decode (default) only the analysed window is decoded;
+    set it to False to decode the full track as before.
+
     Returns:
         tempo   – beats per minute (BPM)
         energy  – normalized RMS loudness (0–1)
         mood    – interpretable mood score (0–1)
         dur     – duration (seconds)
     """
-    # Load audio (mono) and resample to SR
-    y, sr = librosa.load(mp3, sr=SR, mono=True)
+    y, dur = decode(mp3, partial_decode)
+    tempo, energy, mood, _ = segment_features(y)
+    return float(tempo[0]), float(energy[0]), float(mood[0]), dur
 
-    # Take only the middle SEG seconds for consistent analysis
-    y, dur = load_mid(y, sr)
 
-    # ---- TEMPO (BPM) ----
-    # Use librosa's beat detection to estimate global tempo
-    tempo = float(librosa.beat.tempo(y=y, sr=sr, hop_length=HOP, aggregate=np.median))
+# ---------------------------------------------------------------
+# Helper: error_row()
+# ---------------------------------------------------------------
+def error_row(mp3, e):
+    """Row of NaN features with an 'error' message for a failed file."""
+    return {
+        "file": mp3,
+        "tempo": np.nan,
+        "energy": np.nan,
+        "mood": np.nan,
+        "duration": np.nan,
+        "error": str(e)
+    }
 
-    # ---- ENERGY ----
-    # Compute frame-wise RMS (Root Mean Square) amplitude = loudness
-    rms_frames = librosa.feature.rms(y=y, frame_length=2048, hop_length=HOP).flatten()
-    rms_mean = float(rms_frames.mean())
 
-    # Dynamic normalization to [0,1]:
-    # use the 95th percentile RMS of this track as reference loudness.
-    # This avoids saturation for modern loudly mastered tracks.
-    ref = float(np.percentile(rms_frames, 95))
-    if ref <= 1e-8:
-        energy = 0.0
+# ---------------------------------------------------------------
+# Helper: score_row()
+# ---------------------------------------------------------------
+def score_row(mp3):
+    """
+    Score one file into a CSV row (dict).
+
+    Errors are isolated per file: a failing file becomes a row of NaN
+    features with an 'error' message instead of stopping the scan.
+    Runs inside pool workers, so it must stay a top-level function.
+    In a worker collecting metrics, the worker's numbers so far travel
+    back with the row under "_metrics" (see main()).
+    """
+    try:
+        tempo, energy, mood, dur = score(mp3)
+        row = {
+            "file": mp3,
+            "tempo": tempo,
+            "energy": energy,
+            "mood": mood,
+            "duration": dur
+        }
+    except Exception as e:
+        row = error_row(mp3, e)
+    if metrics.is_worker():
+        row["_metrics"] = metrics.snapshot(reset=True)
+    return row
+
+
+# ---------------------------------------------------------------
+# Helper: report_progress()
+# ---------------------------------------------------------------
+def report_progress(done, total, started):
+    """Print files done, throughput (files/s) and estimated time left."""
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    rate = done / elapsed
+    if rate > 0:
+        eta = int((total - done) / rate)
+        eta_s = f"{eta // 3600}:{eta // 60 % 60:02d}:{eta % 60:02d}"
     else:
-        energy = float(np.clip(rms_mean / ref, 0.0, 1.0))
+        eta_s = "--:--:--"
+    print(f"[PROGRESS] {done}/{total} files  {rate:.2f} files/s  ETA {eta_s}", flush=True)
+
+
+# ---------------------------------------------------------------
+# Helper: csv_row()
+# ---------------------------------------------------------------
+def csv_row(row):
+    """
+    Turn a scored row into an output CSV record (list of cells).
+
+    Adds the human-readable helper columns (rounded values) and writes
+    missing values as empty cells, like pandas' to_csv() did.
+    """
+    out = dict(row)
+    out.setdefault("error", "")
+    out["tempo_bpm"] = round(row["tempo"], 0)
+    out["energy_pct"] = round(row["energy"] * 100, 0)
+    out["mood_pct"] = round(row["mood"] * 100, 0)
+    out["duration_s"] = round(row["duration"], 1)
+    return ["" if isinstance(out[c], float) and math.isnan(out[c]) else out[c]
+            for c in OUT_COLUMNS]
+
+
+# ---------------------------------------------------------------
+# Helper: read_done()
+# ---------------------------------------------------------------
+def read_done(outcsv):
+    """
+    Rows already present in a partial output CSV (for --resume).
+
+    A last line cut off by a crash is removed from the file, so that
+    file is simply analysed again.  A CSV written with an older column
+    layout (e.g. without the "error" column) is rewritten with
+    OUT_COLUMNS first, so the appended rows line up with the header.
+
+    Raises:
+        ValueError: If the header is not a subset of OUT_COLUMNS
+    """
+    with open(outcsv, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+    with open(outcsv, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        header = reader.fieldnames or []
+
+    if header != OUT_COLUMNS:
+        if "file" not in header or not set(header) <= set(OUT_COLUMNS):
+            raise ValueError(f"cannot resume {outcsv}: unexpected columns {header}")
+        print(f"[RESUME] Rewriting {outcsv} with the current columns")
+        tmp = outcsv + ".tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(OUT_COLUMNS)
+            writer.writerows([row.get(c, "") for c in OUT_COLUMNS] for row in rows)
+        os.replace(tmp, outcsv)
+        rows = [{c: row.get(c, "") for c in OUT_COLUMNS} for row in rows]
+    return rows
+
+
+# ---------------------------------------------------------------
+# Helper: OrderedCsvWriter
+# ---------------------------------------------------------------
+class OrderedCsvWriter:
+    """
+    Stream rows to the output CSV in file order.
+
+    Rows may arrive in any order (pool workers finish out of order);
+    row i is written and flushed as soon as rows 0..i are all known, so
+    only the few out-of-order results are ever held in memory.
+    """
+
+    def __init__(self, outcsv, append=False, store=None):
+        self.store = store
+        self.f = open(outcsv, "a" if append else "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.f, lineterminator="\n")
+        if not append:
+            self.writer.writerow(OUT_COLUMNS)
+            self.f.flush()
+        self.next = 0
+        self.pending = {}
+
+    def put(self, i, row):
+        self.pending[i] = row
+        while self.next in self.pending:
+            row = self.pending.pop(self.next)
+            self.writer.writerow(csv_row(row))
+            if self.store is not None:
+                self.store.add(row)
+            self.next += 1
+        self.f.flush()
 
-    # ---- MOOD SCORE ----
-    # Combine tempo and loudness into an interpretable mood indicator.
-    # Higher tempo + higher loudness = more energetic or "happier".
-    # Lower tempo + softer sound = calmer or "sadder".
-    tempo_mean, tempo_std = 120.0, 30.0   # Empirical stats for pop music
-    energy_mean, energy_std = 0.05, 0.03  # Typical RMS range (for z-score scaling)
+    def close(self):
+        self.f.close()
 
-    zt = (tempo - tempo_mean) / max(tempo_std, 1e-6)
-    ze = (rms_mean - energy_mean) / max(energy_std, 1e-6)
 
-    # Sigmoid function maps values smoothly into [0,1]
-    sig = lambda x: 1 / (1 + np.exp(-x))
-    # Weighted combination: tempo contributes more than energy
-    mood = float(np.clip(0.6 * sig(zt) + 0.4 * sig(ze), 0.0, 1.0))
+# ---------------------------------------------------------------
+# Helper: StoreColumns
+# ---------------------------------------------------------------
+class StoreColumns:
+    """
+    Feature columns collected for the binary song store (--store).
+
+    Only rows with valid features are kept, like load_songs() does.
+    """
+
+    def __init__(self):
+        self.files = []
+        self.cols = [[] for _ in FIELDS]
+
+    def add(self, row):
+        try:
+            values = [float(row[c]) for c in FIELDS]
+        except (KeyError, TypeError, ValueError):
+            return
+        if any(math.isnan(v) for v in values):
+            return
+        self.files.append(row["file"])
+        for col, v in zip(self.cols, values):
+            col.append(v)
+
+    def save(self, path):
+        save_song_store(SongTable.from_columns(self.files, *self.cols), path)
+
+
+# ---------------------------------------------------------------
+# Helper: run_pool()
+# ---------------------------------------------------------------
+def run_pool(pool, files, todo, in_flight, collect):
+    """
+    Score files[i] for i in 'todo' on 'pool', passing each row to
+    collect(i, row, done) as it completes.
+
+    At most 'in_flight' files are submitted at a time, so an aborted
+    scan has little queued work to cancel.  A file whose future fails
+    (e.g. the row cannot be sent back) becomes an error row.
+
+    Raises:
+        RuntimeError: If a worker process died (the pool is unusable;
+            the rows written so far are kept for --resume)
+    """
+    queue = iter(todo)
+    pending = {}
 
-    return tempo, energy, mood, dur
+    def submit(n):
+        for i in itertools.islice(queue, n):
+            pending[pool.submit(score_row, files[i])] = i
+
+    submit(in_flight)
+    done = 0
+    while pending:
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in finished:
+            i = pending.pop(fut)
+            try:
+                row = fut.result()
+            except BrokenProcessPool as e:
+                raise RuntimeError(f"a worker process died ({len(pending) + 1} files in "
+                                   f"flight); rerun with --resume") from e
+            except Exception as e:
+                row = error_row(files[i], e)
+            done += 1
+            collect(i, row, done)
+        submit(len(finished))
 
 
 # ---------------------------------------------------------------
 # Main: process entire folder
 # ---------------------------------------------------------------
-def main(indir, outcsv):
+def main(indir, outcsv, workers=1, cache_path=None, use_hash=False, resume=False,
+         store_path=None):
     """
     Walk through all MP3 files under 'indir',
     analyze each one with score(), and write a summary CSV.
-    """
-    rows = []
 
+    Rows are streamed to 'outcsv' (and flushed) as they are scored, so
+    an interrupted scan keeps its results; with resume, files already
+    in 'outcsv' are skipped and new rows are appended.
+
+    With workers > 1 the files are spread over a process pool; rows
+    are still written in sorted file order, whichever worker finishes
+    first.  workers=0 uses one worker per CPU core.  Only a few files
+    per worker are queued at a time (see run_pool()); on an error or
+    Ctrl-C the queued ones are cancelled.
+
+    With cache_path, features are kept in a persistent FeatureCache:
+    only new or changed files are analysed, entries of deleted files
+    are dropped, and the rest is merged in from the cache.  use_hash
+    also matches files by content (e.g. after a move or touch).
+
+    With store_path, the valid rows are also written as a binary song
+    store (see song_table.py) that the playlist scripts can memory-map.
+    """
     # Recursively find all .mp3 files in the directory
-    for mp3 in sorted(glob.glob(os.path.join(indir, "**/*.mp3"), recursive=True)):
-        try:
-            tempo, energy, mood, dur = score(mp3)
-            rows.append({
-                "file": mp3,
-                "tempo": tempo,
-                "energy": energy,
-                "mood": mood,
-                "duration": dur
-            })
-        except Exception as e:
+    all_files = sorted(glob.glob(os.path.join(indir, "**/*.mp3"), recursive=True))
+
+    append = resume and os.path.exists(outcsv) and os.path.getsize(outcsv) > 0
+    done_rows = read_done(outcsv) if append else []
+    done_files = {row["file"] for row in done_rows}
+    files = [mp3 for mp3 in all_files if mp3 not in done_files]
+    if append:
+        print(f"[RESUME] {len(all_files) - len(files)} files already in {outcsv}")
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    cache = None
+    cached = {}
+    todo = list(range(len(files)))
+    if cache_path:
+        params = {"SR": SR, "HOP": HOP, "SEG": SEG, "version": SCORE_VERSION}
+        cache = FeatureCache(cache_path, params, use_hash=use_hash)
+        todo = []
+        for i, mp3 in enumerate(files):
+            try:
+                row = cache.lookup(mp3)
+            except OSError:
+                row = None
+            if row is None:
+                todo.append(i)
+            else:
+                cached[i] = row
+        removed = cache.prune(all_files)
+        print(f"[CACHE] {len(files) - len(todo)} cached, {len(todo)} to analyse, {removed} removed")
+        metrics.count("score.cached", len(files) - len(todo))
+
+    store = None
+    if store_path:
+        store = StoreColumns()
+        for row in done_rows:
+            store.add(row)
+
+    out = OrderedCsvWriter(outcsv, append=append, store=store)
+    for i, row in cached.items():
+        out.put(i, row)
+
+    started = time.perf_counter()
+    last_report = started
+
+    def collect(i, row, done):
+        nonlocal last_report
+        metrics.merge(row.pop("_metrics", None))
+        metrics.count("score.files")
+        if "error" in row:
             # Log any decoding or analysis error but continue
-            print(f"[WARN] Failed on {mp3}: {e}")
-            rows.append({
-                "file": mp3,
-                "tempo": np.nan,
-                "energy": np.nan,
-                "mood": np.nan,
-                "duration": np.nan,
-                "error": str(e)
-            })
-
-    # Build a DataFrame from all results
-    df = pd.DataFrame(rows)
-
-    # Add human-readable helper columns (rounded values)
-    df["tempo_bpm"]  = df["tempo"].round(0)
-    df["energy_pct"] = (df["energy"] * 100).round(0)
-    df["mood_pct"]   = (df["mood"] * 100).round(0)
-    df["duration_s"] = df["duration"].round(1)
-
-    # Save as UTF-8 CSV for easy import later
-    df.to_csv(outcsv, index=False, encoding="utf-8")
+            print(f"[WARN] Failed on {row['file']}: {row['error']}")
+            metrics.count("score.errors")
+        elif cache is not None:
+            cache.store(row["file"], row)
+        out.put(i, row)
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_EVERY or done == len(todo):
+            report_progress(done, len(todo), started)
+            last_report = now
+
+    try:
+        if workers <= 1:
+            for done, i in enumerate(todo, 1):
+                collect(i, score_row(files[i]), done)
+        else:
+            init = metrics.start_worker if metrics.enabled() else None
+            with ProcessPoolExecutor(max_workers=workers, initializer=init) as pool:
+                try:
+                    run_pool(pool, files, todo, workers * IN_FLIGHT, collect)
+                except BaseException:
+                    # Error or Ctrl-C: drop the queued files, wait only for running ones
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise
+    finally:
+        # Keep whatever was analysed, even if the scan was interrupted
+        out.close()
+        if cache is not None:
+            cache.close()
+
     print(f"✅ Features saved to: {outcsv}")
 
+    if store is not None:
+        store.save(store_path)
+        print(f"✅ Binary store saved to: {store_path} ({len(store.files)} songs)")
+
 
 # ---------------------------------------------------------------
 # CLI entry point
 # ---------------------------------------------------------------
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python score.py <music_dir> <out_csv>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Extract tempo, energy, mood and duration from a folder of MP3 files.")
+    parser.add_argument("music_dir", help="folder to scan recursively for .mp3 files")
+    parser.add_argument("out_csv", help="output CSV path")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (0 = one per CPU core, default 1)")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="persistent feature cache (SQLite); only new/changed files are analysed")
+    parser.add_argument("--hash", action="store_true",
+                        help="also match cached files by content hash (survives moves and touches)")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip files already in out_csv and append the rest")
+    parser.add_argument("--store", metavar="PATH",
+                        help="also write a memory-mappable binary song store")
+    parser.add_argument("--metrics", metavar="OUT_JSON",
+                        help="write per-phase timing / memory metrics to this file")
+    args = parser.parse_args()
 
-    main(sys.argv[1], sys.argv[2])
+    if args.metrics:
+        metrics.enable()
+    try:
+        main(args.music_dir, args.out_csv, workers=args.workers,
+             cache_path=args.cache, use_hash=args.hash, resume=args.resume,
+             store_path=args.store)
+    finally:
+        if args.metrics:
+            metrics.write_report(args.metrics)
@@ -0,0 +1,76 @@
+# ===============================================================
+# Smart Playlist Generator: package entry point
+# Description:
+#   One import for the whole pipeline and the command line:
+#
+#       import smart_playlist as sp
+#       songs = sp.load_indexed_table("songs_features.csv")
+#       sp.save_csv(sp.recommended_sort(songs), "recommended_sorted.csv")
+#
+#       python -m smart_playlist score <music_dir> <out_csv>
+#       python -m smart_playlist sort <features> <out_csv> --by recommended
+#       python -m smart_playlist playlist <features> <out_csv> --target-duration 3600
+#
+#   The names below are imported from their modules on first use
+#   (PEP 562), so importing the package loads neither NumPy nor
+#   pandas / librosa, and each subcommand only loads what it runs.
+# ===============================================================
+
+import importlib
+import os
+import sys
+
+# The pipeline modules live next to this package.  Their names are
+# generic (metrics, songs, score, dedup), so the root goes first on
+# sys.path: an installed distribution of the same name must not win.
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if sys.path[:1] != [_ROOT]:
+    if _ROOT in sys.path:
+        sys.path.remove(_ROOT)
+    sys.path.insert(0, _ROOT)
+
+# public name -> module it comes from
+_EXPORTS = {
+    "Song": "songs",
+    "load_songs": "songs",
+    "merge_sort": "songs",
+    "recommended_sort": "songs",
+    "custom_sort": "songs",
+    "save_csv": "songs",
+    "SongTable": "song_table",
+    "load_song_table": "song_table",
+    "save_song_store": "song_table",
+    "load_indexed_table": "sorted_index",
+    "query": "song_query",
+    "greedy_order": "greedy_engine",
+    "greedy_order_limited": "greedy_engine",
+    "iter_greedy_order": "greedy_engine",
+    "greedy_playlist": "playlists",
+    "greedy_playlists": "playlists",
+    "iter_greedy_playlist": "playlists",
+    "refine_order": "playlist_refine",
+    "open_distance_cache": "distance_cache",
+    "extend_playlist": "playlist_extend",
+    "external_sort": "external_sort",
+    "score": "score",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    mod = importlib.import_module(module)
+    # Another module of that name may have been imported before this package
+    if os.path.dirname(os.path.abspath(getattr(mod, "__file__", None) or "")) != _ROOT:
+        raise ImportError(f"{module!r} was imported from {getattr(mod, '__file__', None)}, "
+                          f"not from {_ROOT}")
+    value = getattr(mod, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,4 @@
+from smart_playlist.cli import main
+
+if __name__ == "__main__":
+    main()
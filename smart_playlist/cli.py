@@ -0,0 +1,223 @@
+import argparse
+
+# ===============================================================
+# Smart Playlist Generator: command line
+# Description:
+#   python -m smart_playlist <command> ...
+#
+#     score     extract features from a folder of MP3 files (score.py)
+#     sort      sort / filter a features file (songs.py, song_query.py)
+#     playlist  greedy playlist over a features file (greedy_engine.py)
+#     dedup     near-duplicate groups of a features file (dedup.py)
+#
+#   sort and playlist take --dedup to drop near-duplicates first;
+#   playlist --clusters sequences cluster by cluster in worker
+#   processes (cluster_greedy.py).
+#
+#   Only argparse is imported up front; each command imports its own
+#   modules when it runs, so "sort" and "playlist" never load librosa
+#   or pandas, and "--help" loads nothing at all.
+# ===============================================================
+
+START_STRATEGIES = ("low_energy", "high_energy", "low_mood", "high_mood", "random")
+ENGINES = {"auto": "auto", "numpy": "brute", "index": "index"}
+
+
+def parse_tolerance(text: str):
+    from dedup import parse_tolerance as parse
+
+    return parse(text)
+
+
+# 1) COMMANDS
+
+
+def run_score(args) -> None:
+    import score
+
+    score.main(args.music_dir, args.out_csv, workers=args.workers, cache_path=args.cache,
+               use_hash=args.hash, resume=args.resume, store_path=args.store)
+
+
+def load_songs(args):
+    """The features file as a table, without near-duplicates if --dedup was given."""
+    from sorted_index import load_indexed_table
+
+    songs = load_indexed_table(args.features_path)
+    if not args.dedup:
+        return songs
+
+    from dedup import dedup_table, save_report
+
+    unique, result = dedup_table(songs, dict(args.tol))
+    print(f" Removed {len(songs) - len(unique)} near-duplicates ({len(result.groups)} groups)")
+    if args.dedup_report:
+        save_report(songs, result.groups, args.dedup_report)
+    return unique
+
+
+def run_sort(args) -> None:
+    from song_query import parse_condition, query
+    from songs import save_csv
+
+    songs = load_songs(args)
+    where = [parse_condition(c) for c in args.where]
+    result = query(songs, where, args.by, args.order, args.top)
+    save_csv(result, args.out_csv)
+    print(f" {len(result)} of {len(songs)} songs -> {args.out_csv}")
+
+
+def run_playlist(args) -> None:
+    import metrics
+    from playlists import GREEDY_COLUMNS, greedy_playlist
+    from songs import recommended_sort
+
+    # Sequenced over the recommended order, like the scripts
+    songs = recommended_sort(load_songs(args))
+    features = songs.feature_matrix()
+
+    # Normalized, weighted distance by default, like the scripts
+    distances = None
+    if not args.raw_distance:
+        from distance_cache import WeightedMetric, distance_cache_path, open_distance_cache
+
+        tempo, mood, energy = (float(w) for w in args.weights.split(","))
+        weights = {"tempo": tempo, "mood": mood, "energy": energy}
+        if args.distance_cache:
+            with metrics.stage("distance_cache"):
+                distances = open_distance_cache(features, distance_cache_path(args.features_path),
+                                                weights)
+        else:
+            distances = WeightedMetric.of(features, weights)
+
+    playlist = greedy_playlist(songs, args.start_idx, args.start, args.engine, args.refine,
+                               distances, args.target_duration, args.max_tracks, args.tolerance,
+                               args.clusters, args.workers, args.partition)
+    if args.clusters is not None and args.compare:
+        from cluster_greedy import compare_with_flat, print_comparison
+
+        metric = features if distances is None else distances.weighted(features)
+        start = songs.start_position(args.start_idx, args.start)
+        print_comparison(compare_with_flat(metric, start, args.clusters, args.workers,
+                                           args.partition, ENGINES[args.engine]))
+
+    with metrics.stage("save_greedy_playlist"):
+        playlist.save_csv(args.out_csv, columns=GREEDY_COLUMNS)
+    minutes = float(playlist.duration.sum()) / 60
+    print(f" {len(playlist)} songs ({minutes:.1f} min) -> {args.out_csv}")
+
+
+def run_dedup(args) -> None:
+    from dedup import HASH_TABLES, dedup_table, save_report
+    from songs import save_csv
+    from sorted_index import load_indexed_table
+
+    songs = load_indexed_table(args.features_path)
+    tables = HASH_TABLES if args.tables is None else args.tables
+    unique, result = dedup_table(songs, dict(args.tol), args.method, tables)
+    save_report(songs, result.groups, args.report_csv)
+    print(f" {len(result.groups)} duplicate groups, {len(songs) - len(unique)} songs removable "
+          f"({result.candidates} candidate pairs) -> {args.report_csv}")
+    if args.out:
+        save_csv(unique, args.out)
+        print(f" {len(unique)} of {len(songs)} songs -> {args.out}")
+
+
+# 2) ARGUMENTS
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--metrics", metavar="OUT_JSON",
+                        help="write per-stage timing / memory metrics to this file")
+
+    tolerance = argparse.ArgumentParser(add_help=False)
+    tolerance.add_argument("--tol", action="append", default=[], type=parse_tolerance,
+                           help='near-duplicate tolerance like "duration=30" (repeatable)')
+
+    dedup = argparse.ArgumentParser(add_help=False, parents=[tolerance])
+    dedup.add_argument("--dedup", action="store_true",
+                       help="drop near-duplicate songs first, keeping the first of each group")
+    dedup.add_argument("--dedup-report", metavar="CSV", default=None,
+                       help="with --dedup, also save the duplicate groups")
+
+    parser = argparse.ArgumentParser(prog="smart_playlist",
+                                     description="Smart Playlist Generator command line.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("score", parents=[common],
+                       help="extract tempo, energy, mood and duration from MP3 files")
+    p.add_argument("music_dir", help="folder to scan recursively for .mp3 files")
+    p.add_argument("out_csv", help="output CSV path")
+    p.add_argument("--workers", type=int, default=1,
+                   help="number of worker processes (0 = one per CPU core, default 1)")
+    p.add_argument("--cache", metavar="PATH", help="persistent feature cache (SQLite)")
+    p.add_argument("--hash", action="store_true", help="also match cached files by content hash")
+    p.add_argument("--resume", action="store_true", help="skip files already in out_csv")
+    p.add_argument("--store", metavar="PATH", help="also write a binary song store")
+    p.set_defaults(run=run_score)
+
+    p = sub.add_parser("sort", parents=[common, dedup], help="sort and filter a features file")
+    p.add_argument("features_path", help="features CSV or binary song store")
+    p.add_argument("out_csv")
+    p.add_argument("--by", default="recommended",
+                   choices=("recommended", "mood", "tempo", "energy", "duration"))
+    p.add_argument("--order", default="asc", choices=("asc", "desc"))
+    p.add_argument("--top", type=int, default=None, help="keep the first N songs")
+    p.add_argument("--where", action="append", default=[],
+                   help='condition like "tempo>=100" (repeatable, all must hold)')
+    p.set_defaults(run=run_sort)
+
+    p = sub.add_parser("playlist", parents=[common, dedup],
+                       help="greedy playlist over a features file")
+    p.add_argument("features_path", help="features CSV or binary song store")
+    p.add_argument("out_csv")
+    p.add_argument("--start", default="low_energy", choices=START_STRATEGIES)
+    p.add_argument("--start-idx", type=int, default=None,
+                   help="start with this song (position in recommended order)")
+    p.add_argument("--engine", default="auto", choices=tuple(ENGINES))
+    p.add_argument("--target-duration", type=float, default=None, help="seconds")
+    p.add_argument("--max-tracks", type=int, default=None)
+    p.add_argument("--tolerance", type=float, default=0.0, help="seconds")
+    p.add_argument("--refine", type=float, default=None, metavar="SECONDS",
+                   help="2-opt / Or-opt refinement budget")
+    p.add_argument("--weights", default="1,1,1", metavar="TEMPO,MOOD,ENERGY",
+                   help="weights of the normalized distance (distance_cache.py, default 1,1,1)")
+    p.add_argument("--raw-distance", action="store_true",
+                   help="plain L1 on raw tempo / mood / energy instead (BPM dominates)")
+    p.add_argument("--distance-cache", action="store_true",
+                   help="keep the pairwise distances in <features_path>.dist "
+                        "(n^2/2 floats, memory-mapped on later runs)")
+    p.add_argument("--clusters", type=int, default=None,
+                   help="greedy walk per cluster of songs, stitched together (cluster_greedy.py)")
+    p.add_argument("--workers", type=int, default=1,
+                   help="worker processes for --clusters (0 = one per CPU core, default 1)")
+    p.add_argument("--partition", default="kmeans", choices=("kmeans", "grid"),
+                   help="how --clusters splits the songs")
+    p.add_argument("--compare", action="store_true",
+                   help="with --clusters, also run the flat walk and report cost and time")
+    p.set_defaults(run=run_playlist)
+
+    p = sub.add_parser("dedup", parents=[common, tolerance], help="find near-duplicate songs")
+    p.add_argument("features_path", help="features CSV or binary song store")
+    p.add_argument("report_csv", help="duplicate groups, one row per song")
+    p.add_argument("--out", default=None, help="also save the library without duplicates")
+    p.add_argument("--method", default="lsh", choices=("lsh", "brute"))
+    p.add_argument("--tables", type=int, default=None, help="LSH hash tables (default 6)")
+    p.set_defaults(run=run_dedup)
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.metrics is None:
+        args.run(args)
+        return
+
+    import metrics
+
+    metrics.enable()
+    try:
+        args.run(args)
+    finally:
+        metrics.write_report(args.metrics)
@@ -0,0 +1,243 @@
+import argparse
+import re
+import numpy as np
+from typing import Sequence, Tuple
+
+from song_table import FIELDS, SongTable
+from sort_engine import field_order
+from sorted_index import INDEX_KEYS
+
+# ===============================================================
+# Smart Playlist Generator: range and top-k queries
+# Description:
+#   Answers questions like "the 50 calmest songs", "tempo between 100
+#   and 120 with mood > 0.6" or "the first 20 of the recommended
+#   order" without sorting the whole library:
+#
+#   - Range filters bisect the stored permutation of a sorted index
+#     (sorted_index.py) when the table has one and the column has no
+#     NaN (the merge sort leaves NaN among the numbers, so that
+#     permutation cannot be bisected; the index records which columns
+#     have NaN, so this costs no scan), and otherwise use one
+#     vectorised pass over the column.  Several conditions start from
+#     the narrowest indexed range and check the rest on those rows.
+#   - Top-k reads the first k entries of a stored permutation, or
+#     partially selects the rows whose leading key is within the k
+#     smallest and sorts only those.
+#
+#   Results are ordered exactly like sort_by_fields(...)[:k] (stable;
+#   NaN where the merge sort puts it, which needs a full sort of the
+#   rows); rows with NaN never match a range condition.  Values are
+#   compared in the column's dtype, so "mood>0.6" does not match a
+#   mood read as 0.6 into a float32 table.
+# ===============================================================
+
+# Condition = (field, operator, value), e.g. ("tempo", ">=", 100.0)
+Condition = Tuple[str, str, float]
+
+OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+}
+
+ORDER_KEYS = dict(INDEX_KEYS, duration=("duration",))
+
+_CONDITION_RE = re.compile(r"^\s*(\w+)\s*(<=|>=|==|<|>)\s*(\S+)\s*$")
+
+
+def parse_condition(text: str) -> Condition:
+    """
+    Parse "tempo>=100" style text into a Condition.
+
+    Raises:
+        ValueError: If the text is not <field><op><number> with a known field
+    """
+    m = _CONDITION_RE.match(text)
+    if not m:
+        raise ValueError(f"condition must look like 'tempo>=100', got '{text}'")
+    field, op, value = m.groups()
+    if field not in FIELDS:
+        raise ValueError(f"field must be one of: {', '.join(FIELDS)}")
+    return field, op, float(value)
+
+
+# 1) RANGE FILTERS
+
+
+def _bisect(col: np.ndarray, perm: np.ndarray, value: float, right: bool) -> int:
+    """First position in perm whose value is not < value (not <= if 'right')."""
+    lo, hi = 0, len(perm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        v = col[perm[mid]]
+        if (v <= value) if right else (v < value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _indexed_range(table: SongTable, field: str, op: str, value: float):
+    """(lo, hi) slice of the ascending permutation matching one condition."""
+    perm = table.sorted_index.order((field,), "asc")
+    col = table.column(field)
+    value = col.dtype.type(value)
+    lo, hi = 0, len(perm)
+    if op in (">", ">=", "=="):
+        lo = _bisect(col, perm, value, right=(op == ">"))
+    if op in ("<", "<=", "=="):
+        hi = _bisect(col, perm, value, right=(op != "<"))
+    return lo, max(lo, hi)
+
+
+def filter_rows(table: SongTable, where: Sequence[Condition] = ()) -> np.ndarray:
+    """
+    Positions of the rows matching every condition, in table order.
+
+    Args:
+        table (SongTable): Songs, optionally with a sorted index attached
+        where (Sequence[Condition]): (field, operator, value) conditions
+
+    Returns:
+        np.ndarray: Matching row positions, ascending
+
+    Raises:
+        ValueError: For an unknown field or operator
+    """
+    for field, op, _ in where:
+        table.column(field)
+        if op not in OPERATORS:
+            raise ValueError(f"operator must be one of: {', '.join(OPERATORS)}")
+
+    remaining = list(where)
+    rows = None
+    index = table.sorted_index
+    indexed = [c for c in where if index is not None and c[0] in index.has_nan
+               and not index.has_nan[c[0]]]
+    if indexed:
+        # Start from the narrowest indexed range: O(log n) to find, O(m) to read
+        ranges = [(_indexed_range(table, *c), c) for c in indexed]
+        (lo, hi), best = min(ranges, key=lambda r: r[0][1] - r[0][0])
+        perm = index.order((best[0],), "asc")
+        rows = np.sort(perm[lo:hi]).astype(np.intp)
+        remaining.remove(best)
+
+    if rows is None:
+        mask = np.ones(len(table), dtype=bool)
+        for field, op, value in remaining:
+            col = table.column(field)
+            mask &= OPERATORS[op](col, col.dtype.type(value))
+        return np.flatnonzero(mask)
+
+    for field, op, value in remaining:
+        col = table.column(field)
+        rows = rows[OPERATORS[op](col[rows], col.dtype.type(value))]
+    return rows
+
+
+# 2) TOP-K
+
+
+def top_k_rows(table: SongTable, fields: Sequence[str], k: int, order: str = "asc",
+               rows: np.ndarray = None) -> np.ndarray:
+    """
+    First k positions of sort_by_fields(table (or its 'rows'), fields, order).
+
+    Args:
+        table (SongTable): Songs, optionally with a sorted index attached
+        fields (Sequence[str]): Sort key, first field most significant
+        k (int): Number of rows to return
+        order (str): "asc" or "desc"
+        rows (np.ndarray): Restrict to these positions (ascending), e.g.
+            the result of filter_rows()
+
+    Returns:
+        np.ndarray: Row positions in sorted order
+    """
+    if order not in ("asc", "desc"):
+        raise ValueError('order must be "asc" or "desc"')
+    fields = tuple(fields)
+    k = max(int(k), 0)
+
+    if rows is None and table.sorted_index is not None and fields in INDEX_KEYS.values():
+        return table.sorted_index.order(fields, order, k).astype(np.intp)
+
+    if rows is None:
+        rows = np.arange(len(table))
+    factor = 1 if order == "asc" else -1
+    cols = [factor * table.column(f)[rows] for f in fields]
+    if any(np.isnan(c).any() for c in cols):
+        # The merge sort's NaN placement depends on every row
+        return rows[field_order(cols)[:k]]
+
+    if k < len(rows):
+        # Every top-k row has a leading key <= the k-th smallest one;
+        # keeping all rows up to that value keeps ties (and stability)
+        kth = np.partition(cols[0], k - 1)[k - 1] if k else -np.inf
+        keep = cols[0] <= kth
+        rows = rows[keep]
+        cols = [c[keep] for c in cols]
+
+    best = np.argsort(cols[0], kind="stable") if len(cols) == 1 else np.lexsort(cols[::-1])
+    return rows[best[:k]]
+
+
+# 3) QUERY
+
+
+def query(table: SongTable, where: Sequence[Condition] = (), order_by: str = None,
+          order: str = "asc", k: int = None) -> SongTable:
+    """
+    Filter, order and limit a song table.
+
+    Args:
+        table (SongTable): Songs (see sorted_index.load_indexed_table)
+        where (Sequence[Condition]): Range conditions, all must hold
+        order_by (str): "recommended", "mood", "tempo", "energy",
+            "duration", or None to keep table order
+        order (str): "asc" or "desc"
+        k (int): Keep only the first k results
+
+    Returns:
+        SongTable: The matching songs
+    """
+    if order_by is not None and order_by not in ORDER_KEYS:
+        raise ValueError(f"order_by must be one of: {', '.join(ORDER_KEYS)}")
+
+    rows = filter_rows(table, where) if where else None
+    if order_by is not None:
+        n = len(table) if rows is None else len(rows)
+        rows = top_k_rows(table, ORDER_KEYS[order_by], n if k is None else k, order, rows)
+    elif k is not None:
+        rows = (np.arange(len(table)) if rows is None else rows)[:k]
+    elif rows is None:
+        return table
+    return table.take(rows)
+
+
+# 4) CLI
+
+
+if __name__ == "__main__":
+    from songs import save_csv
+    from sorted_index import load_indexed_table
+
+    parser = argparse.ArgumentParser(
+        description="Range / top-k query over a features file, written with save_csv().")
+    parser.add_argument("features_path", help="features CSV or binary song store")
+    parser.add_argument("out_csv")
+    parser.add_argument("--where", action="append", default=[], type=parse_condition,
+                        help='condition like "tempo>=100" (repeatable, all must hold)')
+    parser.add_argument("--by", default=None, choices=tuple(ORDER_KEYS),
+                        help="order results by this key")
+    parser.add_argument("--order", default="asc", choices=("asc", "desc"))
+    parser.add_argument("--top", type=int, default=None, help="keep the first N results")
+    args = parser.parse_args()
+
+    songs = load_indexed_table(args.features_path)
+    result = query(songs, args.where, args.by, args.order, args.top)
+    save_csv(result, args.out_csv)
+    print(f" {len(result)} of {len(songs)} songs -> {args.out_csv}")
@@ -0,0 +1,342 @@
+import csv
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+from typing import Iterator, List, NamedTuple, Sequence
+
+# ===============================================================
+# Smart Playlist Generator: columnar song table
+# Description:
+#   SongTable holds a whole library as one float64 array per feature
+#   plus an interned string table for the file paths, instead of one
+#   Song object (with its own __dict__) per row.  The values are those
+#   of the Song path, so sorting and saving give the same results;
+#   memory-bound callers can pass dtype=np.float32 to halve the
+#   columns (values then round to float32 and print that way).
+#
+#   Sorting (sort_engine.py, or a stored permutation from
+#   sorted_index.py), saving and greedy sequencing work on the columns
+#   directly; reordering a table only permutes row positions, the path
+#   strings themselves are never copied.
+#
+#   A table can also be saved as a binary store (save_song_store)
+#   that is memory-mapped back zero-copy (open_song_store); the CSV
+#   stays as the export format.
+# ===============================================================
+
+FIELDS = ("mood", "tempo", "energy", "duration")
+
+# Column order of the greedy feature matrix (see greedy_engine.FEATURES)
+DISTANCE_FIELDS = ("tempo", "mood", "energy")
+
+
+class SongRow(NamedTuple):
+    """Read-only view of one table row; has the same attributes as Song."""
+    file: str
+    mood: float
+    tempo: float
+    energy: float
+    duration: float
+
+
+# 1) STRING TABLE
+
+
+class StringTable:
+    """
+    Interned strings packed into one UTF-8 buffer.
+
+    Every distinct string is stored once; callers refer to strings by
+    their integer code.
+    """
+
+    def __init__(self, blob: bytes, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets          # int64, len(table) + 1
+
+    @classmethod
+    def build(cls, strings: Sequence[str]):
+        """Intern 'strings'. Returns (table, codes) with one code per input."""
+        index = {}
+        codes = np.empty(len(strings), dtype=np.int32)
+        for i, s in enumerate(strings):
+            codes[i] = index.setdefault(s, len(index))
+        encoded = [s.encode("utf-8") for s in index]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets), codes
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, code: int) -> str:
+        # blob may be bytes or an mmap; slicing either gives bytes
+        return self.blob[self.offsets[code]:self.offsets[code + 1]].decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets[-1]) + self.offsets.nbytes
+
+
+# 2) SONG TABLE
+
+
+class SongTable:
+    """
+    Columnar song library.
+
+    Attributes:
+        mood, tempo, energy, duration (np.ndarray): One value per song
+        paths (StringTable): Interned file paths
+        codes (np.ndarray): int32 code into 'paths' for every song
+    """
+
+    def __init__(self, paths: StringTable, codes: np.ndarray, mood, tempo, energy, duration):
+        self.paths = paths
+        self.codes = codes
+        self.mood = mood
+        self.tempo = tempo
+        self.energy = energy
+        self.duration = duration
+        self._features = None
+        self.sorted_index = None        # sorted_index.SortedIndex, if attached
+
+    @classmethod
+    def from_columns(cls, files: Sequence[str], mood, tempo, energy, duration,
+                     dtype=np.float64):
+        paths, codes = StringTable.build(files)
+        cols = [np.asarray(c, dtype=dtype) for c in (mood, tempo, energy, duration)]
+        return cls(paths, codes, *cols)
+
+    @classmethod
+    def from_songs(cls, songs, dtype=np.float64):
+        """Build a table from Song objects (or anything with the same attributes)."""
+        songs = list(songs)
+        return cls.from_columns([s.file for s in songs],
+                                *([getattr(s, f) for s in songs] for f in FIELDS),
+                                dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def file(self, i: int) -> str:
+        return self.paths[self.codes[i]]
+
+    @property
+    def files(self) -> List[str]:
+        return [self.paths[c] for c in self.codes.tolist()]
+
+    def __getitem__(self, i: int) -> SongRow:
+        return SongRow(self.file(i), float(self.mood[i]), float(self.tempo[i]),
+                       float(self.energy[i]), float(self.duration[i]))
+
+    def __iter__(self) -> Iterator[SongRow]:
+        return (self[i] for i in range(len(self)))
+
+    def __repr__(self) -> str:
+        return f"SongTable({len(self)} songs, {self.nbytes / 2**20:.1f} MiB)"
+
+    @property
+    def nbytes(self) -> int:
+        cols = (self.codes, self.mood, self.tempo, self.energy, self.duration)
+        return self.paths.nbytes + sum(c.nbytes for c in cols)
+
+    def take(self, order) -> "SongTable":
+        """Rows in the given order; the path string table is shared."""
+        order = np.asarray(order, dtype=np.intp)
+        return SongTable(self.paths, self.codes[order], self.mood[order], self.tempo[order],
+                         self.energy[order], self.duration[order])
+
+    def append(self, other: "SongTable") -> "SongTable":
+        """
+        This table followed by the rows of 'other'.
+
+        The path tables are joined as they are (no re-interning), so a
+        path present in both is stored twice.
+        """
+        a, b = self.paths, other.paths
+        blob = a.blob[0:int(a.offsets[-1])] + b.blob[0:int(b.offsets[-1])]
+        offsets = np.concatenate([a.offsets, b.offsets[1:] + a.offsets[-1]])
+        codes = np.concatenate([self.codes, other.codes + len(a)]).astype(np.int32)
+        cols = [np.concatenate([self.column(f), other.column(f)]) for f in FIELDS]
+        return SongTable(StringTable(blob, offsets), codes, *cols)
+
+    def column(self, field: str) -> np.ndarray:
+        if field not in FIELDS:
+            raise ValueError(f"field must be one of: {', '.join(FIELDS)}")
+        return getattr(self, field)
+
+    # ---- greedy playlist support ----
+
+    def feature_matrix(self) -> np.ndarray:
+        """(3, n) float64 tempo/mood/energy matrix for greedy_engine (cached)."""
+        if self._features is None:
+            self._features = np.ascontiguousarray(
+                np.vstack([getattr(self, f) for f in DISTANCE_FIELDS]), dtype=np.float64)
+        return self._features
+
+    def start_position(self, start_idx: int = None, start_strategy: str = "low_energy") -> int:
+        """Same choices as greedy_playlist()'s start_idx / start_strategy."""
+        if start_idx is not None:
+            if start_idx < 0 or start_idx >= len(self):
+                raise ValueError(f"start_idx must be between 0 and {len(self)-1}")
+            return int(start_idx)
+
+        if start_strategy == "low_energy":
+            return int(np.nanargmin(self.energy))
+        elif start_strategy == "high_energy":
+            return int(np.nanargmax(self.energy))
+        elif start_strategy == "low_mood":
+            return int(np.nanargmin(self.mood))
+        elif start_strategy == "high_mood":
+            return int(np.nanargmax(self.mood))
+        elif start_strategy == "random":
+            return int(np.random.randint(len(self)))
+        else:
+            raise ValueError('start_strategy must be one of: "low_energy", "high_energy", "low_mood", "high_mood", "random"')
+
+    # ---- output ----
+
+    def save_csv(self, filename: str, columns: Sequence[str] = ("file",) + FIELDS) -> None:
+        """Write the table as CSV (same layout as save_csv() by default)."""
+        cells = [self.files if c == "file" else self.column(c).astype(str) for c in columns]
+        with open(filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(zip(*cells))
+
+
+# 3) BINARY STORE
+#
+# Layout (little-endian, every block 8-byte aligned):
+#   header   MAGIC, version, itemsize, n_songs, n_strings, blob_len
+#   columns  mood, tempo, energy, duration   n_songs floats each
+#   codes    int32 x n_songs
+#   offsets  int64 x (n_strings + 1)
+#   blob     UTF-8 path bytes
+
+
+STORE_MAGIC = b"SONGTBL\0"
+STORE_VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQ")
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def save_song_store(table: SongTable, path: str) -> None:
+    """Write 'table' as a binary store (atomically, via a temp file)."""
+    dtype = np.dtype(table.mood.dtype).newbyteorder("<")
+    n = len(table)
+    paths = table.paths
+    blob = paths.blob[0:int(paths.offsets[-1])]
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(STORE_MAGIC, STORE_VERSION, dtype.itemsize, n, len(paths), len(blob)))
+        arrays = [np.asarray(table.column(c), dtype=dtype) for c in FIELDS]
+        arrays.append(np.asarray(table.codes, dtype="<i4"))
+        arrays.append(np.asarray(paths.offsets, dtype="<i8"))
+        for a in arrays:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(a.tobytes())
+        f.write(blob)
+    os.replace(tmp, path)
+
+
+def is_song_store(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(STORE_MAGIC)) == STORE_MAGIC
+
+
+def open_song_store(path: str) -> SongTable:
+    """
+    Memory-map a binary store as a SongTable without copying or parsing.
+
+    The columns are read-only views of the file; sorting or take()
+    produce ordinary in-memory tables.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, itemsize, n, n_strings, blob_len = _HEADER.unpack_from(mm, 0)
+    if magic != STORE_MAGIC or version != STORE_VERSION:
+        raise ValueError(f"'{path}' is not a version {STORE_VERSION} song store")
+
+    dtype = np.dtype(f"<f{itemsize}")
+    pos = _HEADER.size
+
+    def view(dt, count):
+        nonlocal pos
+        pos = _align(pos)
+        a = np.frombuffer(mm, dtype=dt, count=count, offset=pos)
+        pos += a.nbytes
+        return a
+
+    cols = [view(dtype, n) for _ in FIELDS]
+    codes = view("<i4", n)
+    offsets = view("<i8", n_strings + 1)
+    blob = memoryview(mm)[pos:pos + blob_len]
+    return SongTable(StringTable(_MappedBlob(blob), offsets), codes, *cols)
+
+
+class _MappedBlob:
+    """bytes-like slice access to the string block of a mapped store."""
+
+    def __init__(self, view: memoryview):
+        self.view = view
+
+    def __getitem__(self, item) -> bytes:
+        return self.view[item].tobytes()
+
+
+# 4) LOAD
+
+
+def load_song_table(csv_path: str, dtype=np.float64) -> SongTable:
+    """
+    Load a features file straight into a SongTable (no Song objects).
+
+    Binary stores (see save_song_store) are memory-mapped in the dtype
+    they were saved with; CSV columns get 'dtype' (np.float32 halves
+    their memory at the cost of exact values).  CSV rows with
+    invalid numbers are skipped with a warning, like load_songs(), and
+    so are rows cut short (a line still being written).
+    """
+    if is_song_store(csv_path):
+        return open_song_store(csv_path)
+
+    files, cols = [], [[] for _ in FIELDS]
+    with open(csv_path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                # A truncated row has None for its missing fields
+                values = [float(row[field]) for field in FIELDS]
+            except (TypeError, ValueError) as e:
+                print(f"Warning: Skipping row with invalid data: {row}. Error: {e}")
+                continue
+            files.append(row["file"])
+            for col, v in zip(cols, values):
+                col.append(v)
+    return SongTable.from_columns(files, *cols, dtype=dtype)
+
+
+# 5) CLI: convert between CSV and binary store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python song_table.py <features.csv|store> <out.csv|out store>")
+        print("  A CSV input is written as a binary store, a store input as CSV.")
+        sys.exit(1)
+
+    src, dst = sys.argv[1], sys.argv[2]
+    table = load_song_table(src)
+    if is_song_store(src):
+        table.save_csv(dst)
+    else:
+        save_song_store(table, dst)
+    print(f"Converted {len(table)} songs: {src} -> {dst}")
@@ -0,0 +1,124 @@
+import csv
+from typing import Any, Callable, List
+
+import metrics
+from sort_engine import merge_sort as _engine_merge_sort, sort_by_fields
+from song_table import SongTable, is_song_store, open_song_store
+
+# ===============================================================
+# Smart Playlist Generator: songs, loading, sorting, saving
+# Description:
+#   The Song class and the load / sort / save functions shared by
+#   Final_codes, integrated_playlist_generator.py, custom_sort.py,
+#   recommended_sort.py and the smart_playlist CLI.  Every function
+#   also accepts a SongTable (song_table.py) where it makes sense.
+#
+#   Only the standard library and NumPy are imported, so scripts that
+#   sort or sequence songs start without loading pandas.
+# ===============================================================
+
+SORT_FIELDS = ("mood", "tempo", "energy")
+
+# Column order of save_csv()
+CSV_COLUMNS = ("file", "mood", "tempo", "energy", "duration")
+
+
+# 1) SONG DATA CLASS
+
+
+class Song:
+
+    def __init__(self, file: str, mood: float, tempo: float, energy: float, duration: float):
+        self.file = file
+        self.mood = float(mood)
+        self.tempo = float(tempo)
+        self.energy = float(energy)
+        self.duration = float(duration)
+
+    def __repr__(self) -> str:
+        return f"{self.file} (mood={self.mood:.2f}, tempo={self.tempo:.2f}, energy={self.energy:.2f})"
+
+
+# 2) LOAD SONGS
+
+
+@metrics.timed("load_songs")
+def load_songs(csv_path: str) -> List[Song]:
+    """
+    Load songs from a features CSV (file, mood, tempo, energy, duration
+    columns) or a binary song store (song_table.save_song_store).
+
+    Rows whose numbers do not parse are skipped with a warning.
+
+    Raises:
+        FileNotFoundError: If csv_path does not exist
+    """
+    songs: List[Song] = []
+    try:
+        if is_song_store(csv_path):
+            songs = [Song(*row) for row in open_song_store(csv_path)]
+        else:
+            with open(csv_path, "r", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    try:
+                        songs.append(
+                            Song(row["file"], row["mood"], row["tempo"], row["energy"], row["duration"])
+                        )
+                    except ValueError as e:
+                        print(f"Warning: Skipping row with invalid data: {row}. Error: {e}")
+    except FileNotFoundError:
+        print(f"Error: File '{csv_path}' not found.")
+        raise
+
+    metrics.count("songs_loaded", len(songs))
+    return songs
+
+
+# 3) MERGE SORT
+
+
+def merge_sort(items: List[Any], key_function: Callable[[Any], Any]) -> List[Any]:
+    # Stable, O(n log n); keys are computed once, same order as the
+    # recursive version (sort_engine.py)
+    return _engine_merge_sort(items, key_function)
+
+
+# 4) RECOMMENDED SORT
+#   1. Sort by mood (main key)
+#   2. If mood is equal, sort by tempo
+#   3. If tempo is equal, sort by energy
+
+
+@metrics.timed("recommended_sort")
+def recommended_sort(songs: List[Song], order: str = "asc") -> List[Song]:
+    # Stable NumPy lexsort; falls back to merge_sort() when values contain NaN
+    return sort_by_fields(songs, SORT_FIELDS, order)
+
+
+# 5) CUSTOM SORT
+#   Sort by a single field: mood, tempo or energy, "asc" or "desc"
+
+
+def custom_sort(songs: List[Song], field: str = "mood", order: str = "asc") -> List[Song]:
+    if field not in SORT_FIELDS:
+        raise ValueError('field must be one of: "mood", "tempo", "energy"')
+
+    with metrics.stage(f"custom_sort:{field}"):
+        return sort_by_fields(songs, (field,), order)
+
+
+# 6) SAVE TO CSV
+
+
+@metrics.timed("save_csv")
+def save_csv(songs: List[Song], filename: str) -> None:
+    if isinstance(songs, SongTable):
+        songs.save_csv(filename, columns=CSV_COLUMNS)
+        return
+
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for s in songs:
+            writer.writerow([s.file, s.mood, s.tempo, s.energy, s.duration])
@@ -0,0 +1,262 @@
+import hashlib
+import os
+import numpy as np
+from typing import Dict, List, Sequence
+
+from song_table import SongTable, load_song_table
+from sort_engine import _stable_order, field_order
+
+# ===============================================================
+# Smart Playlist Generator: persistent sorted indexes
+# Description:
+#   Stores the sorting permutation of every sort the generator offers
+#   (mood, tempo, energy and recommended = mood -> tempo -> energy,
+#   ascending and descending) in a file next to the features file:
+#
+#       songs_features.csv  ->  songs_features.csv.sortidx
+#
+#   With an index attached to a SongTable, recommended_sort() and
+#   custom_sort() become a take() of the stored permutation (O(n)),
+#   and the first k songs are perm[:k] (O(k)).
+#
+#   Each permutation is exactly what sort_engine.sort_by_fields()
+#   returns (stable; NaN where the merge sort puts it).  When songs are
+#   appended to the features file, the new rows are sorted among
+#   themselves and merged into each permutation by binary search
+#   instead of a full re-sort (or fully re-sorted if a sort key has
+#   NaN).  If earlier rows changed, the index is rebuilt.
+#
+#   The index also records which sort columns contain NaN, so range
+#   queries (song_query.py) know whether a permutation can be bisected
+#   without scanning the column.
+# ===============================================================
+
+# Index name -> sort fields, most significant first
+INDEX_KEYS = {
+    "mood": ("mood",),
+    "tempo": ("tempo",),
+    "energy": ("energy",),
+    "recommended": ("mood", "tempo", "energy"),
+}
+ORDERS = ("asc", "desc")
+
+INDEX_SUFFIX = ".sortidx"
+INDEX_VERSION = 2
+
+# Sort columns whose NaN presence is recorded (see SortedIndex.has_nan)
+NAN_FIELDS = ("mood", "tempo", "energy")
+
+
+def index_path(features_path: str) -> str:
+    return features_path + INDEX_SUFFIX
+
+
+def key_name(fields: Sequence[str]) -> str:
+    """Index name for a sort_by_fields() field tuple."""
+    for name, key_fields in INDEX_KEYS.items():
+        if tuple(fields) == key_fields:
+            return name
+    raise ValueError(f"no sorted index for fields {tuple(fields)}")
+
+
+def features_digest(table: SongTable, n: int = None) -> str:
+    """Hash of the sort columns of the first n rows (all rows by default)."""
+    n = len(table) if n is None else n
+    h = hashlib.blake2b(digest_size=16)
+    for field in ("mood", "tempo", "energy"):
+        h.update(np.ascontiguousarray(table.column(field)[:n]).tobytes())
+    return h.hexdigest()
+
+
+# 1) ORDERING HELPERS
+
+
+def _sort_cols(table: SongTable, fields, order: str, rows=slice(None)) -> List[np.ndarray]:
+    factor = 1 if order == "asc" else -1
+    return [factor * table.column(f)[rows] for f in fields]
+
+
+def _less(a, b):
+    # NumPy's sort order: NaN after every number, equal to NaN
+    return (a < b) | (~np.isnan(a) & np.isnan(b))
+
+
+def _equal(a, b):
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+
+def _bisect_right(sorted_cols: List[np.ndarray], keys: List[np.ndarray]) -> np.ndarray:
+    """
+    Vectorised bisect_right of composite keys into lexicographically
+    sorted columns: for every key, the number of sorted entries <= key.
+    """
+    n = len(sorted_cols[0])
+    lo = np.zeros(len(keys[0]), dtype=np.int64)
+    hi = np.full(len(keys[0]), n, dtype=np.int64)
+    active = lo < hi
+    while active.any():
+        mid = (lo + hi) // 2
+        m = np.minimum(mid, n - 1)
+        # entry <= key, compared from the least significant field up
+        le = np.ones(len(lo), dtype=bool)
+        for col, key in zip(sorted_cols[::-1], keys[::-1]):
+            entry = col[m]
+            le = _less(entry, key) | (_equal(entry, key) & le)
+        lo = np.where(active & le, mid + 1, lo)
+        hi = np.where(active & ~le, mid, hi)
+        active = lo < hi
+    return lo
+
+
+# 2) SORTED INDEX
+
+
+class SortedIndex:
+    """
+    Sorting permutations of one song table.
+
+    Attributes:
+        n (int): Number of rows covered
+        digest (str): features_digest() of those rows
+        perms (Dict[str, np.ndarray]): "<key>_<order>" -> row positions
+        has_nan (Dict[str, bool]): NAN_FIELDS field -> column has a NaN
+    """
+
+    def __init__(self, n: int, digest: str, perms: Dict[str, np.ndarray],
+                 has_nan: Dict[str, bool]):
+        self.n = n
+        self.digest = digest
+        self.perms = perms
+        self.has_nan = has_nan
+
+    @classmethod
+    def build(cls, table: SongTable) -> "SortedIndex":
+        dtype = _perm_dtype(len(table))
+        perms = {}
+        for name, fields in INDEX_KEYS.items():
+            for order in ORDERS:
+                perms[f"{name}_{order}"] = field_order(_sort_cols(table, fields, order)).astype(dtype)
+        has_nan = {f: bool(np.isnan(table.column(f)).any()) for f in NAN_FIELDS}
+        return cls(len(table), features_digest(table), perms, has_nan)
+
+    def covers(self, table: SongTable) -> bool:
+        """True if 'table' starts with the rows this index was built for."""
+        return len(table) >= self.n and features_digest(table, self.n) == self.digest
+
+    def extend(self, table: SongTable) -> None:
+        """
+        Merge rows self.n .. len(table) (newly appended songs) into every
+        permutation.  The first self.n rows must be unchanged (see covers()).
+        """
+        n, total = self.n, len(table)
+        if total == n:
+            return
+        dtype = _perm_dtype(total)
+        new_rows = np.arange(n, total)
+        for f in NAN_FIELDS:
+            self.has_nan[f] = self.has_nan[f] or bool(np.isnan(table.column(f)[n:]).any())
+        for name, fields in INDEX_KEYS.items():
+            for order in ORDERS:
+                perm = self.perms[f"{name}_{order}"]
+                if any(self.has_nan[f] for f in fields):
+                    # The merge sort's NaN placement depends on every row
+                    all_cols = _sort_cols(table, fields, order)
+                    self.perms[f"{name}_{order}"] = field_order(all_cols).astype(dtype)
+                    continue
+                # New rows come after equal old rows (stability), so they
+                # are inserted at bisect_right of their key
+                new_cols = _sort_cols(table, fields, order, slice(n, total))
+                new_sorted = _stable_order(new_cols)
+                keys = [c[new_sorted] for c in new_cols]
+                old_cols = [c[perm] for c in _sort_cols(table, fields, order, slice(0, n))]
+                at = _bisect_right(old_cols, keys)
+                self.perms[f"{name}_{order}"] = np.insert(perm.astype(dtype), at, new_rows[new_sorted])
+        self.n = total
+        self.digest = features_digest(table)
+
+    def order(self, fields: Sequence[str], order: str = "asc", k: int = None) -> np.ndarray:
+        """
+        Row positions sorted like sort_by_fields(table, fields, order).
+
+        Args:
+            fields (Sequence[str]): One of the INDEX_KEYS field tuples
+            order (str): "asc" or "desc"
+            k (int): Return only the first k positions
+
+        Returns:
+            np.ndarray: Row positions (a view; do not modify)
+        """
+        if order not in ORDERS:
+            raise ValueError('order must be "asc" or "desc"')
+        perm = self.perms[f"{key_name(fields)}_{order}"]
+        return perm if k is None else perm[:k]
+
+    # ---- persistence ----
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, version=INDEX_VERSION, n=self.n, digest=self.digest,
+                     has_nan=np.array([self.has_nan[f] for f in NAN_FIELDS]), **self.perms)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SortedIndex":
+        """
+        Raises:
+            ValueError: If the file is not a current sorted index
+        """
+        with np.load(path) as data:
+            if "version" not in data or int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"'{path}' is not a version {INDEX_VERSION} sorted index")
+            perms = {f"{name}_{order}": data[f"{name}_{order}"]
+                     for name in INDEX_KEYS for order in ORDERS}
+            has_nan = dict(zip(NAN_FIELDS, data["has_nan"].tolist()))
+            return cls(int(data["n"]), str(data["digest"]), perms, has_nan)
+
+
+def _perm_dtype(n: int):
+    return np.int32 if n < 2**31 else np.int64
+
+
+# 3) LOAD A TABLE WITH ITS INDEX
+
+
+def attach_sorted_index(table: SongTable, features_path: str, save: bool = True) -> SortedIndex:
+    """
+    Load (or build) the sorted index stored next to 'features_path' and
+    attach it to 'table'.
+
+    A stored index that covers only the first rows of 'table' is
+    extended with the appended songs; an index that does not match is
+    rebuilt.  The index file is rewritten whenever it changed.
+
+    Returns:
+        SortedIndex: The index, also set as table.sorted_index
+    """
+    path = index_path(features_path)
+    index = None
+    if os.path.exists(path):
+        try:
+            index = SortedIndex.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Rebuilding sorted index '{path}': {e}")
+
+    changed = True
+    if index is not None and index.covers(table):
+        changed = index.n != len(table)
+        index.extend(table)
+    else:
+        index = SortedIndex.build(table)
+
+    if save and changed:
+        index.save(path)
+    table.sorted_index = index
+    return index
+
+
+def load_indexed_table(features_path: str, dtype=np.float64) -> SongTable:
+    """load_song_table() with the persistent sorted index attached."""
+    table = load_song_table(features_path, dtype)
+    attach_sorted_index(table, features_path)
+    return table
@@ -0,0 +1,68 @@
+# ===============================================================
+# Shared fixtures for the test suite
+# Description:
+#   Puts the repository root on sys.path (the modules are flat
+#   top-level files) and provides small song libraries with
+#   repeated feature rows (distance ties) and missing features.
+#
+# Usage:
+#   python -m pytest -q
+# ===============================================================
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# file, tempo, energy, mood, duration; rows 0/1/4 and 3/8 are identical
+# features, rows 2/5 tie as neighbours of several songs
+ROWS = [
+    ("s00.mp3", 120.0, 0.5, 0.4, 200.0),
+    ("s01.mp3", 120.0, 0.5, 0.4, 180.0),
+    ("s02.mp3", 100.0, 0.2, 0.3, 240.0),
+    ("s03.mp3", 140.0, 0.9, 0.8, 210.0),
+    ("s04.mp3", 120.0, 0.5, 0.4, 200.0),
+    ("s05.mp3", 100.0, 0.2, 0.35, 190.0),
+    ("s06.mp3", 110.0, 0.4, 0.5, 230.0),
+    ("s07.mp3", 90.0, 0.1, 0.2, 250.0),
+    ("s08.mp3", 140.0, 0.9, 0.8, 205.0),
+    ("s09.mp3", 130.0, 0.6, 0.6, 215.0),
+    ("s10.mp3", 110.0, 0.3, 0.5, 195.0),
+    ("s11.mp3", 125.0, 0.7, 0.45, 220.0),
+]
+
+# Rows of ROWS that get a missing feature in the *_nan fixtures
+NAN_ROWS = {6: "tempo", 9: "mood"}
+
+
+def _frame(rows):
+    import pandas as pd
+    return pd.DataFrame(rows, columns=["file", "tempo", "energy", "mood", "duration"])
+
+
+@pytest.fixture
+def songs_df():
+    """12 songs with ties, as pd.read_csv() loads a features CSV."""
+    return _frame(ROWS)
+
+
+@pytest.fixture
+def songs_nan_df(songs_df):
+    """songs_df with one missing feature in each of NAN_ROWS."""
+    df = songs_df.copy()
+    for row, field in NAN_ROWS.items():
+        df.loc[row, field] = np.nan
+    return df
+
+
+@pytest.fixture
+def songs_csv(tmp_path):
+    """ROWS written as a features CSV (file, mood, tempo, energy, duration)."""
+    path = tmp_path / "songs_features.csv"
+    lines = ["file,mood,tempo,energy,duration"]
+    lines += [f"{f},{m},{t},{e},{d}" for f, t, e, m, d in ROWS]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
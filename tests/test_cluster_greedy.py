@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import metrics
+from cluster_greedy import PARTITIONS, cluster_greedy_order, partition_features
+from greedy_engine import feature_matrix, greedy_order
+from playlists import greedy_playlist
+
+
+def clustered_features(n, seed, nan_rows=()):
+    """Four blobs of songs on a coarse grid (ties), some with a missing feature."""
+    rng = np.random.default_rng(seed)
+    centers = np.array([[90, 0.2, 0.2], [120, 0.8, 0.3], [128, 0.5, 0.9], [170, 0.9, 0.8]])
+    blob = rng.integers(0, 4, n)
+    features = (centers[blob] + np.round(rng.normal(0, [3, 0.05, 0.05], (n, 3)), 1)).T
+    features = np.ascontiguousarray(features)
+    for p in nan_rows:
+        features[1, p] = np.nan
+    return features
+
+
+@pytest.mark.parametrize("partition", PARTITIONS)
+def test_order_walks_each_cluster_from_its_entry(partition):
+    features = clustered_features(300, 0, nan_rows=(5, 77))
+    labels = partition_features(features, 6, partition).labels
+    order = cluster_greedy_order(features, 10, 6, partition=partition)
+
+    assert order[0] == 10
+    assert sorted(order) == list(range(300))
+    assert order[-2:] == [5, 77]            # missing features last, in table order
+
+    # Every cluster is one contiguous greedy walk from its first song
+    pos = 0
+    while pos < 298:
+        c = labels[order[pos]]
+        members = np.flatnonzero(labels == c)
+        block = order[pos:pos + len(members)]
+        assert sorted(block) == members.tolist()
+        local = greedy_order(features[:, members], int(np.searchsorted(members, block[0])), "brute")
+        assert members[local].tolist() == block
+        pos += len(members)
+
+
+def test_one_cluster_is_the_flat_walk():
+    features = clustered_features(200, 1, nan_rows=(3,))
+    for partition in PARTITIONS:
+        assert cluster_greedy_order(features, 42, 1, partition=partition) == \
+               greedy_order(features, 42, "brute")
+
+
+def test_worker_processes_give_the_same_order():
+    features = clustered_features(400, 2)
+    assert cluster_greedy_order(features, 0, 8, workers=2) == cluster_greedy_order(features, 0, 8)
+
+
+def test_start_with_missing_features_falls_back_to_the_flat_walk():
+    features = clustered_features(50, 3, nan_rows=(7,))
+    assert cluster_greedy_order(features, 7, 4) == greedy_order(features, 7, "brute")
+
+
+def test_greedy_playlist_clusters(songs_nan_df):
+    playlist = greedy_playlist(songs_nan_df, clusters=3)
+    start = songs_nan_df["energy"].idxmin()
+    assert playlist.index[0] == start
+    assert sorted(playlist.index) == list(range(len(songs_nan_df)))
+    assert list(greedy_playlist(songs_nan_df, clusters=1).index) == \
+           greedy_order(feature_matrix(songs_nan_df), int(start), "brute")
+    with pytest.raises(ValueError):
+        greedy_playlist(songs_nan_df, clusters=3, max_tracks=4)
+    with pytest.raises(ValueError):
+        partition_features(feature_matrix(songs_nan_df), 0)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_walk_metrics_are_merged_from_workers(workers):
+    features = clustered_features(400, 4)
+    metrics.enable(reset=True)
+    try:
+        cluster_greedy_order(features, 0, 8, workers=workers)
+        report = metrics.report()
+    finally:
+        metrics.disable()
+    assert report["stages"]["cluster_greedy.walk"]["calls"] == report["counters"]["cluster_greedy.clusters"]
+    assert report["counters"]["cluster_greedy.walk_songs"] == 400
@@ -0,0 +1,78 @@
+import csv
+
+import numpy as np
+import pytest
+
+from dedup import DEFAULT_TOLERANCES, dedup_table, find_duplicates, parse_tolerance, save_report
+from song_table import SongTable
+
+TOL = np.array([DEFAULT_TOLERANCES[f] for f in ("tempo", "mood", "energy", "duration")])
+
+
+def library(seed):
+    """
+    Distinct songs (far apart), each with 0-3 copies up to a third of the
+    tolerance away, a chain a - b - c whose ends are not within tolerance,
+    and songs with a missing feature (never duplicates, even of each other).
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(40):
+        base = np.array([80.0 + 3 * i, rng.random(), rng.random(), 150.0 + 10 * i])
+        rows.append(base)
+        for _ in range(rng.integers(0, 4)):
+            rows.append(base + rng.uniform(-1, 1, 4) * TOL / 3)
+    chain = np.array([300.0, 0.5, 0.5, 400.0])
+    rows += [chain, chain + TOL * 0.9, chain + TOL * 1.8]
+    rows += [np.array([310.0, np.nan, 0.5, 400.0])] * 2
+    rows = [rows[i] for i in rng.permutation(len(rows))]
+    tempo, mood, energy, duration = np.array(rows).T
+    return SongTable.from_columns([f"s{i:03d}.mp3" for i in range(len(rows))],
+                                  mood, tempo, energy, duration)
+
+
+def as_lists(groups):
+    return [g.tolist() for g in groups]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_lsh_finds_the_brute_force_groups(seed):
+    table = library(seed)
+    brute = find_duplicates(table, method="brute")
+    lsh = find_duplicates(table, method="lsh", tables=12, seed=seed)
+    assert as_lists(lsh.groups) == as_lists(brute.groups)
+    assert lsh.pairs == brute.pairs
+
+
+def test_groups_are_transitive_and_skip_missing_features():
+    table = library(0)
+    groups = as_lists(find_duplicates(table, method="brute").groups)
+    chain = [i for i, t in enumerate(table.tempo.tolist()) if 300.0 <= t < 302.0]
+    assert chain in groups
+    assert not any(np.isnan(table.mood[g]).any() for g in groups)
+    for g in groups:
+        assert g == sorted(g)
+    assert [g[0] for g in groups] == sorted(g[0] for g in groups)
+
+
+def test_dedup_table_keeps_the_first_song_of_each_group(tmp_path):
+    table = library(1)
+    unique, result = dedup_table(table, method="brute")
+    dropped = {int(p) for g in result.groups for p in g[1:]}
+    assert unique.files == [f for i, f in enumerate(table.files) if i not in dropped]
+
+    save_report(table, result.groups, str(tmp_path / "report.csv"))
+    with open(tmp_path / "report.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == sum(len(g) for g in result.groups)
+
+
+def test_tolerances():
+    assert parse_tolerance("duration=30") == ("duration", 30.0)
+    for text in ("loudness=1", "tempo", "tempo=-1"):
+        with pytest.raises(ValueError):
+            parse_tolerance(text)
+    table = library(2)
+    strict = find_duplicates(table, {"duration": 0.0, "tempo": 0.0, "mood": 0.0, "energy": 0.0},
+                             method="brute")
+    assert strict.pairs < find_duplicates(table, method="brute").pairs
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pytest
+
+from distance_cache import WeightedMetric, feature_scales, open_distance_cache, weighted_features
+from greedy_engine import feature_matrix, greedy_order, greedy_orders, iter_greedy_order
+from playlists import greedy_playlist
+
+WEIGHTS = {"tempo": 2.0, "mood": 1.0, "energy": 0.5}
+
+
+def reference_distance(features, scales, i, j):
+    return float(np.sum(scales * np.abs(features[:, i] - features[:, j])))
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+def test_cache_matches_the_weighted_distance(songs_df, tmp_path, normalize):
+    features = feature_matrix(songs_df)
+    cache = open_distance_cache(features, str(tmp_path / "songs.dist"), WEIGHTS, normalize)
+    assert cache.cached
+    scales = feature_scales(features, WEIGHTS, normalize)
+    n = features.shape[1]
+    expected = np.array([[reference_distance(features, scales, i, j) for j in range(n)]
+                         for i in range(n)])
+    np.testing.assert_allclose(cache.rows(range(n)), expected, rtol=1e-6)
+    assert cache.distance(4, 2) == pytest.approx(expected[4, 2], rel=1e-6)
+    assert cache.distance(3, 3) == 0.0
+
+
+def test_cache_is_reused_and_rebuilt(songs_df, tmp_path):
+    features = feature_matrix(songs_df)
+    path = str(tmp_path / "songs.dist")
+    open_distance_cache(features, path, WEIGHTS)
+    stamp = os.stat(path).st_mtime_ns
+    assert open_distance_cache(features, path, WEIGHTS).matches(features, WEIGHTS, True)
+    assert os.stat(path).st_mtime_ns == stamp
+
+    rebuilt = open_distance_cache(features, path, {"tempo": 1.0})
+    assert rebuilt.meta["weights"]["tempo"] == 1.0
+    (tmp_path / "songs.dist").write_bytes(b"not a cache")
+    assert open_distance_cache(features, path).cached
+
+
+def test_large_libraries_get_the_same_metric_without_a_matrix(songs_df, tmp_path):
+    features = feature_matrix(songs_df)
+    path = str(tmp_path / "songs.dist")
+    metric = open_distance_cache(features, path, WEIGHTS, max_songs=5)
+    assert isinstance(metric, WeightedMetric) and not metric.cached
+    assert not os.path.exists(path)
+    np.testing.assert_array_equal(metric.weighted(features), weighted_features(features, WEIGHTS))
+
+    cache = open_distance_cache(features, path, WEIGHTS)
+    for start in range(features.shape[1]):
+        assert greedy_order(features, start, distances=metric) == \
+               greedy_order(features, start, distances=cache)
+
+
+def test_playlists_walk_the_cached_metric(songs_df, tmp_path):
+    features = feature_matrix(songs_df)
+    cache = open_distance_cache(features, str(tmp_path / "songs.dist"))
+    expected = greedy_order(weighted_features(features), int(np.argmin(features[2])), "brute")
+    assert list(greedy_playlist(songs_df, distances=cache).index) == expected
+    assert list(greedy_playlist(songs_df, distances=WeightedMetric.of(features)).index) == expected
+
+
+def test_every_walk_reads_the_cache_or_refuses_index(songs_df, tmp_path):
+    features = feature_matrix(songs_df)
+    cache = open_distance_cache(features, str(tmp_path / "songs.dist"), WEIGHTS)
+    scaled = weighted_features(features, WEIGHTS)
+    for start in (0, 3, 6):
+        expected = greedy_order(scaled, start, "brute")
+        for method in ("auto", "brute"):
+            assert greedy_orders(features, [start], method, cache) == [expected]
+            assert list(iter_greedy_order(features, start, method=method, distances=cache)) == expected
+        with pytest.raises(ValueError, match="index"):
+            greedy_orders(features, [start], "index", cache)
+        with pytest.raises(ValueError, match="index"):
+            list(iter_greedy_order(features, start, method="index", distances=cache))
+
+    # Without a matrix, "index" walks the scaled features
+    metric = WeightedMetric.of(features, WEIGHTS)
+    assert list(iter_greedy_order(features, 0, method="index", distances=metric)) == \
+           greedy_order(scaled, 0, "brute")
+
+
+def test_invalid_weights_are_rejected(songs_df):
+    with pytest.raises(ValueError):
+        feature_scales(feature_matrix(songs_df), {"loudness": 1.0})
+    with pytest.raises(ValueError):
+        feature_scales(feature_matrix(songs_df), {"tempo": -1.0})
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import external_sort
+from songs import custom_sort, load_songs, recommended_sort, save_csv
+
+
+def write_features(path, n, seed, nan_share=0.0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 4, (n, 3)) / 4
+    values[rng.random((n, 3)) < nan_share] = np.nan
+    lines = ["file,mood,tempo,energy,duration"]
+    lines += [f"s{i:03d}.mp3,{m},{t},{e},{200 + i}" for i, (m, t, e) in enumerate(values)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+# ~1 KiB per chunk: a handful of rows per run
+TINY_BUDGET_MB = 0.001
+
+
+@pytest.mark.parametrize("fan_in", [64, 2])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_matches_in_memory_sort(tmp_path, monkeypatch, fan_in, order):
+    monkeypatch.setattr(external_sort, "MAX_FAN_IN", fan_in)
+    csv_path = write_features(tmp_path / "songs.csv", 120, 0)
+    songs = load_songs(csv_path)
+
+    cases = [(external_sort.RECOMMENDED_FIELDS, recommended_sort(songs, order)),
+             (("tempo",), custom_sort(songs, "tempo", order))]
+    for fields, expected in cases:
+        save_csv(expected, str(tmp_path / "expected.csv"))
+        count = external_sort.external_sort(csv_path, str(tmp_path / "out.csv"), fields, order,
+                                            memory_mb=TINY_BUDGET_MB)
+        assert count == len(songs)
+        assert (tmp_path / "out.csv").read_bytes() == (tmp_path / "expected.csv").read_bytes()
+
+
+def test_missing_features_keep_every_row(tmp_path):
+    # NaN keys are unordered, so only the rows (not their places) are fixed
+    csv_path = write_features(tmp_path / "songs.csv", 60, 1, nan_share=0.1)
+    external_sort.external_sort(csv_path, str(tmp_path / "out.csv"), memory_mb=TINY_BUDGET_MB)
+    assert sorted(s.file for s in load_songs(str(tmp_path / "out.csv"))) == \
+           sorted(s.file for s in load_songs(csv_path))
+
+
+def test_rejects_unknown_fields_and_orders(songs_csv, tmp_path):
+    with pytest.raises(ValueError):
+        external_sort.external_sort(songs_csv, str(tmp_path / "out.csv"), ("duration",))
+    with pytest.raises(ValueError):
+        external_sort.external_sort(songs_csv, str(tmp_path / "out.csv"), order="up")
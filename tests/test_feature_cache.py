@@ -0,0 +1,92 @@
+import os
+import shutil
+
+import pytest
+
+from feature_cache import FeatureCache
+
+PARAMS = {"sr": 22050, "hop": 512, "seg": 25, "version": 3}
+ROW = {"tempo": 120.0, "energy": 0.5, "mood": 0.4, "duration": 200.0}
+
+
+@pytest.fixture
+def song(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"\x00" * 1000)
+    return str(path)
+
+
+def cached_run(db, path, params=PARAMS, use_hash=False):
+    """Look 'path' up in a freshly opened cache, storing ROW on a miss."""
+    cache = FeatureCache(db, params, use_hash=use_hash)
+    row = cache.lookup(path)
+    if row is None:
+        cache.store(path, dict(ROW, file=path))
+    cache.close()
+    return row
+
+
+def test_unchanged_file_is_reused(tmp_path, song):
+    db = str(tmp_path / "cache.db")
+    assert cached_run(db, song) is None
+    assert cached_run(db, song) == dict(ROW, file=song)
+
+
+def test_changed_mtime_or_size_invalidates(tmp_path, song):
+    db = str(tmp_path / "cache.db")
+    cached_run(db, song)
+
+    st = os.stat(song)
+    os.utime(song, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cached_run(db, song) is None
+    assert cached_run(db, song) is not None
+
+    with open(song, "ab") as f:
+        f.write(b"\x01")
+    os.utime(song, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))   # same mtime, new size
+    assert cached_run(db, song) is None
+
+
+def test_content_hash_decides_with_use_hash(tmp_path, song):
+    db = str(tmp_path / "cache.db")
+    cached_run(db, song, use_hash=True)
+
+    # Moved/touched but same contents: still reused
+    moved = str(tmp_path / "moved.mp3")
+    shutil.copy(song, moved)
+    assert cached_run(db, moved, use_hash=True) == dict(ROW, file=moved)
+
+    # Same size, new mtime and different contents: analysed again
+    with open(song, "r+b") as f:
+        f.write(b"\x01")
+    st = os.stat(song)
+    os.utime(song, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cached_run(db, song, use_hash=True) is None
+
+
+def test_changed_params_drop_every_entry(tmp_path, song):
+    db = str(tmp_path / "cache.db")
+    cached_run(db, song)
+    assert cached_run(db, song, params=dict(PARAMS, version=4)) is None
+    assert cached_run(db, song, params=dict(PARAMS, version=4)) is not None
+    assert cached_run(db, song) is None
+
+
+def test_prune_drops_deleted_files(tmp_path, song):
+    db = str(tmp_path / "cache.db")
+    other = str(tmp_path / "other.mp3")
+    shutil.copy(song, other)
+    cached_run(db, song)
+    cached_run(db, other)
+
+    os.remove(other)
+    cache = FeatureCache(db, PARAMS)
+    assert cache.prune([song]) == 1
+    cache.close()
+
+    shutil.copy(song, other)
+    cache = FeatureCache(db, PARAMS)
+    assert cache.lookup(song) is not None
+    assert cache.lookup(other) is None
+    assert cache.prune([song, other]) == 0
+    cache.close()
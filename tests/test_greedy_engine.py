@@ -0,0 +1,214 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from greedy_engine import (INDEX_MIN_SONGS, LIMITED_INDEX_MIN_TRACKS, FeatureIndex, feature_matrix,
+                           greedy_order, greedy_order_limited, greedy_orders, iter_greedy_order)
+from playlists import greedy_playlist, greedy_playlists, iter_greedy_playlist
+from song_table import load_song_table
+
+
+def test_numpy_engine_matches_pandas_reference(songs_df):
+    for strategy in ("low_energy", "high_energy", "low_mood", "high_mood"):
+        expected = greedy_playlist(songs_df, start_strategy=strategy, engine="pandas")
+        result = greedy_playlist(songs_df, start_strategy=strategy, engine="numpy")
+        assert list(result.index) == list(expected.index)
+
+
+def test_numpy_engine_matches_pandas_reference_from_every_start(songs_df):
+    for start in range(len(songs_df)):
+        expected = greedy_playlist(songs_df, start_idx=start, engine="pandas")
+        result = greedy_playlist(songs_df, start_idx=start, engine="numpy")
+        assert list(result.index) == list(expected.index)
+
+
+def test_ties_go_to_the_lowest_position(songs_df):
+    # Songs 0, 1 and 4 are identical: from 0 the walk takes 1, then 4
+    order = greedy_order(feature_matrix(songs_df), 0, "brute")
+    assert order[:3] == [0, 1, 4]
+
+
+def test_missing_features_come_last(songs_nan_df, songs_df):
+    # The reference stops at the first all-NaN step, so compare the walk
+    # over the complete rows with the reference on those rows alone
+    complete = songs_df.drop(index=[6, 9])
+    expected = list(greedy_playlist(complete, engine="pandas").index)
+    result = list(greedy_playlist(songs_nan_df, engine="numpy").index)
+    assert result[:len(expected)] == expected
+    assert sorted(result[len(expected):]) == [6, 9]
+
+
+def test_unknown_engine_is_rejected(songs_df):
+    with pytest.raises(ValueError):
+        greedy_playlist(songs_df, engine="gpu")
+
+
+def test_order_is_a_permutation(songs_df):
+    order = greedy_order(feature_matrix(songs_df), 3, "brute")
+    assert order[0] == 3
+    assert sorted(order) == list(range(len(songs_df)))
+    assert isinstance(order[0], (int, np.integer))
+
+
+def rounded_features(n, seed):
+    """Random features on a coarse grid, so many distances tie."""
+    rng = np.random.default_rng(seed)
+    return np.ascontiguousarray(np.vstack([
+        rng.integers(90, 100, n).astype(float),
+        rng.integers(0, 5, n) / 4,
+        rng.integers(0, 5, n) / 4,
+    ]))
+
+
+def test_index_engine_matches_brute_force():
+    for seed in range(5):
+        features = rounded_features(300, seed)
+        for start in (0, 17, 299):
+            assert greedy_order(features, start, "index") == greedy_order(features, start, "brute")
+
+
+def test_index_engine_matches_pandas_reference(songs_df):
+    expected = greedy_playlist(songs_df, engine="pandas")
+    assert list(greedy_playlist(songs_df, engine="index").index) == list(expected.index)
+
+
+def test_index_query_returns_nearest_first_lowest_position_on_ties():
+    features = rounded_features(200, 7)
+    index = FeatureIndex(features, leaf_size=4)
+    point = features[:, 5]
+    d = np.abs(features - point[:, None]).sum(axis=0)
+    expected = np.lexsort((np.arange(200), d))[:10].tolist()
+    assert index.query(point, 10) == expected
+
+
+def test_index_rejects_missing_features():
+    features = rounded_features(10, 0)
+    features[1, 3] = np.nan
+    with pytest.raises(ValueError):
+        FeatureIndex(features)
+
+
+def test_batch_walks_match_single_walks():
+    features = rounded_features(150, 3)
+    starts = [0, 40, 40, 149, 7]
+    for method in ("brute", "index"):
+        expected = [greedy_order(features, s, "brute") for s in starts]
+        assert greedy_orders(features, starts, method) == expected
+
+
+def test_batch_walks_with_missing_features(songs_nan_df):
+    features = feature_matrix(songs_nan_df)
+    starts = [0, 3, 11]
+    expected = [greedy_order(features, s, "brute") for s in starts]
+    assert greedy_orders(features, starts, "brute") == expected
+
+
+def test_greedy_playlists_match_greedy_playlist(songs_df):
+    starts = ["low_energy", "high_mood", 4, "low_energy"]
+    playlists = greedy_playlists(songs_df, starts, engine="numpy")
+    for start, playlist in zip(starts, playlists):
+        if isinstance(start, str):
+            expected = greedy_playlist(songs_df, start_strategy=start, engine="pandas")
+        else:
+            expected = greedy_playlist(songs_df, start_idx=start, engine="pandas")
+        assert list(playlist.index) == list(expected.index)
+
+
+def limited_reference(features, start, durations, target, max_tracks, tolerance):
+    """Step-by-step walk over the songs that still fit (plain Python)."""
+    n = features.shape[1]
+    order, total = [start], durations[start]
+    while len(order) < (max_tracks or n) and (target is None or total < target - tolerance):
+        best = None
+        for p in range(n):
+            if p in order:
+                continue
+            if target is not None and not total + durations[p] <= target + tolerance:
+                continue
+            d = float(np.abs(features[:, p] - features[:, order[-1]]).sum())
+            d = np.inf if np.isnan(d) else d
+            if best is None or d < best[0]:
+                best = (d, p)
+        if best is None:
+            break
+        order.append(best[1])
+        total += durations[best[1]]
+    return order
+
+
+@pytest.mark.parametrize("method", ["brute", "index"])
+def test_limited_walk_matches_reference(songs_df, method):
+    features, durations = feature_matrix(songs_df), songs_df["duration"].to_numpy()
+    cases = [(None, 4, 0.0), (900.0, None, 0.0), (1000.0, None, 60.0), (700.0, 2, 0.0),
+             (240.0, None, 0.0)]
+    for target, max_tracks, tolerance in cases:
+        for start in range(len(songs_df)):
+            if target is not None and durations[start] > target + tolerance:
+                with pytest.raises(ValueError):
+                    greedy_order_limited(features, start, durations, target, max_tracks,
+                                         tolerance, method)
+                continue
+            expected = limited_reference(features, start, durations, target, max_tracks, tolerance)
+            assert greedy_order_limited(features, start, durations, target, max_tracks,
+                                        tolerance, method) == expected
+
+
+def test_limited_walk_with_missing_features(songs_nan_df):
+    features, durations = feature_matrix(songs_nan_df), songs_nan_df["duration"].to_numpy()
+    for target in (None, 1500.0, 5000.0):
+        expected = limited_reference(features, 0, durations, target, None, 0.0)
+        assert greedy_order_limited(features, 0, durations, target, None, 0.0, "brute") == expected
+
+
+def test_max_tracks_is_a_prefix_of_the_full_walk():
+    features = rounded_features(120, 4)
+    full = greedy_order(features, 5, "brute")
+    for method in ("brute", "index"):
+        assert greedy_order_limited(features, 5, None, max_tracks=30, method=method) == full[:30]
+
+
+def test_start_song_longer_than_the_target_is_rejected(songs_df):
+    durations = songs_df["duration"].to_numpy()
+    with pytest.raises(ValueError):
+        greedy_order_limited(feature_matrix(songs_df), 7, durations, target_duration=240.0)
+    with pytest.raises(ValueError):
+        greedy_playlist(songs_df, start_idx=7, target_duration=200.0, tolerance=40.0)
+    playlist = greedy_playlist(songs_df, start_idx=7, target_duration=200.0, tolerance=50.0)
+    assert list(playlist.index) == [7]
+
+
+@pytest.mark.parametrize("method", ["brute", "index", "auto"])
+def test_streaming_walk_matches_greedy_order(method):
+    features = rounded_features(200, 5)
+    for start in (0, 99):
+        assert list(iter_greedy_order(features, start, method=method)) == greedy_order(features, start)
+
+
+def test_streaming_walk_switches_to_the_index_on_large_libraries():
+    features = rounded_features(INDEX_MIN_SONGS, 6)
+    k = LIMITED_INDEX_MIN_TRACKS + 50
+    assert list(itertools.islice(iter_greedy_order(features, 0, method="auto"), k)) == \
+           greedy_order_limited(features, 0, None, max_tracks=k, method="brute")
+
+
+def test_streaming_walk_with_missing_features(songs_nan_df):
+    features = feature_matrix(songs_nan_df)
+    assert list(iter_greedy_order(features, 2, method="brute")) == greedy_order(features, 2, "brute")
+
+
+def test_streaming_playlist_can_stop_early(songs_df):
+    expected = greedy_playlist(songs_df, engine="numpy")
+    songs = iter_greedy_playlist(songs_df)
+    first = [next(songs)["file"] for _ in range(3)]
+    songs.close()
+    assert first == list(expected["file"][:3])
+    assert [row["file"] for row in iter_greedy_playlist(songs_df)] == list(expected["file"])
+
+
+def test_streaming_playlist_of_a_song_table(songs_csv, songs_df):
+    expected = list(greedy_playlist(songs_df, start_strategy="high_mood", engine="pandas")["file"])
+    table = load_song_table(songs_csv)
+    assert [row.file for row in iter_greedy_playlist(table, start_strategy="high_mood")] == expected
+    assert [row.file for row in iter_greedy_playlist(table, target_duration=600.0)] == \
+           greedy_playlist(table, target_duration=600.0).files
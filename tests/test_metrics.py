@@ -0,0 +1,83 @@
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def collecting():
+    metrics.enable(reset=True)
+    yield
+    metrics.disable()
+    metrics.snapshot(reset=True)
+
+
+@metrics.timed("decorated")
+def sleepy(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def worker_task(i):
+    with metrics.stage("worker.task"):
+        time.sleep(0.01)
+    metrics.count("worker.items", i)
+    return metrics.snapshot(reset=True) if metrics.is_worker() else None
+
+
+def test_stages_record_calls_and_timings(collecting):
+    for seconds in (0.02, 0.05):
+        with metrics.stage("sleep"):
+            time.sleep(seconds)
+    assert sleepy(0.01) == 0.01
+    metrics.count("songs", 3)
+    metrics.count("songs")
+
+    report = metrics.report()
+    entry = report["stages"]["sleep"]
+    assert entry["calls"] == 2
+    assert 0.07 <= entry["seconds"] < 1.0
+    assert 0.05 <= entry["max_seconds"] <= entry["seconds"]
+    assert entry["mean_seconds"] == pytest.approx(entry["seconds"] / 2)
+    assert entry["peak_rss_bytes"] > 0
+    assert report["stages"]["decorated"]["calls"] == 1
+    assert report["counters"] == {"songs": 4}
+    assert report["wall_seconds"] >= entry["seconds"]
+
+
+def test_nothing_is_recorded_while_disabled():
+    metrics.disable()
+    with metrics.stage("off"):
+        pass
+    sleepy(0)
+    metrics.count("off")
+    assert metrics.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_worker_snapshots_are_merged(collecting):
+    with metrics.stage("worker.task"):
+        pass
+    with ProcessPoolExecutor(max_workers=2, initializer=metrics.start_worker) as pool:
+        for snap in pool.map(worker_task, range(1, 5)):
+            metrics.merge(snap)
+    metrics.merge(None)
+
+    report = metrics.report()
+    entry = report["stages"]["worker.task"]
+    assert entry["calls"] == 5
+    assert entry["seconds"] >= 0.04
+    assert entry["max_seconds"] >= 0.01
+    assert report["counters"] == {"worker.items": 10}
+    assert not metrics.is_worker()
+
+
+def test_write_report(collecting, tmp_path):
+    with metrics.stage("load_songs"):
+        pass
+    metrics.write_report(str(tmp_path / "m.json"))
+    report = json.loads((tmp_path / "m.json").read_text())
+    assert report["version"] == metrics.REPORT_VERSION
+    assert list(report["stages"]) == ["load_songs"]
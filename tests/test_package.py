@@ -0,0 +1,127 @@
+import csv
+import os
+import subprocess
+import sys
+import importlib.util
+from importlib.machinery import SourceFileLoader
+
+import smart_playlist
+from distance_cache import WeightedMetric
+from playlists import greedy_playlist
+from smart_playlist.cli import main
+from song_table import load_song_table
+from songs import load_songs, recommended_sort, save_csv
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def csv_files(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["file"] for row in csv.DictReader(f)]
+
+
+def test_import_loads_no_heavy_modules():
+    code = ("import sys, smart_playlist; "
+            "print(sorted(m for m in ('numpy', 'pandas', 'librosa') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_every_export_resolves():
+    for name in smart_playlist._EXPORTS:
+        assert getattr(smart_playlist, name) is not None
+    assert smart_playlist.greedy_playlist is greedy_playlist
+
+
+def load_script(name, filename):
+    """Import a script by path (Final_codes has no .py extension)."""
+    loader = SourceFileLoader(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader(name, loader))
+    loader.exec_module(module)
+    return module
+
+
+def test_scripts_share_one_greedy_playlist():
+    final_codes = load_script("final_codes", "Final_codes")
+    integrated = load_script("integrated", "integrated_playlist_generator.py")
+    assert final_codes.greedy_playlist is integrated.greedy_playlist is greedy_playlist
+    assert final_codes.iter_greedy_playlist is integrated.iter_greedy_playlist
+
+
+def test_sort_command_matches_recommended_sort(songs_csv, tmp_path):
+    main(["sort", songs_csv, str(tmp_path / "cli.csv")])
+    save_csv(recommended_sort(load_songs(songs_csv)), str(tmp_path / "expected.csv"))
+    assert (tmp_path / "cli.csv").read_bytes() == (tmp_path / "expected.csv").read_bytes()
+
+
+def test_playlist_command_matches_greedy_playlist(songs_csv, tmp_path):
+    main(["playlist", songs_csv, str(tmp_path / "cli.csv"), "--start", "high_mood"])
+    songs = recommended_sort(load_song_table(songs_csv))
+    expected = greedy_playlist(songs, start_strategy="high_mood",
+                               distances=WeightedMetric.of(songs.feature_matrix()))
+    assert csv_files(tmp_path / "cli.csv") == expected.files
+
+    main(["playlist", songs_csv, str(tmp_path / "raw.csv"), "--raw-distance", "--max-tracks", "5"])
+    assert csv_files(tmp_path / "raw.csv") == greedy_playlist(songs, max_tracks=5).files
+
+
+def test_distance_matrix_is_only_written_on_request(songs_csv, tmp_path):
+    main(["playlist", songs_csv, str(tmp_path / "metric.csv")])
+    assert not os.path.exists(songs_csv + ".dist")
+
+    main(["playlist", songs_csv, str(tmp_path / "cached.csv"), "--distance-cache"])
+    assert os.path.exists(songs_csv + ".dist")
+    assert csv_files(tmp_path / "cached.csv") == csv_files(tmp_path / "metric.csv")
+
+
+def test_playlist_command_passes_every_option_to_greedy_playlist(songs_csv, tmp_path):
+    songs = recommended_sort(load_song_table(songs_csv))
+    metric = WeightedMetric.of(songs.feature_matrix(), {"tempo": 2.0, "mood": 1.0, "energy": 0.5})
+
+    main(["playlist", songs_csv, str(tmp_path / "limited.csv"), "--start-idx", "3",
+          "--engine", "index", "--weights", "2,1,0.5", "--target-duration", "1000",
+          "--tolerance", "60"])
+    expected = greedy_playlist(songs, start_idx=3, engine="index", distances=metric,
+                               target_duration=1000, tolerance=60)
+    assert csv_files(tmp_path / "limited.csv") == expected.files
+
+    main(["playlist", songs_csv, str(tmp_path / "clusters.csv"), "--weights", "2,1,0.5",
+          "--clusters", "3", "--partition", "grid", "--refine", "1"])
+    expected = greedy_playlist(songs, distances=metric, clusters=3, partition="grid",
+                               refine_budget=1)
+    assert csv_files(tmp_path / "clusters.csv") == expected.files
+
+
+def test_installed_modules_with_the_same_names_do_not_shadow_the_pipeline(tmp_path):
+    site = tmp_path / "site"
+    site.mkdir()
+    for name in ("songs", "metrics", "score", "dedup"):
+        (site / f"{name}.py").write_text("raise ImportError('shadowing module')\n")
+    code = ("import smart_playlist as sp, songs; "
+            "print(sp.load_songs.__module__, songs.__file__)")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(site), ROOT]))
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True,
+                         text=True, check=True).stdout.split()
+    assert out[0] == "songs"
+    assert os.path.samefile(out[1], os.path.join(ROOT, "songs.py"))
+
+
+def test_scripts_write_the_same_playlist_and_always_report_metrics(songs_csv, tmp_path):
+    def run(script, cwd, *args):
+        return subprocess.run([sys.executable, os.path.join(ROOT, script), *args], cwd=cwd,
+                              capture_output=True, text=True)
+
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "songs_features.csv").write_bytes(open(songs_csv, "rb").read())
+    assert run("Final_codes", work).returncode == 0
+    assert run("integrated_playlist_generator.py", work).returncode == 0
+    assert (work / "greedy_playlist.csv").read_bytes() == \
+        (work / "greedy_playlist_low_energy.csv").read_bytes()
+
+    # The report is written even when the run fails (no songs_features.csv here)
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    assert run("integrated_playlist_generator.py", empty, "--metrics", "m.json").returncode != 0
+    assert (empty / "m.json").exists()
@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pytest
+
+from playlist_extend import extend_playlist
+from distance_cache import WeightedMetric
+from song_table import SongTable
+
+
+def random_table(n, seed, prefix, nan_share=0.0):
+    rng = np.random.default_rng(seed)
+    tempo = rng.integers(80, 90, n).astype(float)
+    mood, energy = rng.integers(0, 4, (2, n)) / 4
+    mood[rng.random(n) < nan_share] = np.nan
+    return SongTable.from_columns([f"{prefix}{i:03d}.mp3" for i in range(n)], mood, tempo, energy,
+                                  np.full(n, 200.0))
+
+
+def distance(a, b):
+    d = abs(a.tempo - b.tempo) + abs(a.mood - b.mood) + abs(a.energy - b.energy)
+    return math.inf if math.isnan(d) else d
+
+
+def reference(playlist, new_songs):
+    """
+    Cheapest insertion on a Python list.  Ties go to the transition after
+    the song that came first in the input (playlist, then new songs);
+    appending wins a tie.
+    """
+    songs = list(enumerate(playlist))
+    known = set(playlist.files)
+    for pos, song in enumerate(new_songs, start=len(playlist)):
+        if song.file in known:
+            continue
+        known.add(song.file)
+        if not songs:
+            songs.append((pos, song))
+            continue
+        best = None
+        for at, ((a_pos, a), (_, b)) in enumerate(zip(songs, songs[1:])):
+            cost = distance(a, song) + distance(song, b) - distance(a, b)
+            cost = math.inf if math.isnan(cost) else cost
+            if best is None or (cost, a_pos) < best[:2]:
+                best = (cost, a_pos, at)
+        if best is not None and best[0] < distance(songs[-1][1], song):
+            songs.insert(best[2] + 1, (pos, song))
+        else:
+            songs.append((pos, song))
+    return [s.file for _, s in songs]
+
+
+@pytest.mark.parametrize("method", ["brute", "index"])
+@pytest.mark.parametrize("nan_share", [0.0, 0.15])
+def test_matches_reference_cheapest_insertion(method, nan_share):
+    for seed in range(15):
+        playlist = random_table(30 + seed, seed, "p", nan_share if method == "brute" else 0.0)
+        new_songs = random_table(12, 100 + seed, "n", nan_share)
+        result = extend_playlist(playlist, new_songs, method, candidates=3)
+        assert result.playlist.files == reference(playlist, new_songs)
+        assert result.inserted == 12 and result.skipped == 0
+
+
+def test_index_and_brute_report_the_same_cost():
+    playlist, new_songs = random_table(200, 1, "p"), random_table(40, 2, "n")
+    brute = extend_playlist(playlist, new_songs, "brute")
+    index = extend_playlist(playlist, new_songs, "index", candidates=2)
+    assert index.playlist.files == brute.playlist.files
+    assert index.added_cost == pytest.approx(brute.added_cost)
+
+
+def test_added_cost_and_fixed_first_song():
+    playlist, new_songs = random_table(20, 3, "p"), random_table(10, 4, "n")
+    result = extend_playlist(playlist, new_songs)
+
+    def total(table):
+        rows = list(table)
+        return sum(distance(a, b) for a, b in zip(rows, rows[1:]))
+
+    assert result.playlist.files[0] == playlist.files[0]
+    assert result.added_cost == pytest.approx(total(result.playlist) - total(playlist))
+
+
+def test_known_and_repeated_songs_are_skipped():
+    playlist = random_table(10, 5, "p")
+    new_songs = playlist.take([2, 7]).append(random_table(3, 6, "n")).append(random_table(1, 6, "n"))
+    result = extend_playlist(playlist, new_songs)
+    assert (result.inserted, result.skipped) == (3, 3)
+    assert sorted(result.playlist.files) == sorted(playlist.files + ["n000.mp3", "n001.mp3", "n002.mp3"])
+
+
+def test_empty_inputs_and_unknown_method():
+    playlist, new_songs = random_table(5, 7, "p"), random_table(4, 8, "n")
+    assert extend_playlist(playlist, playlist).playlist is playlist
+    assert extend_playlist(playlist.take([]), new_songs).playlist.files == reference(playlist.take([]), new_songs)
+    with pytest.raises(ValueError):
+        extend_playlist(playlist, new_songs, "kdtree")
+
+
+@pytest.mark.parametrize("method", ["brute", "index"])
+def test_weighted_metric_matches_reference_on_scaled_features(method):
+    differs = []
+    for seed in range(5):
+        playlist, new_songs = random_table(40, seed, "p"), random_table(12, 50 + seed, "n")
+        metric = WeightedMetric.of(playlist.append(new_songs).feature_matrix(),
+                                   {"tempo": 1.0, "mood": 2.0, "energy": 0.5})
+        result = extend_playlist(playlist, new_songs, method, candidates=3, distances=metric)
+
+        def scaled(table):
+            tempo, mood, energy = metric.weighted(table.feature_matrix())
+            return SongTable.from_columns(table.files, mood, tempo, energy, table.duration)
+
+        assert result.playlist.files == reference(scaled(playlist), scaled(new_songs))
+        differs.append(result.playlist.files != extend_playlist(playlist, new_songs, method).playlist.files)
+    assert any(differs)         # the raw distance would have placed some songs elsewhere
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from greedy_engine import greedy_order
+from playlist_refine import MIN_GAIN, refine_order, transition_cost
+
+
+def rounded_features(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.vstack([rng.integers(90, 100, n).astype(float),
+                      rng.integers(0, 5, n) / 4,
+                      rng.integers(0, 5, n) / 4])
+
+
+def two_opt_gains(features, order):
+    """Gain of every reversal order[i+1..j] (the reference 2-opt)."""
+    base = transition_cost(features, order)
+    for i in range(len(order) - 1):
+        for j in range(i + 2, len(order)):
+            candidate = order[:i + 1] + order[i + 1:j + 1][::-1] + order[j + 1:]
+            yield base - transition_cost(features, candidate)
+
+
+def move_gains(features, order):
+    """Gain of moving one song (not the first) anywhere else."""
+    base = transition_cost(features, order)
+    for i in range(1, len(order)):
+        rest = order[:i] + order[i + 1:]
+        for j in range(1, len(rest) + 1):
+            yield base - transition_cost(features, rest[:j] + [order[i]] + rest[j:])
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_converged_order_is_a_local_optimum(seed):
+    features = rounded_features(25, seed)
+    start = greedy_order(features, 0, "brute")
+    result = refine_order(features, start, time_budget=None)
+
+    assert result.converged
+    assert result.order[0] == start[0]
+    assert sorted(result.order) == list(range(25))
+    assert result.cost_before == pytest.approx(transition_cost(features, start))
+    assert result.cost_after == pytest.approx(transition_cost(features, result.order))
+    assert result.cost_after <= result.cost_before
+    assert max(two_opt_gains(features, list(result.order))) <= MIN_GAIN
+    assert max(move_gains(features, list(result.order))) <= MIN_GAIN
+
+
+def test_move_limit_stops_early():
+    features = rounded_features(60, 1)
+    start = list(range(60))
+    assert refine_order(features, start, time_budget=None, max_iterations=0).order == start
+    result = refine_order(features, start, time_budget=None, max_iterations=3)
+    assert result.moves == 3 and not result.converged
+    assert result.cost_after < result.cost_before
+
+
+def test_identical_songs_need_no_moves():
+    features = np.ones((3, 8))
+    result = refine_order(features, list(range(8)), time_budget=None)
+    assert result.moves == 0 and result.converged and result.order == list(range(8))
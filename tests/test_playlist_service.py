@@ -0,0 +1,76 @@
+import asyncio
+import os
+
+import pytest
+
+from greedy_engine import greedy_order
+from playlist_service import PlaylistService
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def service(songs_csv):
+    service = PlaylistService(songs_csv, workers=2)
+    yield service
+    service.close()
+
+
+def files(response):
+    assert response["ok"], response
+    return [s["file"] for s in response["songs"]]
+
+
+def test_playlist_requests_match_the_greedy_walk(service):
+    library = service.library
+    start = library.recommended.start_position(start_strategy="high_energy")
+    expected = [library.recommended.file(p) for p in greedy_order(library.metric, start)]
+
+    async def requests():
+        # Issued together, so they are answered from one batched walk
+        return await asyncio.gather(*(service.handle({"op": "playlist", "start_strategy": s, "id": i})
+                                      for i, s in enumerate(["high_energy", "low_mood", "high_energy"])))
+
+    responses = run(requests())
+    assert files(responses[0]) == expected == files(responses[2])
+    assert [r["id"] for r in responses] == [0, 1, 2]
+
+
+def test_errors_are_reported_not_raised(service):
+    response = run(service.handle({"op": "playlist", "engine": "gpu"}))
+    assert not response["ok"] and "engine" in response["error"]
+    assert not run(service.handle({"op": "fly"}))["ok"]
+
+
+def test_reload_picks_up_appended_songs_and_skips_truncated_rows(service, songs_csv):
+    with open(songs_csv, "a", encoding="utf-8") as f:
+        f.write("s12.mp3,0.5,118,0.55,201\n")
+        f.write("cut.mp3,0.5")
+    os.utime(songs_csv, ns=(1, 1))
+    assert run(service.reload())
+    assert len(service.library) == 13 and service.reloads == 1
+    query = run(service.handle({"op": "query", "where": ["tempo>=118"], "by": "tempo"}))
+    assert "s12.mp3" in files(query)
+
+
+def test_watch_keeps_polling_after_a_failed_check(service, monkeypatch):
+    calls = []
+
+    async def flaky_reload(force=False):
+        calls.append(force)
+        if len(calls) == 1:
+            raise TypeError("bad row")
+        return False
+
+    monkeypatch.setattr(service, "reload", flaky_reload)
+
+    async def watch_briefly():
+        task = asyncio.ensure_future(service.watch(interval=0.01))
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    run(asyncio.wait_for(watch_briefly(), timeout=5))
+    assert len(calls) >= 3
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+sf = pytest.importorskip("soundfile")
+
+from score import (HOP, N_FFT, SEG, SR, load_mid, load_mid_window, mood_score,  # noqa: E402
+                   score, segment_features)
+
+
+def write_clip(path, seconds, sr, seed=0):
+    """A click track over a tone, as MP3 (like benchmarks/synthetic_library.py)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    y = 0.1 * np.sin(2 * np.pi * rng.uniform(110.0, 440.0) * t)
+    y[(t * 2.1) % 1.0 < 0.01] += 0.5
+    sf.write(str(path), y.astype(np.float32), sr, format="MP3")
+    return str(path)
+
+
+# Native rates and lengths whose window start is not a whole number of
+# native frames in floating point (e.g. 104.6 s)
+CLIPS = [(22050, 60.0), (22050, 104.6), (44100, 104.6), (48000, 104.6), (48000, 61.37),
+         (32000, 104.6), (32000, 61.37)]
+
+
+@pytest.mark.parametrize("sr, seconds", CLIPS)
+def test_window_decode_matches_full_decode(tmp_path, sr, seconds):
+    path = write_clip(tmp_path / f"clip_{sr}.mp3", seconds, sr)
+    full, _ = librosa.load(path, sr=SR, mono=True)
+    expected, duration = load_mid(full, SR)
+    window, window_duration = load_mid_window(path)
+
+    assert window_duration == pytest.approx(duration)
+    assert len(window) == len(expected) == int(SEG * SR // 2) * 2
+    assert np.max(np.abs(window - expected)) < 1e-6
+
+
+def test_partial_decode_gives_the_full_decode_scores(tmp_path):
+    path = write_clip(tmp_path / "clip.mp3", 104.6, 48000)
+    assert score(path, partial_decode=True) == pytest.approx(score(path, partial_decode=False),
+                                                             rel=1e-6)
+
+
+def test_short_songs_are_decoded_whole(tmp_path):
+    path = write_clip(tmp_path / "short.mp3", SEG - 5.0, SR)
+    full, _ = librosa.load(path, sr=SR, mono=True)
+    window, duration = load_mid_window(path)
+    np.testing.assert_array_equal(window, full)
+    assert duration == pytest.approx(len(full) / SR)
+
+
+def test_unreadable_files_fall_back(tmp_path):
+    path = tmp_path / "broken.mp3"
+    path.write_bytes(b"not audio")
+    assert load_mid_window(str(path)) is None
+
+
+def click_track(bpm, seconds=SEG, seed=0):
+    """Noise bursts on the beat over a quiet tone, with a slow loudness swell."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SR)) / SR
+    y = 0.02 * np.sin(2 * np.pi * 220.0 * t) * (1 + 0.5 * np.sin(2 * np.pi * t / 7))
+    beat = (t * bpm / 60) % 1.0 < 0.03
+    y[beat] += 0.4 * rng.standard_normal(beat.sum())
+    return y.astype(np.float32)
+
+
+def separate_features(y):
+    """tempo / energy / mood from separate librosa tempo and RMS calls, as score() used to."""
+    tempo = float(librosa.feature.tempo(y=y, sr=SR, hop_length=HOP, aggregate=np.median)[0])
+    rms = librosa.feature.rms(y=y, frame_length=N_FFT, hop_length=HOP).flatten()
+    rms_mean = float(rms.mean())
+    ref = float(np.percentile(rms, 95))
+    energy = 0.0 if ref <= 1e-8 else float(np.clip(rms_mean / ref, 0.0, 1.0))
+    return tempo, energy, float(mood_score(tempo, rms_mean))
+
+
+BPMS = [72, 96, 120, 128, 150, 174]
+
+
+@pytest.mark.parametrize("bpm", BPMS)
+def test_shared_framing_matches_separate_tempo_and_rms(bpm):
+    y = click_track(bpm, seed=bpm)
+    tempo, energy, mood, _ = segment_features(y)
+    expected = separate_features(y)
+
+    assert tempo[0] == expected[0]
+    assert energy[0] == pytest.approx(expected[1], rel=1e-6)
+    assert mood[0] == pytest.approx(expected[2], rel=1e-6)
+
+
+def test_stacked_segments_and_silence_match_separate_calls():
+    segments = np.stack([click_track(bpm, seed=bpm) for bpm in BPMS] + [np.zeros(SEG * SR, np.float32)])
+    tempo, energy, mood, _ = segment_features(segments)
+    for i, y in enumerate(segments):
+        expected = separate_features(y)
+        assert tempo[i] == expected[0]
+        assert energy[i] == pytest.approx(expected[1], rel=1e-6, abs=1e-12)
+        assert mood[i] == pytest.approx(expected[2], rel=1e-6)
+    assert energy[-1] == 0.0
@@ -0,0 +1,163 @@
+import csv
+import os
+
+import pytest
+
+import score
+from score import OUT_COLUMNS, OrderedCsvWriter, main, read_done
+
+
+def fake_score(mp3, partial_decode=True):
+    """Deterministic features derived from the file name."""
+    k = int(mp3[-6:-4])
+    return 100.0 + k, k / 20, k / 40, 180.0 + k
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    scored = []
+
+    def recording_score(mp3, partial_decode=True):
+        scored.append(mp3)
+        return fake_score(mp3)
+
+    monkeypatch.setattr(score, "score", recording_score)
+    music = tmp_path / "music"
+    music.mkdir()
+    for k in range(6):
+        (music / f"song{k:02d}.mp3").touch()
+    return music, scored
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def row(k, music):
+    mp3 = str(music / f"song{k:02d}.mp3")
+    tempo, energy, mood, dur = fake_score(mp3)
+    return {"file": mp3, "tempo": tempo, "energy": energy, "mood": mood, "duration": dur}
+
+
+def test_rows_are_written_in_order_whatever_the_completion_order(tmp_path):
+    music = tmp_path
+    out = str(tmp_path / "out.csv")
+    writer = OrderedCsvWriter(out)
+    for i in [3, 1, 0, 5, 2, 4]:
+        writer.put(i, row(i, music))
+        # Only the in-order prefix has been written so far
+        written = [r[0] for r in read_rows(out)[1:]]
+        assert written == [row(k, music)["file"] for k in range(len(written))]
+    writer.close()
+    assert read_rows(out)[0] == OUT_COLUMNS
+    assert len(read_rows(out)) == 7
+
+
+def test_truncated_last_line_is_discarded(tmp_path):
+    out = str(tmp_path / "out.csv")
+    writer = OrderedCsvWriter(out)
+    for i in range(3):
+        writer.put(i, row(i, tmp_path))
+    writer.close()
+    with open(out, "a", encoding="utf-8") as f:
+        f.write(str(tmp_path / "song03.mp3") + ",12")        # crash mid-row
+
+    done = read_done(out)
+    assert [r["file"] for r in done] == [row(i, tmp_path)["file"] for i in range(3)]
+    assert len(read_rows(out)) == 4
+
+
+def test_resume_scores_only_the_missing_files(library, tmp_path):
+    music, scored = library
+    out = str(tmp_path / "out.csv")
+    main(str(music), out)
+    full = read_rows(out)
+    assert len(scored) == 6
+
+    # Keep the header and two rows, with the third cut off mid-line
+    with open(out, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f, lineterminator="\n").writerows(full[:3])
+        f.write(",".join(full[3])[:10])
+    scored.clear()
+    main(str(music), out, resume=True)
+
+    assert scored == [str(music / f"song{k:02d}.mp3") for k in range(2, 6)]
+    assert read_rows(out) == full
+
+
+def test_resume_rewrites_a_csv_without_the_error_column(library, tmp_path):
+    music, scored = library
+    out = str(tmp_path / "out.csv")
+    main(str(music), out)
+    full = read_rows(out)
+
+    # Layout of the older pandas output: no "error" column
+    err = OUT_COLUMNS.index("error")
+    with open(out, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f, lineterminator="\n").writerows(r[:err] + r[err + 1:] for r in full[:4])
+    scored.clear()
+    main(str(music), out, resume=True)
+
+    assert len(scored) == 3
+    assert read_rows(out) == full
+
+
+def test_resume_refuses_an_unknown_header(library, tmp_path):
+    music, scored = library
+    out = tmp_path / "out.csv"
+    out.write_text("path,bpm\nx.mp3,120\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        main(str(music), str(out), resume=True)
+    assert scored == []
+    assert out.read_text(encoding="utf-8") == "path,bpm\nx.mp3,120\n"
+
+
+def crashing_score(mp3, partial_decode=True):
+    if mp3.endswith("song03.mp3"):
+        os._exit(1)
+    return fake_score(mp3)
+
+
+def unpicklable_score(mp3, partial_decode=True):
+    tempo, energy, mood, dur = fake_score(mp3)
+    if mp3.endswith("song02.mp3"):
+        tempo = lambda: 0.0        # noqa: E731 - the row cannot be sent back
+    return tempo, energy, mood, dur
+
+
+def test_workers_keep_file_order_and_report_progress(library, tmp_path, capsys):
+    music, _ = library
+    serial, pooled = str(tmp_path / "serial.csv"), str(tmp_path / "pooled.csv")
+    main(str(music), serial)
+    main(str(music), pooled, workers=2)
+
+    assert read_rows(pooled) == read_rows(serial)
+    assert "[PROGRESS] 6/6 files" in capsys.readouterr().out
+
+
+def test_failed_futures_become_error_rows(library, tmp_path, monkeypatch):
+    music, _ = library
+    monkeypatch.setattr(score, "score", unpicklable_score)
+    out = str(tmp_path / "out.csv")
+    main(str(music), out, workers=2)
+
+    rows = read_done(out)
+    assert [r["file"] for r in rows] == [str(music / f"song{k:02d}.mp3") for k in range(6)]
+    assert [bool(r["error"]) for r in rows] == [False, False, True, False, False, False]
+
+
+def test_dead_worker_stops_the_scan_and_resume_finishes_it(library, tmp_path, monkeypatch):
+    music, _ = library
+    expected = str(tmp_path / "expected.csv")
+    main(str(music), expected)
+
+    monkeypatch.setattr(score, "score", crashing_score)
+    out = str(tmp_path / "out.csv")
+    with pytest.raises(RuntimeError, match="--resume"):
+        main(str(music), out, workers=2)
+    assert len(read_rows(out)) <= 4
+
+    monkeypatch.setattr(score, "score", fake_score)
+    main(str(music), out, workers=2, resume=True)
+    assert read_rows(out) == read_rows(expected)
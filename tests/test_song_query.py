@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from song_query import filter_rows, parse_condition, query, top_k_rows
+from song_table import SongTable
+from sort_engine import sort_by_fields
+from sorted_index import SortedIndex
+
+
+def random_table(n, seed, nan_share=0.0):
+    rng = np.random.default_rng(seed)
+    mood, tempo, energy = rng.integers(0, 4, (3, n)) / 4
+    for col in (mood, tempo, energy):
+        col[rng.random(n) < nan_share] = np.nan
+    return SongTable.from_columns([f"s{i:03d}.mp3" for i in range(n)], mood, tempo, energy,
+                                  rng.integers(150, 250, n).astype(float))
+
+
+def positions(table, files):
+    where = {f: i for i, f in enumerate(table.files)}
+    return [where[f] for f in files]
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+@pytest.mark.parametrize("nan_share", [0.0, 0.1])
+def test_top_k_matches_sort_by_fields(indexed, nan_share):
+    for seed in range(10):
+        table = random_table(60, seed, nan_share)
+        expected_table = table.take(np.arange(len(table)))
+        if indexed:
+            table.sorted_index = SortedIndex.build(table)
+        for fields in (("mood",), ("mood", "tempo", "energy")):
+            for order in ("asc", "desc"):
+                expected = positions(table, sort_by_fields(expected_table, fields, order).files)
+                for k in (0, 1, 7, 60, 80):
+                    assert top_k_rows(table, fields, k, order).tolist() == expected[:k]
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_filter_rows_matches_a_mask(indexed):
+    table = random_table(80, 1, 0.1)
+    if indexed:
+        table.sorted_index = SortedIndex.build(table)
+    where = [parse_condition("tempo>=0.25"), parse_condition("mood < 0.75"), ("energy", "==", 0.5)]
+    mask = (table.tempo >= 0.25) & (table.mood < 0.75) & (table.energy == 0.5)
+    assert filter_rows(table, where).tolist() == np.flatnonzero(mask).tolist()
+
+
+def test_filter_rows_uses_the_index_nan_flags():
+    table = random_table(80, 3)
+    table.mood[70] = np.nan
+    index = SortedIndex.build(table.take(range(60)))
+    index.extend(table)
+    table.sorted_index = index
+    assert index.has_nan["mood"] and not index.has_nan["tempo"]
+
+    where = [("mood", ">=", 0.5), ("tempo", "<", 0.5)]
+    mask = (table.mood >= 0.5) & (table.tempo < 0.5)
+    assert filter_rows(table, where).tolist() == np.flatnonzero(mask).tolist()
+    assert filter_rows(table, where[:1]).tolist() == np.flatnonzero(table.mood >= 0.5).tolist()
+
+
+def test_query_filters_orders_and_limits():
+    table = random_table(80, 2, 0.1)
+    where = [("tempo", ">", 0.0)]
+    matching = table.take(filter_rows(table, where))
+    result = query(table, where, order_by="recommended", order="desc", k=10)
+    assert result.files == sort_by_fields(matching, ("mood", "tempo", "energy"), "desc").files[:10]
+    assert query(table, k=5).files == table.files[:5]
+
+
+def test_invalid_conditions_and_keys():
+    with pytest.raises(ValueError):
+        parse_condition("loudness>3")
+    with pytest.raises(ValueError):
+        parse_condition("tempo ~ 3")
+    with pytest.raises(ValueError):
+        query(random_table(5, 0), order_by="file")
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from playlists import choose_start
+from song_table import SongTable, is_song_store, load_song_table, open_song_store, save_song_store
+from songs import load_songs, save_csv
+
+
+def test_csv_loads_as_float64_like_load_songs(songs_csv):
+    table = load_song_table(songs_csv)
+    songs = load_songs(songs_csv)
+    assert table.mood.dtype == np.float64
+    assert table.files == [s.file for s in songs]
+    for field in ("mood", "tempo", "energy", "duration"):
+        assert table.column(field).tolist() == [getattr(s, field) for s in songs]
+
+
+def test_float32_is_opt_in(songs_csv):
+    table = load_song_table(songs_csv, dtype=np.float32)
+    assert table.tempo.dtype == np.float32
+    assert table.feature_matrix().dtype == np.float64
+
+
+def test_save_csv_matches_the_song_list_path(songs_csv, tmp_path):
+    save_csv(load_songs(songs_csv), str(tmp_path / "songs.csv"))
+    save_csv(load_song_table(songs_csv), str(tmp_path / "table.csv"))
+    assert (tmp_path / "songs.csv").read_bytes() == (tmp_path / "table.csv").read_bytes()
+
+
+def test_start_position_matches_choose_start(songs_nan_df):
+    table = SongTable.from_columns(songs_nan_df["file"], songs_nan_df["mood"], songs_nan_df["tempo"],
+                                   songs_nan_df["energy"], songs_nan_df["duration"])
+    for strategy in ("low_energy", "high_energy", "low_mood", "high_mood"):
+        assert table.start_position(start_strategy=strategy) == choose_start(songs_nan_df, start_strategy=strategy)
+    with pytest.raises(ValueError):
+        table.start_position(start_idx=len(table))
+
+
+def test_take_and_append_share_paths(songs_csv):
+    table = load_song_table(songs_csv)
+    head, rest = table.take([3, 0]), table.take(range(4, 12))
+    joined = head.append(rest)
+    assert joined.files == ["s03.mp3", "s00.mp3"] + [f"s{i:02d}.mp3" for i in range(4, 12)]
+    assert joined.tempo.tolist() == [140.0, 120.0] + table.tempo[4:].tolist()
+    assert head.paths is table.paths
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_song_store_round_trip(songs_csv, tmp_path, dtype):
+    table = load_song_table(songs_csv, dtype=dtype)
+    table.mood[2] = np.nan
+    path = str(tmp_path / "songs.bin")
+    save_song_store(table, path)
+
+    assert is_song_store(path) and not is_song_store(songs_csv)
+    stored = load_song_table(path)
+    assert stored.files == table.files
+    assert stored.mood.dtype == dtype
+    for field in ("mood", "tempo", "energy", "duration"):
+        np.testing.assert_array_equal(stored.column(field), table.column(field))
+
+
+def test_load_songs_reads_a_song_store(songs_csv, tmp_path):
+    path = str(tmp_path / "songs.bin")
+    save_song_store(load_song_table(songs_csv), path)
+    stored, expected = load_songs(path), load_songs(songs_csv)
+    assert [(s.file, s.mood, s.tempo, s.energy, s.duration) for s in stored] == \
+           [(s.file, s.mood, s.tempo, s.energy, s.duration) for s in expected]
+
+
+def test_open_song_store_rejects_other_files(songs_csv):
+    with pytest.raises(ValueError):
+        open_song_store(songs_csv)
+
+
+def test_truncated_and_invalid_rows_are_skipped(songs_csv):
+    with open(songs_csv, "a", encoding="utf-8") as f:
+        f.write("bad.mp3,0.5,fast,0.5,200\n")
+        f.write("cut.mp3,0.5,1")            # a row still being written
+    table = load_song_table(songs_csv)
+    assert len(table) == 12 and "cut.mp3" not in table.files
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from song_table import SongTable
+from songs import Song, custom_sort, recommended_sort
+from sort_engine import merge_sort, merge_sort_recursive, sort_by_fields
+
+FIELDS = ("mood", "tempo", "energy")
+
+
+def random_songs(n, seed, nan_share=0.0):
+    """Songs with few distinct values (many ties) and some NaN features."""
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 4, (n, 3)).astype(float)
+    values[rng.random((n, 3)) < nan_share] = np.nan
+    return [Song(f"s{i:03d}.mp3", m, t, e, 180.0 + i) for i, (m, t, e) in enumerate(values)]
+
+
+def reference(songs, fields, order):
+    factor = 1 if order == "asc" else -1
+    return merge_sort_recursive(songs, lambda s: tuple(factor * getattr(s, f) for f in fields))
+
+
+def files(songs):
+    return [s.file for s in songs]
+
+
+@pytest.mark.parametrize("nan_share", [0.0, 0.1])
+def test_merge_sort_matches_recursive_version(nan_share):
+    for seed in range(20):
+        songs = random_songs(int(np.random.default_rng(seed).integers(0, 60)), seed, nan_share)
+        key = lambda s: (s.mood, s.tempo)  # noqa: E731
+        assert merge_sort(songs, key) == merge_sort_recursive(songs, key)
+
+
+@pytest.mark.parametrize("nan_share", [0.0, 0.1])
+@pytest.mark.parametrize("order", ["asc", "desc", "whatever"])
+def test_sort_by_fields_matches_merge_sort(nan_share, order):
+    for seed in range(20):
+        songs = random_songs(40, seed, nan_share)
+        table = SongTable.from_songs(songs)
+        for fields in (FIELDS, ("tempo",), ("energy", "mood")):
+            expected = files(reference(songs, fields, order))
+            assert files(sort_by_fields(songs, fields, order)) == expected
+            assert sort_by_fields(table, fields, order).files == expected
+
+
+def test_recommended_and_custom_sort():
+    songs = random_songs(50, 1, 0.1)
+    assert files(recommended_sort(songs, "desc")) == files(reference(songs, FIELDS, "desc"))
+    assert files(custom_sort(songs, "energy")) == files(reference(songs, ("energy",), "asc"))
+    with pytest.raises(ValueError):
+        custom_sort(songs, "duration")
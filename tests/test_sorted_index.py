@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+
+from song_table import SongTable
+from sort_engine import sort_by_fields
+from sorted_index import INDEX_KEYS, ORDERS, SortedIndex, attach_sorted_index, index_path
+
+
+def random_table(n, seed, nan_share=0.0):
+    rng = np.random.default_rng(seed)
+    mood, tempo, energy = rng.integers(0, 4, (3, n)) / 4
+    for col in (mood, tempo, energy):
+        col[rng.random(n) < nan_share] = np.nan
+    return SongTable.from_columns([f"s{i:03d}.mp3" for i in range(n)], mood, tempo, energy,
+                                  np.full(n, 200.0))
+
+
+def assert_matches_sort(index, table):
+    table = table.take(np.arange(len(table)))      # without an attached index
+    for fields in INDEX_KEYS.values():
+        for order in ORDERS:
+            expected = sort_by_fields(table, fields, order).files
+            assert table.take(index.order(fields, order)).files == expected
+
+
+@pytest.mark.parametrize("nan_share", [0.0, 0.1])
+def test_build_matches_sort_by_fields(nan_share):
+    for seed in range(5):
+        table = random_table(80, seed, nan_share)
+        assert_matches_sort(SortedIndex.build(table), table)
+
+
+@pytest.mark.parametrize("nan_share", [0.0, 0.1])
+def test_extend_matches_a_rebuild(nan_share):
+    for seed in range(5):
+        table = random_table(100, seed, nan_share)
+        index = SortedIndex.build(table.take(range(70)))
+        assert index.covers(table)
+        index.extend(table)
+        assert index.n == len(table)
+        assert_matches_sort(index, table)
+
+
+def test_top_k_is_a_prefix():
+    table = random_table(50, 2)
+    index = SortedIndex.build(table)
+    np.testing.assert_array_equal(index.order(("tempo",), "desc", k=5),
+                                  index.order(("tempo",), "desc")[:5])
+    with pytest.raises(ValueError):
+        index.order(("tempo",), "up")
+
+
+def test_attach_saves_extends_and_rebuilds(tmp_path):
+    features_path = str(tmp_path / "songs_features.csv")
+    table = random_table(60, 3, 0.05)
+
+    attach_sorted_index(table.take(range(40)), features_path)
+    assert os.path.exists(index_path(features_path))
+
+    # Appended rows: the stored index is extended
+    grown = table.take(range(60))
+    index = attach_sorted_index(grown, features_path)
+    assert index.n == 60 and grown.sorted_index is index
+    assert_matches_sort(index, grown)
+    assert SortedIndex.load(index_path(features_path)).n == 60
+
+    # Changed earlier rows: rebuilt
+    changed = table.take(range(59, -1, -1))
+    assert not SortedIndex.load(index_path(features_path)).covers(changed)
+    assert_matches_sort(attach_sorted_index(changed, features_path), changed)
+
+
+def test_nan_flags_follow_build_extend_and_save(tmp_path):
+    table = random_table(60, 5)
+    table.tempo[45] = np.nan                         # only in the appended rows
+    index = SortedIndex.build(table.take(range(40)))
+    assert index.has_nan == {"mood": False, "tempo": False, "energy": False}
+
+    index.extend(table)
+    assert index.has_nan == {"mood": False, "tempo": True, "energy": False}
+    assert_matches_sort(index, table)
+
+    path = str(tmp_path / "songs.sortidx")
+    index.save(path)
+    assert SortedIndex.load(path).has_nan == index.has_nan
+
+
+def test_older_index_versions_are_rebuilt(tmp_path):
+    features_path = str(tmp_path / "songs_features.csv")
+    table = random_table(30, 6, 0.1)
+    with open(index_path(features_path), "wb") as f:
+        np.savez(f, version=1, n=30, digest="old")
+    with pytest.raises(ValueError):
+        SortedIndex.load(index_path(features_path))
+    index = attach_sorted_index(table, features_path)
+    assert SortedIndex.load(index_path(features_path)).has_nan == index.has_nan
+
+
+def test_sort_by_fields_uses_the_attached_index():
+    table = random_table(40, 4, 0.1)
+    expected = sort_by_fields(table, ("mood", "tempo", "energy"), "desc").files
+    table.sorted_index = SortedIndex.build(table)
+    assert sort_by_fields(table, ("mood", "tempo", "energy"), "whatever").files == expected